@@ -5,16 +5,19 @@ import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
-from flask_mail import Mail
 from flask_wtf import CSRFProtect
 from flask_migrate import Migrate
 from dotenv import load_dotenv
 from sqlalchemy import text
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from .database import engine_options, install_sqlite_pragmas, sqlite_config
+from .mail_pool import PooledMail
 
 db = SQLAlchemy()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
-mail = Mail()
+mail = PooledMail()
 csrf = CSRFProtect()
 
 
@@ -22,8 +25,9 @@ def create_app(test_config=None):
     """Create and configure the Flask application.
 
     The function loads environment variables, initializes extensions and
-    registers application blueprints. A database and an optional admin user are
-    created on the first run.
+    registers application blueprints. It does not touch the schema: run
+    ``flask bootstrap`` (see :mod:`app.bootstrap`) to apply migrations and
+    create the superadmin account.
 
     Parameters
     ----------
@@ -51,12 +55,6 @@ def create_app(test_config=None):
     if not secret_key:
         secret_key = os.environ.get("SECRET_KEY")
 
-    superadmin_username = os.environ.get("SUPERADMIN_USERNAME") or os.environ.get(
-        "ADMIN_USERNAME"
-    )
-    superadmin_password = os.environ.get("SUPERADMIN_PASSWORD") or os.environ.get(
-        "ADMIN_PASSWORD"
-    )
     superadmin_email = os.environ.get("SUPERADMIN_EMAIL") or os.environ.get(
         "ADMIN_EMAIL"
     )
@@ -85,6 +83,19 @@ def create_app(test_config=None):
         database_uri = f'sqlite:///{db_path}'
 
     app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    if "SQLALCHEMY_ENGINE_OPTIONS" not in (test_config or {}):
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_uri)
+
+    # Rendered reports are kept next to the database so they survive
+    # container restarts; an empty value disables the store.
+    if test_config is not None and "DOCX_STORE_DIR" in test_config:
+        docx_store_dir = test_config["DOCX_STORE_DIR"]
+    else:
+        docx_store_dir = os.environ.get(
+            "DOCX_STORE_DIR",
+            os.path.join(app.root_path, '..', 'instance', 'docx'),
+        )
+    app.config['DOCX_STORE_DIR'] = docx_store_dir
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
     mail_server = os.environ.get("MAIL_SERVER", "localhost")
@@ -103,9 +114,49 @@ def create_app(test_config=None):
         MAIL_USE_SSL=mail_use_ssl,
         MAIL_DEFAULT_SENDER=os.environ.get("MAIL_DEFAULT_SENDER", superadmin_email),
         TIMEZONE=timezone,
+        MAIL_OUTBOX=os.environ.get("MAIL_OUTBOX", "false").lower() == "true",
+        OUTBOX_MAX_ATTEMPTS=int(os.environ.get("OUTBOX_MAX_ATTEMPTS", 5)),
+        OUTBOX_RETRY_SECONDS=int(os.environ.get("OUTBOX_RETRY_SECONDS", 60)),
+        OUTBOX_LEASE_SECONDS=int(os.environ.get("OUTBOX_LEASE_SECONDS", 300)),
+        MAIL_POOL_IDLE_SECONDS=int(os.environ.get("MAIL_POOL_IDLE_SECONDS", 60)),
+        MAIL_POOL_SIZE=int(os.environ.get("MAIL_POOL_SIZE", 4)),
+        LIST_PAGE_SIZE=int(os.environ.get("LIST_PAGE_SIZE", 50)),
+        AKTYWNY_PROJEKT_CACHE_SECONDS=float(
+            os.environ.get("AKTYWNY_PROJEKT_CACHE_SECONDS", 30)
+        ),
+        SEARCH_MIN_LENGTH=int(os.environ.get("SEARCH_MIN_LENGTH", 2)),
+        SEARCH_CACHE_SECONDS=float(os.environ.get("SEARCH_CACHE_SECONDS", 15)),
+        EXPORT_WORKERS=int(os.environ.get("EXPORT_WORKERS", 2)),
+        SETTINGS_CHECK_SECONDS=float(os.environ.get("SETTINGS_CHECK_SECONDS", 1)),
+        USER_CACHE_SECONDS=float(os.environ.get("USER_CACHE_SECONDS", 30)),
+        PASSWORD_HASH_METHOD=os.environ.get("PASSWORD_HASH_METHOD", "scrypt"),
+        PASSWORD_HASH_WORKERS=int(os.environ.get("PASSWORD_HASH_WORKERS", 2)),
+        PASSWORD_HASH_QUEUE=int(os.environ.get("PASSWORD_HASH_QUEUE", 8)),
+        PASSWORD_HASH_TIMEOUT=float(os.environ.get("PASSWORD_HASH_TIMEOUT", 5)),
+        RATE_LIMIT_STORAGE=os.environ.get("RATE_LIMIT_STORAGE", "memory"),
+        RATE_LIMIT_PER_IP=int(os.environ.get("RATE_LIMIT_PER_IP", 30)),
+        RATE_LIMIT_PER_EMAIL=int(os.environ.get("RATE_LIMIT_PER_EMAIL", 10)),
+        RATE_LIMIT_PERIOD=float(os.environ.get("RATE_LIMIT_PERIOD", 300)),
+        PROXY_FIX_X_FOR=int(os.environ.get("PROXY_FIX_X_FOR", 0)),
+        METRICS_TOKEN=os.environ.get("METRICS_TOKEN"),
+        SQL_PROFILER=os.environ.get("SQL_PROFILER", "false").lower() == "true",
+        SLOW_QUERY_MS=float(os.environ.get("SLOW_QUERY_MS", 500)),
+        **sqlite_config(),
     )
 
+    # Behind Traefik the client address is taken from X-Forwarded-For, which
+    # the login rate limits rely on.
+    if app.config["PROXY_FIX_X_FOR"] > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"])
+
+    from .sql_profiler import init_sql_profiler
+    from .telemetry import init_telemetry
+
     db.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(app, db.engine)
+        init_telemetry(app, db.engine)
+        init_sql_profiler(app, db.engine)
     login_manager.init_app(app)
     mail.init_app(app)
     csrf.init_app(app)
@@ -115,18 +166,25 @@ def create_app(test_config=None):
     from .sessions.routes import sessions_bp
     from .admin.routes import admin_bp
     from .errors import register_error_handlers
+    from .outbox import outbox_cli
+    from .bootstrap import bootstrap_command
+    from .bulk_send import reports_cli
+    from .seed import seed_command
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(sessions_bp)
     app.register_blueprint(admin_bp, url_prefix="/admin")
     register_error_handlers(app)
+    app.cli.add_command(outbox_cli)
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(bootstrap_command)
+    app.cli.add_command(seed_command)
 
     @app.context_processor
     def inject_projekt():
-        from .models import ProjectStatus, Projekt
+        from .projekt_utils import get_aktywny_projekt
 
-        aktywny = Projekt.query.filter_by(status=ProjectStatus.AKTYWNY).first()
-        return {"aktywny_projekt": aktywny}
+        return {"aktywny_projekt": get_aktywny_projekt()}
 
     @app.get("/healthz")
     def healthz():
@@ -137,48 +195,13 @@ def create_app(test_config=None):
             return {"status": "error"}, 503
         return {"status": "ok"}, 200
 
+    from .settings_sync import init_settings, refresh_settings
+
     with app.app_context():
-        from . import models  # noqa: F401
-        from flask_migrate import upgrade
-        upgrade()
-
-        from .models import Settings
-        settings = Settings.query.first()
-        if settings:
-            app.config["MAIL_SERVER"] = settings.mail_server or app.config["MAIL_SERVER"]
-            if settings.mail_port is not None:
-                app.config["MAIL_PORT"] = settings.mail_port
-            app.config["MAIL_USERNAME"] = settings.mail_username or app.config["MAIL_USERNAME"]
-            app.config["MAIL_PASSWORD"] = settings.mail_password or app.config["MAIL_PASSWORD"]
-            if settings.mail_use_tls is not None:
-                app.config["MAIL_USE_TLS"] = settings.mail_use_tls
-            if settings.mail_use_ssl is not None:
-                app.config["MAIL_USE_SSL"] = settings.mail_use_ssl
-            if settings.admin_email:
-                app.config["MAIL_DEFAULT_SENDER"] = (
-                    settings.mail_sender_name or "",
-                    settings.admin_email,
-                )
-            app.config["TIMEZONE"] = settings.timezone or app.config["TIMEZONE"]
-        mail.init_app(app)
-
-        if superadmin_username and superadmin_password and superadmin_email:
-            from .models import User, Roles
-            admin = User.query.filter_by(email=superadmin_email).first()
-            if admin:
-                admin.full_name = superadmin_username
-                admin.role = Roles.SUPERADMIN
-                admin.confirmed = True
-                admin.set_password(superadmin_password)
-            else:
-                admin = User(
-                    full_name=superadmin_username,
-                    email=superadmin_email,
-                    role=Roles.SUPERADMIN,
-                    confirmed=True,
-                )
-                admin.set_password(superadmin_password)
-                db.session.add(admin)
-            db.session.commit()
+        init_settings(app)
+
+    @app.before_request
+    def reload_settings():
+        refresh_settings()
 
     return app
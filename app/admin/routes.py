@@ -1,26 +1,38 @@
 """Administrative view functions and utilities."""
 
 import os
+from datetime import date
 from functools import wraps
 
 from flask import (
     Blueprint,
+    Response,
     abort,
     current_app,
     flash,
+    jsonify,
     redirect,
     render_template,
     request,
+    stream_with_context,
     url_for,
 )
 from flask_login import current_user, login_required
+from sqlalchemy.orm import joinedload, selectinload
 from wtforms.validators import ValidationError
 
 from .. import db, mail
+from ..bulk_send import queued_progress, start_bulk_send
+from ..docx_export import archive_filename, export_sessions_zip, load_snapshots
+from ..docx_generator import docx_template_path
+from ..metrics import HISTOGRAMS
+from ..pagination import keyset_paginate
+from ..settings_sync import apply_settings, bump_settings_version
 from ..utils import send_email
 from ..forms import (
     ActivateProjektForm,
     BeneficjentForm,
+    BulkSendForm,
     ConfirmForm,
     DeleteForm,
     DemoteForm,
@@ -31,7 +43,12 @@ from ..forms import (
     ZajeciaForm,
 )
 from ..models import Beneficjent, Projekt, ProjectStatus, Roles, Settings, User, Zajecia
-from ..projekt_utils import get_aktywny_projekt, resolve_admin_projekt, ustaw_jako_aktywny
+from ..projekt_utils import (
+    get_aktywny_projekt,
+    invalidate_aktywny_projekt,
+    resolve_admin_projekt,
+    ustaw_jako_aktywny,
+)
 
 
 admin_bp = Blueprint("admin", __name__)
@@ -71,14 +88,26 @@ def admin_beneficjenci():
     """Show beneficiaries for the selected project."""
     selected_projekt = resolve_admin_projekt()
     projekty = Projekt.query.order_by(Projekt.utworzono.desc()).all()
-    query = Beneficjent.query
+    query = Beneficjent.query.options(joinedload(Beneficjent.user))
     if selected_projekt:
         query = query.filter_by(project_id=selected_projekt.id)
-    beneficjenci = query.all()
+    after = request.args.get("after")
+    page = keyset_paginate(
+        query,
+        [Beneficjent.imie, Beneficjent.id],
+        after=after,
+        per_page=current_app.config["LIST_PAGE_SIZE"],
+        descending=False,
+    )
     delete_form = DeleteForm()
+    template = "admin/beneficjenci_list.html"
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        template = "admin/_beneficjenci_rows.html"
     return render_template(
-        "admin/beneficjenci_list.html",
-        beneficjenci=beneficjenci,
+        template,
+        beneficjenci=page.items,
+        next_url=page.next_url,
+        after=after,
         delete_form=delete_form,
         projekty=projekty,
         selected_projekt=selected_projekt,
@@ -134,19 +163,133 @@ def admin_zajecia():
     """Display sessions for the selected project."""
     selected_projekt = resolve_admin_projekt()
     projekty = Projekt.query.order_by(Projekt.utworzono.desc()).all()
-    query = Zajecia.query
+    query = Zajecia.query.options(
+        joinedload(Zajecia.user), selectinload(Zajecia.beneficjenci)
+    )
     if selected_projekt:
         query = query.filter_by(project_id=selected_projekt.id)
-    zajecia_list = query.order_by(
-        Zajecia.data.desc(), Zajecia.godzina_od.desc()
-    ).all()
+    after = request.args.get("after")
+    page = keyset_paginate(
+        query,
+        [Zajecia.data, Zajecia.godzina_od, Zajecia.id],
+        after=after,
+        per_page=current_app.config["LIST_PAGE_SIZE"],
+    )
     delete_form = DeleteForm()
+    if request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return render_template(
+            "admin/_zajecia_rows.html",
+            zajecia_list=page.items,
+            next_url=page.next_url,
+            after=after,
+            delete_form=delete_form,
+            selected_projekt=selected_projekt,
+        )
     return render_template(
         "admin/zajecia_list.html",
-        zajecia_list=zajecia_list,
+        zajecia_list=page.items,
+        next_url=page.next_url,
+        after=after,
         delete_form=delete_form,
+        bulk_send_form=BulkSendForm(),
         projekty=projekty,
         selected_projekt=selected_projekt,
+        instruktorzy=User.query.order_by(User.full_name).all(),
+    )
+
+
+@admin_bp.route("/zajecia/eksport")
+@login_required
+@admin_required
+def admin_eksport_zajec():
+    """Stream a ZIP archive with the reports of the selected sessions.
+
+    Sessions of the selected project can be narrowed down with ``od``/``do``
+    (inclusive ISO dates) and ``user_id``.
+    """
+    projekt = resolve_admin_projekt()
+    if projekt is None:
+        flash("Brak projektu do eksportu.")
+        return redirect(url_for("admin.admin_zajecia"))
+    if not os.path.exists(docx_template_path()):
+        current_app.logger.error("admin_eksport_zajec: missing DOCX template")
+        flash("Brak szablonu raportu.")
+        return redirect(url_for("admin.admin_zajecia", projekt_id=projekt.id))
+    query = Zajecia.query.options(
+        joinedload(Zajecia.user), selectinload(Zajecia.beneficjenci)
+    ).filter_by(project_id=projekt.id)
+    od = request.args.get("od", type=date.fromisoformat)
+    do = request.args.get("do", type=date.fromisoformat)
+    user_id = request.args.get("user_id", type=int)
+    if od:
+        query = query.filter(Zajecia.data >= od)
+    if do:
+        query = query.filter(Zajecia.data <= do)
+    if user_id:
+        query = query.filter_by(user_id=user_id)
+    query = query.order_by(Zajecia.data, Zajecia.godzina_od, Zajecia.id)
+    snapshots = load_snapshots(query)
+    # Return the connection to the pool before the slow download starts.
+    db.session.close()
+    stream = export_sessions_zip(
+        snapshots, workers=current_app.config["EXPORT_WORKERS"]
+    )
+    return Response(
+        stream_with_context(stream),
+        mimetype="application/zip",
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{archive_filename(projekt)}"'
+            )
+        },
+    )
+
+
+@admin_bp.route("/zajecia/wyslij-niewyslane", methods=["POST"])
+@login_required
+@admin_required
+def admin_wyslij_niewyslane():
+    """Send reports for every unsent session of the selected project."""
+    form = BulkSendForm()
+    projekt_id = request.form.get("projekt_id", type=int)
+    projekt = db.session.get(Projekt, projekt_id) if projekt_id else None
+    if projekt is None:
+        abort(404)
+    if form.validate_on_submit():
+        result, ids = start_bulk_send(projekt.id)
+        if ids is None:
+            flash(f"Brak raportów do wysłania (bez adresu odbiorcy: {result.skipped}).")
+        else:
+            return redirect(
+                url_for(
+                    "admin.admin_postep_wysylki",
+                    projekt_id=projekt.id,
+                    od=ids[0],
+                    do=ids[1],
+                    pominiete=result.skipped,
+                )
+            )
+    return redirect(url_for("admin.admin_zajecia", projekt_id=projekt.id))
+
+
+@admin_bp.route("/zajecia/wyslij-niewyslane/postep")
+@login_required
+@admin_required
+def admin_postep_wysylki():
+    """Show how far the delivery of a project-wide bulk send has got."""
+    projekt = db.session.get(Projekt, request.args.get("projekt_id", 0, type=int))
+    if projekt is None:
+        abort(404)
+    progress = queued_progress(
+        request.args.get("od", 0, type=int),
+        request.args.get("do", 0, type=int),
+        projekt.id,
+    )
+    progress.skipped = request.args.get("pominiete", 0, type=int)
+    return render_template(
+        "bulk_send_progress.html",
+        progress=progress,
+        back_url=url_for("admin.admin_zajecia", projekt_id=projekt.id),
     )
 
 
@@ -355,6 +498,17 @@ def admin_confirm_uzytkownika(user_id):
     return redirect(url_for("admin.admin_uzytkownicy"))
 
 
+@admin_bp.route("/metryki")
+@login_required
+@admin_required
+def admin_metryki():
+    """Return latency histograms collected by this worker as JSON.
+
+    The same values are served in the Prometheus format at ``/metrics``.
+    """
+    return jsonify({histogram.name: histogram.snapshot() for histogram in HISTOGRAMS})
+
+
 @admin_bp.route("/ustawienia", methods=["GET", "POST"])
 @login_required
 @admin_required
@@ -371,28 +525,7 @@ def admin_ustawienia():
         )
         db.session.add(settings)
         db.session.commit()
-        current_app.config["MAIL_SERVER"] = (
-            settings.mail_server or current_app.config["MAIL_SERVER"]
-        )
-        if settings.mail_port is not None:
-            current_app.config["MAIL_PORT"] = settings.mail_port
-        current_app.config["MAIL_USERNAME"] = (
-            settings.mail_username or current_app.config["MAIL_USERNAME"]
-        )
-        current_app.config["MAIL_PASSWORD"] = (
-            settings.mail_password or current_app.config["MAIL_PASSWORD"]
-        )
-        current_app.config["MAIL_USE_TLS"] = settings.mail_use_tls
-        current_app.config["MAIL_USE_SSL"] = settings.mail_use_ssl
-        current_app.config["TIMEZONE"] = (
-            settings.timezone or current_app.config["TIMEZONE"]
-        )
-        if settings.admin_email:
-            current_app.config["MAIL_DEFAULT_SENDER"] = (
-                settings.mail_sender_name or "",
-                settings.admin_email,
-            )
-        mail.init_app(current_app)
+        apply_settings(current_app._get_current_object(), settings)
     form = SettingsForm(obj=settings)
     if form.validate_on_submit():
         if form.send_test.data:
@@ -419,21 +552,9 @@ def admin_ustawienia():
         settings.admin_email = form.admin_email.data
         settings.mail_sender_name = form.sender_name.data
         settings.timezone = form.timezone.data
+        bump_settings_version(settings)
         db.session.commit()
-        current_app.config["MAIL_SERVER"] = settings.mail_server or current_app.config["MAIL_SERVER"]
-        if settings.mail_port is not None:
-            current_app.config["MAIL_PORT"] = settings.mail_port
-        current_app.config["MAIL_USERNAME"] = settings.mail_username or current_app.config["MAIL_USERNAME"]
-        current_app.config["MAIL_PASSWORD"] = settings.mail_password or current_app.config["MAIL_PASSWORD"]
-        current_app.config["MAIL_USE_TLS"] = settings.mail_use_tls
-        current_app.config["MAIL_USE_SSL"] = settings.mail_use_ssl
-        if settings.admin_email:
-            current_app.config["MAIL_DEFAULT_SENDER"] = (
-                settings.mail_sender_name or "",
-                settings.admin_email,
-            )
-        current_app.config["TIMEZONE"] = settings.timezone or current_app.config["TIMEZONE"]
-        mail.init_app(current_app)
+        apply_settings(current_app._get_current_object(), settings)
         flash("Ustawienia zapisane.")
         return redirect(url_for("admin.admin_ustawienia"))
     return render_template("admin/settings_form.html", form=form)
@@ -497,6 +618,7 @@ def admin_edytuj_projekt(projekt_id):
         else:
             projekt.nazwa = nazwa
             db.session.commit()
+            invalidate_aktywny_projekt()
             flash("Projekt zaktualizowany.")
             return redirect(url_for("admin.admin_projekty"))
     return render_template(
@@ -29,10 +29,14 @@ from ..forms import (
     UserSettingsForm,
 )
 from ..models import User
+from ..passwords import hash_password, needs_rehash, verify_password
+from ..rate_limit import rate_limited
 
 
 auth_bp = Blueprint("auth", __name__)
 
+TOO_MANY_ATTEMPTS = "Zbyt wiele prób. Spróbuj ponownie za kilka minut."
+
 
 @auth_bp.route("/login/", methods=["GET", "POST"])
 @auth_bp.route("/login", methods=["GET", "POST"])
@@ -41,11 +45,17 @@ def login():
     next_url = request.args.get("next")
     form = LoginForm()
     if form.validate_on_submit():
+        if rate_limited("login", form.email.data):
+            flash(TOO_MANY_ATTEMPTS)
+            return render_template("login.html", form=form), 429
         user = User.query.filter_by(email=form.email.data).first()
-        if user and user.check_password(form.password.data):
+        if user and verify_password(user.password_hash, form.password.data):
             if not user.confirmed:
                 flash("Twoje konto nie zostało jeszcze potwierdzone.")
                 return render_template("login.html", form=form)
+            if needs_rehash(user.password_hash):
+                user.password_hash = hash_password(form.password.data)
+                db.session.commit()
             login_user(user, remember=form.remember_me.data)
             if not next_url or urlparse(next_url).netloc != "":
                 next_url = url_for("sessions.nowe_zajecia")
@@ -59,6 +69,9 @@ def register():
     """Create a new user account."""
     form = RegisterForm()
     if form.validate_on_submit():
+        if rate_limited("register", form.email.data):
+            flash(TOO_MANY_ATTEMPTS)
+            return render_template("register.html", form=form), 429
         if User.query.filter_by(email=form.email.data).first():
             flash("Użytkownik z tym adresem email już istnieje.")
             return render_template("register.html", form=form)
@@ -68,7 +81,7 @@ def register():
             email=form.email.data,
             confirmed=False,
         )
-        user.set_password(form.password.data)
+        user.password_hash = hash_password(form.password.data)
         db.session.add(user)
         db.session.commit()
 
@@ -147,7 +160,10 @@ def reset_password(token):
         return redirect(url_for("auth.reset_password_request"))
     form = PasswordResetForm()
     if form.validate_on_submit():
-        user.set_password(form.password.data)
+        if rate_limited("reset_password", user.email):
+            flash(TOO_MANY_ATTEMPTS)
+            return render_template("reset_password.html", form=form), 429
+        user.password_hash = hash_password(form.password.data)
         db.session.commit()
         flash("Hasło zostało zresetowane.")
         return redirect(url_for("auth.login"))
@@ -166,10 +182,12 @@ def user_settings():
         current_user.document_recipient_email = form.document_recipient_email.data
         current_user.session_type = form.session_type.data
         if form.new_password.data:
-            if not current_user.check_password(form.old_password.data):
+            if not verify_password(
+                current_user.password_hash, form.old_password.data
+            ):
                 flash("Nieprawidłowe aktualne hasło.")
                 return render_template("settings.html", form=form)
-            current_user.set_password(form.new_password.data)
+            current_user.password_hash = hash_password(form.new_password.data)
         db.session.commit()
         flash("Ustawienia zapisane.")
         return redirect(url_for("auth.user_settings"))
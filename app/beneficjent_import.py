@@ -0,0 +1,216 @@
+"""Bulk import of beneficiaries from CSV or XLSX files.
+
+Files are read row by row (XLSX through openpyxl's read-only mode), so
+memory does not grow with the file. The first non-empty row is the header
+and must name the ``imie`` and ``wojewodztwo`` columns; names are matched
+without case or diacritics, as are voivodeships, which are stored in the
+spelling of :data:`~app.forms.WOJEWODZTWA`.
+
+Rows already present for the instructor in the edition, or repeated in the
+file, are skipped. The existing ones are read with one query up front.
+New rows are inserted in batches in a single transaction that is only
+committed when the whole file is valid; a dry run validates without
+writing anything.
+"""
+
+import csv
+import io
+import zipfile
+from itertools import chain
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from sqlalchemy import select
+
+from . import db
+from .forms import WOJEWODZTWA
+from .models import Beneficjent, CacheVersion
+from .search import search_cache, search_text
+from .settings_sync import bump_cache_version
+
+BATCH_SIZE = 500
+# Errors listed in the report; the rest are only counted.
+MAX_REPORTED_ERRORS = 50
+EXTENSIONS = ("csv", "xlsx")
+IMIE_MAX_LENGTH = Beneficjent.__table__.c.imie.type.length
+COLUMNS = {
+    "imie": "imie",
+    "imie i nazwisko": "imie",
+    "beneficjent": "imie",
+    "wojewodztwo": "wojewodztwo",
+}
+WOJEWODZTWA_BY_KEY = {search_text(name): name for name in WOJEWODZTWA}
+
+
+class ImportFileError(ValueError):
+    """Raised when a file cannot be read as a list of beneficiaries."""
+
+
+class ImportReport:
+    """Outcome of validating or importing one file."""
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.added = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def imported(self):
+        """True when the rows were written to the database."""
+        return not self.dry_run and not self.error_count
+
+    def summary(self):
+        """Return a short human readable summary in Polish."""
+        if self.imported:
+            verb = "Dodano"
+        elif self.dry_run and not self.error_count:
+            verb = "Do dodania"
+        else:
+            verb = "Nie zaimportowano, poprawne wiersze"
+        return (
+            f"{verb}: {self.added}, pominięte duplikaty: {self.duplicates}, "
+            f"błędy: {self.error_count}"
+        )
+
+
+def _csv_rows(stream):
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        first = text.readline()
+        # Excel in Polish locales writes semicolon-separated files.
+        delimiter = ";" if first.count(";") > first.count(",") else ","
+        yield from csv.reader(chain([first], text), delimiter=delimiter)
+    except UnicodeDecodeError as exc:
+        raise ImportFileError("Plik CSV musi być zapisany w kodowaniu UTF-8.") from exc
+    except csv.Error as exc:
+        raise ImportFileError(f"Nieprawidłowy plik CSV: {exc}.") from exc
+    finally:
+        text.detach()
+
+
+def _xlsx_rows(stream):
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError) as exc:
+        raise ImportFileError("Nieprawidłowy plik XLSX.") from exc
+    try:
+        for row in workbook.active.iter_rows(values_only=True):
+            yield ["" if value is None else str(value) for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(stream, filename):
+    """Yield ``(line, imie, wojewodztwo)`` for each non-empty data row.
+
+    *stream* is a binary file object; *filename* selects the format. Raises
+    :class:`ImportFileError` for unsupported or unreadable files.
+    """
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension not in EXTENSIONS:
+        raise ImportFileError("Obsługiwane są pliki CSV i XLSX.")
+    rows = _csv_rows(stream) if extension == "csv" else _xlsx_rows(stream)
+    positions = None
+    for line, row in enumerate(rows, start=1):
+        if not any(cell.strip() for cell in row):
+            continue
+        if positions is None:
+            positions = {}
+            for index, cell in enumerate(row):
+                column = COLUMNS.get(search_text(cell))
+                if column is not None:
+                    positions.setdefault(column, index)
+            if len(positions) < 2:
+                raise ImportFileError(
+                    "Pierwszy wiersz musi zawierać kolumny "
+                    "„Imię i nazwisko” i „Województwo”."
+                )
+            continue
+        values = [
+            row[positions[column]] if positions[column] < len(row) else ""
+            for column in ("imie", "wojewodztwo")
+        ]
+        yield line, *values
+    if positions is None:
+        raise ImportFileError("Plik jest pusty.")
+
+
+def _flush(batch):
+    if batch:
+        db.session.execute(Beneficjent.__table__.insert(), batch)
+        batch.clear()
+
+
+def import_beneficjenci(
+    rows, user_id, project_id, dry_run=False, batch_size=BATCH_SIZE
+):
+    """Validate *rows* from :func:`read_rows` and insert the new ones.
+
+    Nothing is written when *dry_run* is set or any row is invalid.
+    Returns an :class:`ImportReport`.
+    """
+    report = ImportReport(dry_run)
+    seen = {
+        (search_text(imie), wojewodztwo)
+        for imie, wojewodztwo in db.session.execute(
+            select(Beneficjent.imie, Beneficjent.wojewodztwo).where(
+                Beneficjent.user_id == user_id,
+                Beneficjent.project_id == project_id,
+            )
+        )
+    }
+    batch = []
+    try:
+        for line, imie, wojewodztwo in rows:
+            imie = " ".join(imie.split())
+            canonical = WOJEWODZTWA_BY_KEY.get(search_text(wojewodztwo))
+            if not imie:
+                report.add_error(line, "Brak imienia i nazwiska.")
+                continue
+            if len(imie) > IMIE_MAX_LENGTH:
+                report.add_error(
+                    line, f"Imię i nazwisko dłuższe niż {IMIE_MAX_LENGTH} znaków."
+                )
+                continue
+            if canonical is None:
+                report.add_error(line, f"Nieznane województwo: „{wojewodztwo}”.")
+                continue
+            key = (search_text(imie), canonical)
+            if key in seen:
+                report.duplicates += 1
+                continue
+            seen.add(key)
+            report.added += 1
+            # After the first error nothing will be committed, but the rest
+            # of the file is still checked for the report.
+            if dry_run or report.error_count:
+                continue
+            batch.append(
+                {
+                    "imie": imie,
+                    "wojewodztwo": canonical,
+                    "user_id": user_id,
+                    "project_id": project_id,
+                }
+            )
+            if len(batch) >= batch_size:
+                _flush(batch)
+        if not report.imported:
+            db.session.rollback()
+            return report
+        _flush(batch)
+        # Core inserts bypass the flush hook that clears cached searches.
+        bump_cache_version(db.session, CacheVersion.SEARCH)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    search_cache().clear()
+    return report
@@ -0,0 +1,103 @@
+"""One-off database setup run before the application is served.
+
+Applying migrations and creating the superadmin used to happen inside
+``create_app``, i.e. on every worker boot, test and CLI call. They now run
+from ``flask bootstrap``, which the container executes once before
+starting gunicorn. A lock makes concurrent runs (several containers
+starting together) wait for each other instead of racing on the schema.
+"""
+
+import fcntl
+import os
+from contextlib import contextmanager
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+from . import db
+from .models import Roles, User
+
+# Arbitrary application-wide key of the PostgreSQL advisory lock.
+ADVISORY_LOCK_KEY = 7_318_450_260
+
+
+@contextmanager
+def _file_lock(path):
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def bootstrap_lock():
+    """Hold an exclusive lock shared by every process using the database.
+
+    PostgreSQL uses a session advisory lock; SQLite, whose file is shared
+    through the instance volume, a lock file next to the database.
+    """
+    engine = db.engine
+    if engine.dialect.name == "postgresql":
+        with engine.connect() as connection:
+            connection.execute(
+                text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY}
+            )
+            try:
+                yield
+            finally:
+                connection.execute(
+                    text("SELECT pg_advisory_unlock(:key)"),
+                    {"key": ADVISORY_LOCK_KEY},
+                )
+        return
+    database = engine.url.database
+    if engine.dialect.name == "sqlite" and database and database != ":memory:":
+        path = f"{database}.lock"
+    else:
+        os.makedirs(current_app.instance_path, exist_ok=True)
+        path = os.path.join(current_app.instance_path, "bootstrap.lock")
+    with _file_lock(path):
+        yield
+
+
+def ensure_superadmin(full_name, email, password):
+    """Create or update the superadmin account. Does not commit."""
+    admin = User.query.filter_by(email=email).first()
+    if admin is None:
+        admin = User(full_name=full_name, email=email)
+        db.session.add(admin)
+    admin.full_name = full_name
+    admin.role = Roles.SUPERADMIN
+    admin.confirmed = True
+    if not admin.password_hash or not admin.check_password(password):
+        admin.set_password(password)
+    return admin
+
+
+def bootstrap():
+    """Apply pending migrations and create the superadmin from the env."""
+    username = os.environ.get("SUPERADMIN_USERNAME") or os.environ.get(
+        "ADMIN_USERNAME"
+    )
+    password = os.environ.get("SUPERADMIN_PASSWORD") or os.environ.get(
+        "ADMIN_PASSWORD"
+    )
+    email = os.environ.get("SUPERADMIN_EMAIL") or os.environ.get("ADMIN_EMAIL")
+    with bootstrap_lock():
+        upgrade()
+        if username and password and email:
+            ensure_superadmin(username, email, password)
+            db.session.commit()
+
+
+@click.command("bootstrap")
+@with_appcontext
+def bootstrap_command():
+    """Migrate the database and create the superadmin account."""
+    bootstrap()
+    click.echo("Baza danych gotowa.")
@@ -0,0 +1,296 @@
+"""Bulk delivery of unsent session reports for a project.
+
+Documents are rendered in a thread pool while the main thread sends the
+finished ones through the pooled SMTP sessions of :mod:`app.mail_pool`, so
+rendering the next report overlaps with the network round-trip of the
+previous one. Only a few
+renders run ahead of the sender, so memory does not grow with the project.
+
+Requests from the web interface do not send anything themselves: they
+queue the reports in the outbox and follow the queued rows with
+:func:`queued_progress`.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import exists, func, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from . import db, mail
+from .docx_generator import generate_docx, snapshot_zajecia
+from .docx_store import cleanup, fetch
+from .models import Projekt, SentEmail, User, Zajecia
+from .outbox import drain_in_background, enqueue_session_docx
+from .projekt_utils import get_aktywny_projekt
+from .utils import DOCX_MIMETYPE, build_docx_filename, build_message
+
+
+reports_cli = AppGroup("reports", help="Generate and send session reports.")
+
+BULK_SUBJECT = "Raport zajęć"
+# Rendered documents waiting for the sender, per render worker.
+RENDER_AHEAD = 2
+
+
+class BulkSendResult:
+    """Counters collected while sending a batch of reports."""
+
+    def __init__(self, total):
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.queued = 0
+        self.elapsed = 0.0
+
+    @property
+    def done(self):
+        """Number of sessions handled so far."""
+        return self.sent + self.failed + self.skipped + self.queued
+
+    @property
+    def rate(self):
+        """Throughput in documents per second."""
+        if not self.elapsed:
+            return 0.0
+        return (self.sent + self.failed) / self.elapsed
+
+    def summary(self):
+        """Return a short human readable summary in Polish."""
+        return (
+            f"Wysłano: {self.sent}, błędy: {self.failed}, "
+            f"w kolejce: {self.queued}, bez adresu odbiorcy: {self.skipped} "
+            f"({self.rate:.1f} dok./s)"
+        )
+
+
+def unsent_sessions(projekt_id, user_id=None):
+    """Return sessions of a project whose report was never sent.
+
+    Sessions with a report already waiting in the outbox are left out, so
+    a second bulk send does not queue them again.
+    """
+    pending = exists().where(
+        SentEmail.zajecia_id == Zajecia.id,
+        SentEmail.status.in_([SentEmail.QUEUED, SentEmail.SENDING]),
+    )
+    query = (
+        Zajecia.query.options(
+            joinedload(Zajecia.user), selectinload(Zajecia.beneficjenci)
+        )
+        .filter(
+            Zajecia.project_id == projekt_id,
+            Zajecia.doc_sent_at.is_(None),
+            ~pending,
+        )
+    )
+    if user_id is not None:
+        query = query.filter(Zajecia.user_id == user_id)
+    return query.order_by(Zajecia.data, Zajecia.godzina_od, Zajecia.id).all()
+
+
+def _render(app, snapshot):
+    """Return the stored name and DOCX bytes of the report of ``snapshot``."""
+    with app.app_context():
+        return fetch(
+            snapshot,
+            lambda output: generate_docx(snapshot, snapshot.beneficjenci, output),
+        )
+
+
+def _rendered(executor, app, jobs, ahead):
+    """Yield ``(zajecia, recipient, future)`` with at most *ahead* renders queued."""
+    pending = deque()
+    for zajecia, recipient in jobs:
+        future = executor.submit(_render, app, snapshot_zajecia(zajecia))
+        pending.append((zajecia, recipient, future))
+        if len(pending) >= ahead:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
+def _split_jobs(sessions, result):
+    jobs = []
+    for zajecia in sessions:
+        recipient = zajecia.user.document_recipient_email
+        if recipient:
+            jobs.append((zajecia, recipient))
+        else:
+            result.skipped += 1
+    return jobs
+
+
+def queue_unsent_reports(projekt_id, user_id=None):
+    """Queue every unsent report of a project in the outbox.
+
+    Returns the counters and the ``(first, last)`` ids of the queued rows,
+    or ``None`` when nothing was queued. The caller commits.
+    """
+    sessions = unsent_sessions(projekt_id, user_id)
+    result = BulkSendResult(len(sessions))
+    rows = [
+        enqueue_session_docx(zajecia, recipient, BULK_SUBJECT)
+        for zajecia, recipient in _split_jobs(sessions, result)
+    ]
+    result.queued = len(rows)
+    if not rows:
+        return result, None
+    db.session.flush()
+    ids = [row.id for row in rows]
+    return result, (min(ids), max(ids))
+
+
+def start_bulk_send(projekt_id, user_id=None):
+    """Queue unsent reports for delivery outside the current request.
+
+    Without ``MAIL_OUTBOX`` there is no worker process, so this process
+    delivers them from a background thread. Returns the same values as
+    :func:`queue_unsent_reports`.
+    """
+    result, ids = queue_unsent_reports(projekt_id, user_id)
+    db.session.commit()
+    if ids is not None and not current_app.config["MAIL_OUTBOX"]:
+        drain_in_background(current_app._get_current_object())
+    return result, ids
+
+
+def queued_progress(first_id, last_id, projekt_id, user_id=None):
+    """Return counters for the outbox rows queued by one bulk send.
+
+    ``queued`` counts the rows still waiting, including retries.
+    """
+    query = (
+        select(SentEmail.status, func.count())
+        .join(Zajecia, Zajecia.id == SentEmail.zajecia_id)
+        .where(
+            SentEmail.id.between(first_id, last_id),
+            SentEmail.subject == BULK_SUBJECT,
+            Zajecia.project_id == projekt_id,
+        )
+        .group_by(SentEmail.status)
+    )
+    if user_id is not None:
+        query = query.where(Zajecia.user_id == user_id)
+    counts = dict(db.session.execute(query).all())
+    result = BulkSendResult(sum(counts.values()))
+    result.sent = counts.get(SentEmail.SENT, 0)
+    result.failed = counts.get(SentEmail.ERROR, 0)
+    result.queued = result.total - result.sent - result.failed
+    return result
+
+
+def send_unsent_reports(projekt_id, user_id=None, workers=4, progress=None):
+    """Send every unsent report of a project and return the counters.
+
+    ``progress`` is called with the :class:`BulkSendResult` after each
+    session. When ``MAIL_OUTBOX`` is enabled the reports are queued for the
+    outbox worker instead of being sent here.
+    """
+    if current_app.config["MAIL_OUTBOX"]:
+        result, _ = queue_unsent_reports(projekt_id, user_id)
+        db.session.commit()
+        if progress:
+            progress(result)
+        return result
+
+    sessions = unsent_sessions(projekt_id, user_id)
+    result = BulkSendResult(len(sessions))
+    jobs = _split_jobs(sessions, result)
+    app = current_app._get_current_object()
+    workers = max(workers, 1)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for zajecia, recipient, future in _rendered(
+            executor, app, jobs, workers * RENDER_AHEAD
+        ):
+            sent_at = None
+            status = SentEmail.ERROR
+            file_path = None
+            try:
+                file_path, data = future.result()
+                attachment = (build_docx_filename(zajecia), DOCX_MIMETYPE, data)
+                message = build_message(
+                    BULK_SUBJECT, [recipient], "", attachments=[attachment]
+                )
+                mail.send(message)
+                sent_at = datetime.now(UTC)
+                status = SentEmail.SENT
+            except Exception:
+                # Like the outbox worker, any failure only fails this
+                # message and the batch continues.
+                current_app.logger.exception(
+                    "bulk send: zajecia %s failed", zajecia.id
+                )
+            if status == SentEmail.SENT:
+                zajecia.doc_sent_at = sent_at
+                result.sent += 1
+            else:
+                result.failed += 1
+            db.session.add(
+                SentEmail(
+                    zajecia_id=zajecia.id,
+                    recipient=recipient,
+                    subject=BULK_SUBJECT,
+                    sent_at=sent_at,
+                    status=status,
+                    file_path=file_path,
+                )
+            )
+            db.session.commit()
+            result.elapsed = time.perf_counter() - start
+            if progress:
+                progress(result)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+@reports_cli.command("send-unsent")
+@click.option("--projekt", "projekt_name", help="Project name (default: active).")
+@click.option("--user-email", help="Only sessions of this instructor.")
+@click.option("--workers", default=4, show_default=True)
+def send_unsent_command(projekt_name, user_email, workers):
+    """Send reports for all sessions of a project without a sent report."""
+    if projekt_name:
+        projekt = Projekt.query.filter_by(nazwa=projekt_name).first()
+    else:
+        projekt = get_aktywny_projekt()
+    if projekt is None:
+        raise click.ClickException("Nie znaleziono projektu.")
+    user_id = None
+    if user_email:
+        user = User.query.filter_by(email=user_email).first()
+        if user is None:
+            raise click.ClickException("Nie znaleziono użytkownika.")
+        user_id = user.id
+
+    def report(result):
+        click.echo(
+            f"\r{result.done}/{result.total} ({result.rate:.1f} dok./s)",
+            nl=False,
+        )
+
+    result = send_unsent_reports(
+        projekt.id, user_id=user_id, workers=workers, progress=report
+    )
+    click.echo()
+    click.echo(f"{projekt.nazwa}: {result.summary()}")
+
+
+@reports_cli.command("cleanup-docx")
+@click.option(
+    "--max-age-hours",
+    default=24.0,
+    show_default=True,
+    help="Keep unreferenced documents used more recently than this.",
+)
+def cleanup_docx_command(max_age_hours):
+    """Delete stored reports that no sent email refers to."""
+    removed = cleanup(max_age_hours * 3600)
+    click.echo(f"Usunięto plików: {removed}")
@@ -0,0 +1,89 @@
+"""SQLAlchemy engine configuration for the supported databases.
+
+SQLite (the default file in ``instance/``) suits a single small
+deployment; PostgreSQL, selected with ``DATABASE_URL``, lets several
+workers write concurrently. Pool settings and SQLite pragmas come from the
+configuration so they can be tuned per deployment without code changes.
+"""
+
+import os
+
+from sqlalchemy import event
+
+
+def _env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() == "true"
+
+
+def engine_options(database_uri):
+    """Return ``SQLALCHEMY_ENGINE_OPTIONS`` for *database_uri*.
+
+    ``DB_POOL_SIZE`` and ``DB_MAX_OVERFLOW`` bound the connections held by
+    each process, ``DB_POOL_TIMEOUT`` is how long a request waits for one,
+    ``DB_POOL_RECYCLE`` replaces connections older than that many seconds
+    (before a server or proxy drops them) and ``DB_POOL_PRE_PING`` checks
+    a connection before handing it out.
+    """
+    if database_uri.startswith("sqlite"):
+        # Connections to a local file neither go stale nor need a limit.
+        return {}
+    return {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+    }
+
+
+# Pragma name -> configuration key, applied in this order on every new
+# SQLite connection.
+SQLITE_PRAGMAS = (
+    ("journal_mode", "SQLITE_JOURNAL_MODE"),
+    ("synchronous", "SQLITE_SYNCHRONOUS"),
+    ("busy_timeout", "SQLITE_BUSY_TIMEOUT_MS"),
+    ("mmap_size", "SQLITE_MMAP_SIZE"),
+    ("cache_size", "SQLITE_CACHE_SIZE"),
+)
+
+
+def sqlite_config():
+    """Return the default SQLite pragma settings from the environment.
+
+    WAL lets readers continue while a thread writes and ``synchronous``
+    NORMAL is safe with it; writers wait up to ``busy_timeout`` ms for the
+    lock instead of failing with "database is locked". ``mmap_size`` is in
+    bytes and a negative ``cache_size`` in KiB.
+    """
+    return {
+        "SQLITE_JOURNAL_MODE": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+        "SQLITE_SYNCHRONOUS": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "SQLITE_BUSY_TIMEOUT_MS": int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        "SQLITE_MMAP_SIZE": int(os.environ.get("SQLITE_MMAP_SIZE", 268435456)),
+        "SQLITE_CACHE_SIZE": int(os.environ.get("SQLITE_CACHE_SIZE", -20000)),
+    }
+
+
+def install_sqlite_pragmas(app, engine):
+    """Apply the ``SQLITE_*`` pragmas of *app* to each new connection.
+
+    Does nothing for other databases. A pragma set to an empty value is
+    left at the SQLite default.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, key in SQLITE_PRAGMAS:
+                value = app.config.get(key)
+                if value is None or value == "":
+                    continue
+                cursor.execute(f"PRAGMA {pragma} = {value}")
+        finally:
+            cursor.close()
@@ -0,0 +1,193 @@
+"""Streaming ZIP export of session reports.
+
+Reports are rendered in a process pool and appended to a ZIP archive that
+is handed to the client chunk by chunk. Only the documents in flight are
+held in memory, never the whole archive, so exporting thousands of
+sessions fits in a small container.
+
+The sessions are read into small snapshots before streaming starts, so no
+database connection is held while the client downloads. Each process keeps
+one pool, started with ``spawn`` on first use: forking a threaded gunicorn
+worker that holds pooled database connections is unsafe.
+"""
+
+import atexit
+import io
+import multiprocessing
+import re
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+
+from .docx_generator import docx_template_path, render_docx, snapshot_zajecia
+from .utils import build_docx_filename
+
+ERRORS_FILENAME = "BLEDY.txt"
+_pool_lock = threading.Lock()
+
+
+class _ChunkSink:
+    """Write-only file object collecting what :class:`zipfile.ZipFile` writes.
+
+    It has no ``tell``/``seek``, so ZipFile streams entries with data
+    descriptors instead of seeking back to patch local headers.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Return and forget everything written so far."""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _render(template_path, snapshot):
+    """Render one report; runs in a worker process."""
+    buffer = io.BytesIO()
+    render_docx(template_path, snapshot, snapshot.beneficjenci, buffer)
+    return buffer.getvalue()
+
+
+def _unique_name(name, used):
+    """Return *name*, numbered if an entry of that name already exists."""
+    candidate = name
+    stem, dot, ext = name.rpartition(".")
+    counter = 2
+    while candidate in used:
+        candidate = f"{stem} ({counter}){dot}{ext}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+def _render_pool(workers):
+    """Return the render pool of the current application, starting it once."""
+    app = current_app._get_current_object()
+    with _pool_lock:
+        executor = app.extensions.get("export_pool")
+        if executor is None:
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(executor.shutdown, cancel_futures=True)
+            app.extensions["export_pool"] = executor
+        return executor
+
+
+def _discard_render_pool(executor):
+    """Forget a broken render pool so the next export starts a new one."""
+    app = current_app._get_current_object()
+    with _pool_lock:
+        if app.extensions.get("export_pool") is executor:
+            del app.extensions["export_pool"]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def load_snapshots(query, chunk_size=100):
+    """Return ``(id, snapshot)`` for every session in *query*."""
+    return [
+        (zajecia.id, snapshot_zajecia(zajecia))
+        for zajecia in query.yield_per(chunk_size)
+    ]
+
+
+def archive_filename(projekt):
+    """Return an ASCII download name for the archive of *projekt*."""
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", projekt.nazwa)
+    return f"raporty_{safe}.zip"
+
+
+def export_sessions_zip(snapshots, workers=2, window=None):
+    """Yield a ZIP archive with the reports of *snapshots*.
+
+    *snapshots* are ``(id, snapshot)`` pairs from :func:`load_snapshots`.
+    ``workers`` processes render documents (``0`` renders in the calling
+    thread) and at most ``window`` documents are in flight at a time.
+    Sessions whose report cannot be rendered are listed in ``BLEDY.txt``,
+    including those lost when a worker process dies; the rest of the export
+    then continues in a new pool. Must be consumed within an application
+    context.
+    """
+    template_path = docx_template_path()
+    window = window or max(workers, 1) * 4
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED)
+    used = set()
+    errors = []
+    pending = deque()
+    executor = _render_pool(workers) if workers > 0 else None
+
+    def replace_pool(broken):
+        nonlocal executor
+        _discard_render_pool(broken)
+        if executor is broken:
+            executor = _render_pool(workers)
+
+    def submit(snapshot):
+        if executor is None:
+            return None, None
+        try:
+            return executor, executor.submit(_render, template_path, snapshot)
+        except BrokenProcessPool:
+            # A worker of the cached pool died since it was last used.
+            replace_pool(executor)
+            return executor, executor.submit(_render, template_path, snapshot)
+
+    def write_next():
+        zajecia_id, snapshot, pool, future = pending.popleft()
+        try:
+            if future is None:
+                data = _render(template_path, snapshot)
+            else:
+                data = future.result()
+        except BrokenProcessPool as exc:
+            current_app.logger.error(
+                "export: zajecia %s lost with its render process: %s",
+                zajecia_id,
+                exc,
+            )
+            errors.append(f"{zajecia_id}: {exc}")
+            replace_pool(pool)
+            return
+        except Exception as exc:
+            current_app.logger.exception("export: zajecia %s failed", zajecia_id)
+            errors.append(f"{zajecia_id}: {exc}")
+            return
+        info = zipfile.ZipInfo(
+            _unique_name(build_docx_filename(snapshot), used),
+            date_time=time.localtime()[:6],
+        )
+        archive.writestr(info, data)
+
+    try:
+        for zajecia_id, snapshot in snapshots:
+            pending.append((zajecia_id, snapshot, *submit(snapshot)))
+            if len(pending) >= window:
+                write_next()
+                yield sink.drain()
+        while pending:
+            write_next()
+            yield sink.drain()
+        if errors:
+            archive.writestr(ERRORS_FILENAME, "\n".join(errors) + "\n")
+        archive.close()
+        yield sink.drain()
+    finally:
+        # The pool is shared; only drop this export's queued renders.
+        for _, _, _, future in pending:
+            if future is not None:
+                future.cancel()
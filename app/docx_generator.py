@@ -1,26 +1,217 @@
 """Utilities for rendering session details into a DOCX document."""
 
-import os
+import copy
+import hashlib
 import io
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
 
-from flask import current_app
+from flask import current_app, has_app_context
 from docx import Document
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_ALIGN_VERTICAL
 from docx.shared import Pt
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+
+from .metrics import docx_render_latency
+
+SPECIALIST_PLACEHOLDER = "dietetykiem"
+BENEFICJENT_PREFIX = "Imię i nazwisko beneficjenta:"
+WOJEWODZTWO_PREFIX = "Województwo:"
+SPECJALISTA_PREFIX = "Imię i nazwisko specjalisty:"
+LINE_PREFIXES = (BENEFICJENT_PREFIX, WOJEWODZTWO_PREFIX, SPECJALISTA_PREFIX)
+
+log = logging.getLogger(__name__)
+
+
+def _element_path(element):
+    """Return child indexes leading from the document root to *element*."""
+    path = []
+    parent = element.getparent()
+    while parent is not None:
+        path.append(parent.index(element))
+        element, parent = parent, parent.getparent()
+    return tuple(reversed(path))
+
+
+def _resolve_path(root, path):
+    """Return the element reached by following *path* from *root*."""
+    element = root
+    for index in path:
+        element = element[index]
+    return element
+
+
+class PlaceholderMap:
+    """Locations of every substitution target inside a template.
+
+    The map is built once per parsed template by walking the document the
+    same way the renderer used to: runs of top-level paragraphs and of table
+    cells are checked for :data:`SPECIALIST_PLACEHOLDER`, and top-level
+    paragraphs are matched against :data:`LINE_PREFIXES`. Locations are kept
+    as child-index paths so they can be resolved on any copy of the template
+    without walking the whole document again.
+    """
+
+    def __init__(self, document):
+        runs = []
+        seen = set()
+        paragraphs = list(document.paragraphs)
+        for table in document.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    if id(cell._tc) in seen:
+                        continue
+                    seen.add(id(cell._tc))
+                    paragraphs.extend(cell.paragraphs)
+        for paragraph in paragraphs:
+            for run in paragraph.runs:
+                if SPECIALIST_PLACEHOLDER in run.text:
+                    runs.append(_element_path(run._r))
+
+        lines = []
+        for paragraph in document.paragraphs:
+            text = paragraph.text.strip()
+            for prefix in LINE_PREFIXES:
+                if text.startswith(prefix):
+                    lines.append((prefix, _element_path(paragraph._p)))
+
+        self.specialist_runs = tuple(runs)
+        self.lines = tuple(lines)
+        self.has_specialist_line = any(
+            prefix == SPECJALISTA_PREFIX for prefix, _ in lines
+        )
+
+    def render(self, document, specjalista, values):
+        """Patch *document* in place using the precomputed locations.
+
+        ``values`` maps each line prefix to the text appended after it.
+        """
+        root = document.element
+        for path in self.specialist_runs:
+            run = Run(_resolve_path(root, path), None)
+            run.text = run.text.replace(SPECIALIST_PLACEHOLDER, specjalista)
+        for prefix, path in self.lines:
+            paragraph = Paragraph(_resolve_path(root, path), document._body)
+            paragraph.text = f"{prefix} {values[prefix]}"
+
+
+class TemplateCache:
+    """Process-wide cache of parsed DOCX templates.
+
+    Each template is parsed once and kept in memory keyed by its path. The
+    entry is refreshed whenever the file's modification time or size changes,
+    so replacing ``wzor.docx`` on disk takes effect without a restart. Callers
+    receive a deep copy of the parsed document which they may mutate freely,
+    together with the shared :class:`PlaceholderMap` of the template.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, template_path):
+        stat = os.stat(template_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(template_path)
+            if entry is None or entry[0] != signature:
+                with open(template_path, "rb") as f:
+                    raw = f.read()
+                template = Document(io.BytesIO(raw))
+                entry = (
+                    signature,
+                    template,
+                    PlaceholderMap(template),
+                    hashlib.sha256(raw).hexdigest(),
+                )
+                self._entries[template_path] = entry
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def get(self, template_path):
+        """Return ``(document, placeholders)`` for *template_path*.
+
+        The document is a private copy; the placeholder map is shared and
+        must be treated as read-only.
+        """
+        _, template, placeholders, _ = self._entry(template_path)
+        # Copy the package rather than the ``Document`` proxy: proxies cache
+        # sub-elements which ``deepcopy`` would detach from the copied tree.
+        package = copy.deepcopy(template.part.package)
+        return package.main_document_part.document, placeholders
+
+    def digest(self, template_path):
+        """Return the SHA-256 of the current contents of *template_path*."""
+        return self._entry(template_path)[3]
+
+    def clear(self):
+        """Drop all cached templates and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+template_cache = TemplateCache()
+
+
+def snapshot_zajecia(zajecia):
+    """Copy the fields used by the renderer into a detached object.
+
+    ORM instances must not be shared with rendering threads or processes,
+    which have no access to the request's database session.
+    """
+    beneficjenci = [
+        SimpleNamespace(imie=b.imie, wojewodztwo=b.wojewodztwo)
+        for b in zajecia.beneficjenci
+    ]
+    return SimpleNamespace(
+        data=zajecia.data,
+        godzina_od=zajecia.godzina_od,
+        godzina_do=zajecia.godzina_do,
+        specjalista=zajecia.specjalista,
+        user=SimpleNamespace(full_name=zajecia.user.full_name),
+        beneficjenci=beneficjenci,
+    )
+
+
+def docx_template_path():
+    """Return the path of the DOCX template of the current application."""
+    return os.path.join(current_app.root_path, "static", "wzor.docx")
 
 
 def generate_docx(zajecia, beneficjenci, output_path):
     """Create a DOCX summary for a session and write it to *output_path*."""
 
-    template_path = os.path.join(current_app.root_path, "static", "wzor.docx")
+    template_path = docx_template_path()
     if not os.path.exists(template_path):
         current_app.logger.error("Missing DOCX template: %s", template_path)
         raise FileNotFoundError(f"Template file not found: {template_path}")
+    started = time.perf_counter()
+    try:
+        return render_docx(template_path, zajecia, beneficjenci, output_path)
+    finally:
+        docx_render_latency.observe(time.perf_counter() - started)
+
 
-    # Load the template into memory to avoid mutating the file on disk.
-    with open(template_path, "rb") as f:
-        doc = Document(io.BytesIO(f.read()))
+def render_docx(template_path, zajecia, beneficjenci, output_path):
+    """Render *template_path* for a session without an application context.
+
+    Used directly by worker processes, which only receive plain snapshots
+    of the session.
+    """
+    # Work on a copy of the cached template so the shared instance and the
+    # file on disk are never mutated.
+    doc, placeholders = template_cache.get(template_path)
     start_time = zajecia.godzina_od.strftime("%H:%M")
     end_time = zajecia.godzina_do.strftime("%H:%M")
     names = "\n".join(b.imie for b in beneficjenci[:3])
@@ -37,33 +228,21 @@ def generate_docx(zajecia, beneficjenci, output_path):
         "specjalista": zajecia.user.full_name,
     }
 
-    # Replace occurrences of "dietetykiem" throughout the document.
-    for paragraph in doc.paragraphs:
-        for run in paragraph.runs:
-            run.text = run.text.replace("dietetykiem", zajecia.specjalista)
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.text = run.text.replace("dietetykiem", zajecia.specjalista)
-
-    specialist_found = False
-    for paragraph in doc.paragraphs:
-        text = paragraph.text.strip()
-        if text.startswith("Imię i nazwisko beneficjenta:"):
-            paragraph.text = "Imię i nazwisko beneficjenta: " + names
-        if text.startswith("Województwo:"):
-            paragraph.text = "Województwo: " + wojew
-        if text.startswith("Imię i nazwisko specjalisty:"):
-            paragraph.text = (
-                "Imię i nazwisko specjalisty: " + zajecia.user.full_name
-            )
-            specialist_found = True
-
-    if not specialist_found:
+    # Patch only the precomputed placeholder locations instead of walking
+    # every run of the document.
+    placeholders.render(
+        doc,
+        zajecia.specjalista,
+        {
+            BENEFICJENT_PREFIX: names,
+            WOJEWODZTWO_PREFIX: wojew,
+            SPECJALISTA_PREFIX: zajecia.user.full_name,
+        },
+    )
+
+    if not placeholders.has_specialist_line:
         doc.add_paragraph(
-            f"Imię i nazwisko specjalisty: {zajecia.user.full_name}"
+            f"{SPECJALISTA_PREFIX} {zajecia.user.full_name}"
         )
 
     if doc.tables:
@@ -76,9 +255,8 @@ def generate_docx(zajecia, beneficjenci, output_path):
                     while len(table.rows) <= target_idx:
                         table.add_row()
                 except Exception as exc:
-                    current_app.logger.error(
-                        "Unable to extend table rows: %s", exc
-                    )
+                    logger = current_app.logger if has_app_context() else log
+                    logger.error("Unable to extend table rows: %s", exc)
                     raise ValueError("DOCX template is missing required rows") from exc
             row = table.rows[target_idx]
             values = [context["data"], context["time_range"], zajecia.user.full_name]
@@ -0,0 +1,141 @@
+"""Content-addressed store of rendered session reports.
+
+A report is saved under the SHA-256 of everything that affects its bytes:
+the template contents, :data:`RENDER_VERSION` and the session fields used
+by the renderer. Downloads and resends of an unchanged session reuse the
+stored file, while editing the session, its beneficiaries or the
+instructor's name yields a new key, so stale documents are never served.
+``SentEmail.file_path`` records the exact file that was sent; files no
+row refers to are removed by ``flask reports cleanup-docx``.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import select
+
+from . import db
+from .docx_generator import docx_template_path, template_cache
+from .models import SentEmail
+
+# Bump when generate_docx starts producing different output for the same
+# input, so previously stored documents are no longer reused.
+RENDER_VERSION = 1
+
+
+def document_key(zajecia, template_digest):
+    """Return the content hash identifying the report of *zajecia*."""
+    fields = [
+        RENDER_VERSION,
+        template_digest,
+        zajecia.data.isoformat(),
+        zajecia.godzina_od.isoformat(),
+        zajecia.godzina_do.isoformat(),
+        zajecia.specjalista,
+        zajecia.user.full_name,
+        [[b.imie, b.wojewodztwo] for b in zajecia.beneficjenci],
+    ]
+    raw = json.dumps(fields, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _store_dir():
+    return current_app.config["DOCX_STORE_DIR"]
+
+
+def _relative_path(key):
+    return os.path.join(key[:2], f"{key}.docx")
+
+
+def stored_path(name):
+    """Return the absolute path of a stored document *name*."""
+    return os.path.join(_store_dir(), name)
+
+
+def lookup(key):
+    """Return the stored bytes for *key* or ``None``."""
+    path = stored_path(_relative_path(key))
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    # Keep documents in use younger than the cleanup age.
+    os.utime(path)
+    return data
+
+
+def save(key, data):
+    """Atomically store *data* under *key* and return its relative name."""
+    name = _relative_path(key)
+    path = stored_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return name
+
+
+def fetch(zajecia, render):
+    """Return ``(name, data)`` of the report of *zajecia*.
+
+    ``render(output)`` writes the document and is only called when it is
+    not stored yet. With ``DOCX_STORE_DIR`` unset nothing is stored and
+    ``name`` is ``None``.
+    """
+    try:
+        digest = template_cache.digest(docx_template_path())
+    except FileNotFoundError:
+        digest = None
+    if not _store_dir() or digest is None:
+        # Let the renderer report a missing template.
+        buffer = io.BytesIO()
+        render(buffer)
+        return None, buffer.getvalue()
+    key = document_key(zajecia, digest)
+    data = lookup(key)
+    if data is None:
+        buffer = io.BytesIO()
+        render(buffer)
+        data = buffer.getvalue()
+        save(key, data)
+    return _relative_path(key), data
+
+
+def cleanup(max_age_seconds):
+    """Delete stored files not referenced by any sent email.
+
+    Files touched within *max_age_seconds* are kept, so documents being
+    downloaded or waiting in the outbox survive. Returns the number of
+    removed files.
+    """
+    root = _store_dir()
+    if not root or not os.path.isdir(root):
+        return 0
+    referenced = set(
+        db.session.scalars(
+            select(SentEmail.file_path).where(SentEmail.file_path.isnot(None))
+        )
+    )
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            name = os.path.relpath(path, root)
+            if name in referenced or not filename.endswith((".docx", ".tmp")):
+                continue
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+    return removed
@@ -3,6 +3,7 @@
 from flask import render_template
 
 from . import db
+from .passwords import HashingBusy
 
 
 def register_error_handlers(app):
@@ -17,3 +18,8 @@ def register_error_handlers(app):
         db.session.rollback()
         return render_template("500.html"), 500
 
+    @app.errorhandler(HashingBusy)
+    def hashing_busy_error(error):
+        app.logger.warning("password hashing rejected: %s", error)
+        db.session.rollback()
+        return render_template("503.html"), 503, {"Retry-After": "5"}
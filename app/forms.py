@@ -1,6 +1,7 @@
 """WTForms used to validate and handle user input."""
 
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileAllowed, FileField, FileRequired
 from wtforms import (
     SelectMultipleField,
     SelectField,
@@ -197,6 +198,20 @@ class BeneficjentForm(FlaskForm):
     submit = SubmitField('Zapisz')
 
 
+class BeneficjentImportForm(FlaskForm):
+    """Form uploading a CSV or XLSX list of beneficiaries."""
+
+    plik = FileField(
+        'Plik CSV lub XLSX',
+        validators=[
+            FileRequired(),
+            FileAllowed(['csv', 'xlsx'], 'Obsługiwane są pliki CSV i XLSX.'),
+        ],
+    )
+    dry_run = BooleanField('Tylko sprawdź, bez zapisywania', default=True)
+    submit = SubmitField('Importuj')
+
+
 class DeleteForm(FlaskForm):
     """Simple confirmation form used for delete actions."""
 
@@ -258,3 +273,9 @@ class ActivateProjektForm(FlaskForm):
     """Form to set a project as the active edition."""
 
     submit = SubmitField('Ustaw jako obecny')
+
+
+class BulkSendForm(FlaskForm):
+    """Form triggering delivery of all unsent session reports."""
+
+    submit = SubmitField('Wyślij niewysłane raporty')
@@ -0,0 +1,172 @@
+"""Reusable SMTP connections for Flask-Mail.
+
+Flask-Mail opens a new SMTP session (TCP connect, STARTTLS and AUTH) for
+every ``mail.send`` call. :class:`PooledMail` keeps authenticated sessions
+open for ``MAIL_POOL_IDLE_SECONDS`` and hands them to subsequent sends, so a
+batch of reports pays for the handshake once.
+"""
+
+import smtplib
+import threading
+import time
+
+from flask import current_app
+from flask_mail import Connection, Mail
+
+from .metrics import smtp_send_latency
+
+
+# Errors meaning a pooled session went away while it sat idle; the message
+# is retried once on a fresh connection.
+DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError)
+
+
+def _state_key(state):
+    """Return the connection parameters a pooled session was opened with."""
+    return (
+        state.server,
+        state.port,
+        state.username,
+        state.password,
+        state.use_tls,
+        state.use_ssl,
+    )
+
+
+def _close(connection):
+    """Quit ``connection`` ignoring errors from an already dead socket."""
+    try:
+        connection.host.quit()
+    except (smtplib.SMTPException, OSError):
+        connection.host.close()
+
+
+class SMTPConnectionPool:
+    """Thread-safe pool of open Flask-Mail connections.
+
+    Sessions are keyed by the SMTP settings they were opened with, so a
+    settings change made in the admin panel never reuses a stale session.
+    The counters report how many handshakes were performed, how many were
+    saved by reusing a session and how many pooled sessions had to be
+    reopened after the server dropped them.
+    """
+
+    def __init__(self):
+        self._idle = []
+        self._lock = threading.Lock()
+        self.handshakes = 0
+        self.reused = 0
+        self.reconnects = 0
+
+    def _connect(self, state):
+        connection = Connection(state)
+        connection.host = connection.configure_host()
+        with self._lock:
+            self.handshakes += 1
+        return connection
+
+    def _acquire(self, state, idle_seconds):
+        """Return ``(connection, reused)`` for the given mail settings."""
+        key = _state_key(state)
+        now = time.monotonic()
+        connection = None
+        expired = []
+        with self._lock:
+            keep = []
+            for entry in self._idle:
+                if now - entry[2] >= idle_seconds:
+                    expired.append(entry[1])
+                else:
+                    keep.append(entry)
+            # Prefer the most recently used session for these settings.
+            for index in range(len(keep) - 1, -1, -1):
+                if keep[index][0] == key:
+                    connection = keep.pop(index)[1]
+                    self.reused += 1
+                    break
+            self._idle = keep
+        for stale in expired:
+            _close(stale)
+        if connection is not None:
+            return connection, True
+        return self._connect(state), False
+
+    def _release(self, state, connection, max_idle):
+        with self._lock:
+            if len(self._idle) < max_idle:
+                self._idle.append(
+                    (_state_key(state), connection, time.monotonic())
+                )
+                return
+        _close(connection)
+
+    def send(self, message, state, idle_seconds, max_idle):
+        """Send ``message`` over a pooled connection."""
+        connection, reused = self._acquire(state, idle_seconds)
+        try:
+            message.send(connection)
+        except DISCONNECT_ERRORS:
+            _close(connection)
+            if not reused:
+                raise
+            with self._lock:
+                self.reconnects += 1
+            connection = self._connect(state)
+            try:
+                message.send(connection)
+            except Exception:
+                _close(connection)
+                raise
+        except Exception:
+            _close(connection)
+            raise
+        self._release(state, connection, max_idle)
+
+    def close_all(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, connection, _ in idle:
+            _close(connection)
+
+    def stats(self):
+        """Return a snapshot of the pool counters."""
+        with self._lock:
+            return {
+                "handshakes": self.handshakes,
+                "handshakes_saved": self.reused,
+                "reconnects": self.reconnects,
+                "idle": len(self._idle),
+            }
+
+
+class PooledMail(Mail):
+    """Flask-Mail extension that sends through :class:`SMTPConnectionPool`.
+
+    Pooling is skipped when sending is suppressed or when
+    ``MAIL_POOL_IDLE_SECONDS`` is ``0``.
+    """
+
+    def __init__(self, app=None):
+        self.pool = SMTPConnectionPool()
+        super().__init__(app)
+
+    def send(self, message):
+        """Send ``message`` reusing an open SMTP session when possible."""
+        started = time.perf_counter()
+        status = "error"
+        try:
+            self._send(message)
+            status = "ok"
+        finally:
+            smtp_send_latency.observe(time.perf_counter() - started, status)
+
+    def _send(self, message):
+        app = current_app._get_current_object()
+        state = app.extensions["mail"]
+        idle_seconds = app.config.get("MAIL_POOL_IDLE_SECONDS", 0)
+        if state.suppress or idle_seconds <= 0:
+            return super().send(message)
+        self.pool.send(
+            message, state, idle_seconds, app.config.get("MAIL_POOL_SIZE", 1)
+        )
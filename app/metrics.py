@@ -0,0 +1,148 @@
+"""In-process latency metrics.
+
+Histograms use cumulative buckets like Prometheus so they can be exported
+without conversion. Values live in the memory of each worker process;
+:mod:`app.telemetry` collects them and serves them at ``/metrics``.
+"""
+
+import threading
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def _format_bound(bound):
+    """Format a bucket upper bound as a Prometheus ``le`` label."""
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def _escape(value):
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    """Format a label dict as ``{name="value",...}``."""
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def format_metric(name, documentation, kind, samples):
+    """Return *samples* in the Prometheus text format.
+
+    *samples* is a list of ``(suffix, labels, value)`` tuples.
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for suffix, labels, value in samples:
+        lines.append(f"{name}{suffix}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class Histogram:
+    """Thread-safe histogram of observed durations in seconds."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *labelvalues):
+        """Record *value* for the series identified by *labelvalues*."""
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = {
+                    "counts": [0] * (len(self.buckets) + 1),
+                    "sum": 0.0,
+                }
+            series["counts"][index] += 1
+            series["sum"] += value
+
+    def snapshot(self):
+        """Return a list of series with cumulative ``(le, count)`` buckets."""
+        with self._lock:
+            series = [
+                (labels, list(data["counts"]), data["sum"])
+                for labels, data in self._series.items()
+            ]
+        result = []
+        for labels, counts, total in sorted(series):
+            cumulative = []
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                cumulative.append((_format_bound(bound), running))
+            result.append(
+                {
+                    "labels": dict(zip(self.labelnames, labels)),
+                    "buckets": cumulative,
+                    "count": running,
+                    "sum": total,
+                }
+            )
+        return result
+
+    def exposition(self):
+        """Return the histogram in the Prometheus text format."""
+        samples = []
+        for series in self.snapshot():
+            labels = series["labels"]
+            for bound, count in series["buckets"]:
+                samples.append(("_bucket", {**labels, "le": bound}, count))
+            samples.append(("_sum", labels, repr(series["sum"])))
+            samples.append(("_count", labels, series["count"]))
+        return format_metric(self.name, self.documentation, "histogram", samples)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+search_latency = Histogram(
+    "live_search_duration_seconds",
+    "Time spent answering live search requests.",
+    labelnames=("kind", "source"),
+)
+request_latency = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling requests.",
+    labelnames=("blueprint", "endpoint", "method"),
+)
+request_queries = Histogram(
+    "http_request_db_queries",
+    "Database queries executed per request.",
+    labelnames=("endpoint",),
+    buckets=COUNT_BUCKETS,
+)
+request_query_time = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database queries per request.",
+    labelnames=("endpoint",),
+)
+docx_render_latency = Histogram(
+    "docx_render_duration_seconds",
+    "Time spent rendering DOCX reports.",
+)
+smtp_send_latency = Histogram(
+    "smtp_send_duration_seconds",
+    "Time spent sending e-mails, including the SMTP handshake.",
+    labelnames=("status",),
+)
+
+HISTOGRAMS = (
+    request_latency,
+    request_queries,
+    request_query_time,
+    search_latency,
+    docx_render_latency,
+    smtp_send_latency,
+)
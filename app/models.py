@@ -34,7 +34,7 @@ class User(UserMixin, db.Model):
     full_name = db.Column(db.String(64), nullable=False)
     email = db.Column(db.String(120), unique=True)
     document_recipient_email = db.Column(db.String(120), nullable=True)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(255))
     default_duration = db.Column(db.Integer, default=90)
     role = db.Column(
         db.Enum(Roles, values_callable=lambda e: [r.value for r in e]),
@@ -45,7 +45,9 @@ class User(UserMixin, db.Model):
 
     def set_password(self, password):
         """Store a hashed version of the provided password."""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(
+            password, current_app.config["PASSWORD_HASH_METHOD"]
+        )
 
     def check_password(self, password):
         """Return True if *password* matches the stored hash."""
@@ -87,8 +89,14 @@ class User(UserMixin, db.Model):
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Return the user object for the given *user_id*."""
-    return db.session.get(User, int(user_id))
+    """Return the user object for the given *user_id*.
+
+    Served from :mod:`app.user_cache` so authenticated requests usually
+    skip the query.
+    """
+    from .user_cache import load_user as load_cached_user
+
+    return load_cached_user(int(user_id))
 
 # Additional application models
 
@@ -121,11 +129,20 @@ class Projekt(db.Model):
 class Beneficjent(db.Model):
     """Person receiving consultations stored for a particular user."""
 
+    # Instructor lists filter by owner and project and sort by name; the
+    # admin list pages through a project by (imie, id).
+    __table_args__ = (
+        db.Index('ix_beneficjent_user_project_imie', 'user_id', 'project_id', 'imie'),
+        db.Index('ix_beneficjent_project_imie_id', 'project_id', 'imie', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     imie = db.Column(db.String(100), nullable=False)
     wojewodztwo = db.Column(db.String(100), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    project_id = db.Column(db.Integer, db.ForeignKey('projekt.id'), nullable=False)
+    project_id = db.Column(
+        db.Integer, db.ForeignKey('projekt.id'), nullable=False
+    )
     user = db.relationship('User')
     projekt = db.relationship('Projekt', back_populates='beneficjenci')
 
@@ -136,6 +153,19 @@ class Beneficjent(db.Model):
 class Zajecia(db.Model):
     """Scheduled consultation session with related beneficiaries."""
 
+    # Instructor views filter by owner and project, admin views by project;
+    # both sort by (data, godzina_od).
+    __table_args__ = (
+        db.Index(
+            'ix_zajecia_user_project_data',
+            'user_id',
+            'project_id',
+            'data',
+            'godzina_od',
+        ),
+        db.Index('ix_zajecia_project_data', 'project_id', 'data', 'godzina_od'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     data = db.Column(db.Date, nullable=False)
     godzina_od = db.Column(db.Time, nullable=False)
@@ -159,13 +189,20 @@ class Zajecia(db.Model):
 # Tabela relacyjna: wielu beneficjentów na zajęciach
 zajecia_beneficjenci = db.Table(
     'zajecia_beneficjenci',
-    db.Column('zajecia_id', db.Integer, db.ForeignKey('zajecia.id')),
-    db.Column('beneficjent_id', db.Integer, db.ForeignKey('beneficjent.id')),
+    db.Column('zajecia_id', db.Integer, db.ForeignKey('zajecia.id'), index=True),
+    db.Column(
+        'beneficjent_id', db.Integer, db.ForeignKey('beneficjent.id'), index=True
+    ),
 )
 
 
 class Settings(db.Model):
-    """Application-wide configuration stored in the database."""
+    """Application-wide configuration stored in the database.
+
+    ``settings_version`` is incremented on every change so that each worker
+    process can notice it and reload its configuration, see
+    :mod:`app.settings_sync`.
+    """
 
     id = db.Column(db.Integer, primary_key=True)
     mail_server = db.Column(db.String(255))
@@ -177,6 +214,9 @@ class Settings(db.Model):
     admin_email = db.Column(db.String(120))
     mail_sender_name = db.Column(db.String(120))
     timezone = db.Column(db.String(64))
+    settings_version = db.Column(
+        db.Integer, nullable=False, default=0, server_default="0"
+    )
 
     @classmethod
     def get(cls):
@@ -184,18 +224,63 @@ class Settings(db.Model):
         return cls.query.first()
 
 
+class CacheVersion(db.Model):
+    """Counters bumped whenever data cached per process changes.
+
+    One row per group of caches: ``ROWS`` for logged-in users and the
+    active project, ``SEARCH`` for live search results. Every process
+    compares them with the values it last saw and drops the caches of a
+    counter that moved, see :func:`app.settings_sync.sync_shared_caches`.
+    """
+
+    ROWS = 1
+    SEARCH = 2
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+
+class RateLimitBucket(db.Model):
+    """Token bucket shared by all processes, see :mod:`app.rate_limit`."""
+
+    key = db.Column(db.String(255), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False)
+
+
 class SentEmail(db.Model):
-    """Log entry for a sent email related to a session."""
+    """Log entry for a sent email related to a session.
+
+    Rows double as the outbox: with ``MAIL_OUTBOX`` enabled they are created
+    as ``queued`` and moved through ``sending`` to ``sent`` or ``error`` by
+    the worker in :mod:`app.outbox`.
+    """
+
+    QUEUED = "queued"
+    SENDING = "sending"
+    SENT = "sent"
+    ERROR = "error"
+
+    __table_args__ = (
+        db.Index(
+            'ix_sent_email_status_next_attempt_at', 'status', 'next_attempt_at'
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     zajecia_id = db.Column(
-        db.Integer, db.ForeignKey('zajecia.id', ondelete='CASCADE'), nullable=False
+        db.Integer,
+        db.ForeignKey('zajecia.id', ondelete='CASCADE'),
+        nullable=False,
+        index=True,
     )
     recipient = db.Column(db.String(120), nullable=False)
     subject = db.Column(db.String(255), nullable=False)
     sent_at = db.Column(db.DateTime, nullable=True)
     status = db.Column(db.String(20), nullable=False)
     file_path = db.Column(db.String(255), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=True)
 
     zajecia = db.relationship(
         'Zajecia',
@@ -214,9 +299,11 @@ def _assign_active_project(_mapper, _connection, target):
     """Default new rows to the active project when project_id is unset."""
     if target.project_id is not None:
         return
-    aktywny = Projekt.query.filter_by(status=ProjectStatus.AKTYWNY).first()
-    if aktywny:
-        target.project_id = aktywny.id
+    from .projekt_utils import get_aktywny_projekt_id
+
+    aktywny_id = get_aktywny_projekt_id()
+    if aktywny_id:
+        target.project_id = aktywny_id
 
 
 event.listens_for(Beneficjent, 'before_insert')(_assign_active_project)
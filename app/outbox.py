@@ -0,0 +1,218 @@
+"""Persistent email outbox drained by a separate worker process.
+
+Session reports are queued as :class:`~app.models.SentEmail` rows with the
+``queued`` status. The ``flask outbox worker`` command claims due rows,
+renders and sends the documents and records the outcome, retrying failed
+deliveries with exponential backoff. Without a worker process
+(``MAIL_OUTBOX`` disabled) bulk sends from the web interface are delivered
+by :func:`drain_in_background` instead.
+"""
+
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from . import db, mail
+from .models import SentEmail
+from .settings_sync import refresh_settings
+from .utils import send_session_docx
+
+
+outbox_cli = AppGroup("outbox", help="Manage the outgoing email queue.")
+
+
+def enqueue_session_docx(zajecia, recipient, subject, sent_email=None):
+    """Queue the report for ``zajecia`` and return the outbox row.
+
+    An existing ``sent_email`` row is re-queued in place so resending keeps
+    a single log entry. The caller is responsible for committing.
+    """
+    if sent_email is None:
+        sent_email = SentEmail(
+            zajecia_id=zajecia.id,
+            recipient=recipient,
+            subject=subject,
+        )
+        db.session.add(sent_email)
+    sent_email.status = SentEmail.QUEUED
+    sent_email.attempts = 0
+    sent_email.next_attempt_at = datetime.now(UTC)
+    return sent_email
+
+
+def _claim(email_id, now):
+    """Mark a due row as ``sending`` and return True if this worker won it.
+
+    The row keeps a lease in ``next_attempt_at`` so that a message left in
+    ``sending`` by a crashed worker becomes claimable again.
+    """
+    lease = timedelta(seconds=current_app.config["OUTBOX_LEASE_SECONDS"])
+    result = db.session.execute(
+        db.update(SentEmail)
+        .where(
+            SentEmail.id == email_id,
+            SentEmail.status.in_([SentEmail.QUEUED, SentEmail.SENDING]),
+            SentEmail.next_attempt_at <= now,
+        )
+        .values(status=SentEmail.SENDING, next_attempt_at=now + lease)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def _deliver(sent_email):
+    """Send a claimed row and record the result with retry scheduling.
+
+    Any exception while rendering or sending counts as a failed attempt,
+    so one broken message cannot stop the worker.
+    """
+    try:
+        sent_at, status = send_session_docx(
+            sent_email.zajecia, sent_email.recipient, sent_email.subject, sent_email
+        )
+    except Exception:
+        current_app.logger.exception("outbox: email %s could not be sent", sent_email.id)
+        db.session.rollback()
+        sent_at, status = None, SentEmail.ERROR
+    sent_email.attempts += 1
+    if status == SentEmail.SENT:
+        sent_email.status = SentEmail.SENT
+        sent_email.sent_at = sent_at
+        sent_email.next_attempt_at = None
+        sent_email.zajecia.doc_sent_at = sent_at
+    elif sent_email.attempts < current_app.config["OUTBOX_MAX_ATTEMPTS"]:
+        delay = current_app.config["OUTBOX_RETRY_SECONDS"] * 2 ** (
+            sent_email.attempts - 1
+        )
+        sent_email.status = SentEmail.QUEUED
+        sent_email.next_attempt_at = datetime.now(UTC) + timedelta(seconds=delay)
+        current_app.logger.warning(
+            "outbox: email %s failed (attempt %s), retrying in %ss",
+            sent_email.id,
+            sent_email.attempts,
+            delay,
+        )
+    else:
+        sent_email.status = SentEmail.ERROR
+        sent_email.next_attempt_at = None
+        current_app.logger.error(
+            "outbox: email %s failed after %s attempts",
+            sent_email.id,
+            sent_email.attempts,
+        )
+    db.session.commit()
+    return sent_email.status
+
+
+def process_outbox(batch_size=20):
+    """Deliver up to ``batch_size`` due messages and return how many ran."""
+    now = datetime.now(UTC)
+    due_ids = db.session.scalars(
+        db.select(SentEmail.id)
+        .where(
+            SentEmail.status.in_([SentEmail.QUEUED, SentEmail.SENDING]),
+            SentEmail.next_attempt_at <= now,
+        )
+        .order_by(SentEmail.next_attempt_at, SentEmail.id)
+        .limit(batch_size)
+    ).all()
+    processed = 0
+    for email_id in due_ids:
+        if not _claim(email_id, now):
+            continue
+        sent_email = db.session.get(SentEmail, email_id)
+        if sent_email.zajecia is None:
+            sent_email.status = SentEmail.ERROR
+            db.session.commit()
+            continue
+        _deliver(sent_email)
+        processed += 1
+    return processed
+
+
+def outbox_depth():
+    """Return the number of messages waiting to be delivered."""
+    return db.session.scalar(
+        db.select(db.func.count(SentEmail.id)).where(
+            SentEmail.status.in_([SentEmail.QUEUED, SentEmail.SENDING])
+        )
+    )
+
+
+def drain_outbox(interval=5.0):
+    """Deliver messages, waiting for retries, until none are left queued."""
+    while outbox_depth():
+        if not process_outbox():
+            db.session.remove()
+            time.sleep(interval)
+
+
+def drain_in_background(app):
+    """Drain the outbox from a thread of this process.
+
+    At most one such thread runs per process; returns it, or ``None`` when
+    one is already running.
+    """
+    lock = app.extensions.setdefault("outbox_drain_lock", threading.Lock())
+    if not lock.acquire(blocking=False):
+        return None
+
+    def run():
+        with app.app_context():
+            try:
+                while True:
+                    try:
+                        drain_outbox()
+                    finally:
+                        lock.release()
+                    # A request may have queued more messages after the last
+                    # check and found the lock still taken.
+                    if not outbox_depth() or not lock.acquire(blocking=False):
+                        break
+            except Exception:
+                app.logger.exception("outbox: background delivery failed")
+            finally:
+                db.session.remove()
+
+    thread = threading.Thread(target=run, name="outbox-drain", daemon=True)
+    thread.start()
+    return thread
+
+
+@outbox_cli.command("worker")
+@click.option("--batch-size", default=20, show_default=True)
+@click.option(
+    "--interval",
+    default=5.0,
+    show_default=True,
+    help="Seconds to sleep when the queue is empty.",
+)
+@click.option("--once", is_flag=True, help="Drain due messages and exit.")
+def worker_command(batch_size, interval, once):
+    """Send queued session reports until interrupted."""
+    while True:
+        refresh_settings()
+        processed = process_outbox(batch_size)
+        if processed:
+            stats = mail.pool.stats()
+            click.echo(
+                f"Przetworzono wiadomości: {processed} "
+                f"(połączenia SMTP: {stats['handshakes']}, "
+                f"zaoszczędzone: {stats['handshakes_saved']})"
+            )
+            continue
+        if once:
+            break
+        db.session.remove()
+        time.sleep(interval)
+
+
+@outbox_cli.command("status")
+def status_command():
+    """Print the number of queued messages."""
+    click.echo(f"W kolejce: {outbox_depth()}")
@@ -0,0 +1,90 @@
+"""Keyset (cursor based) pagination for list views.
+
+Pages are selected with a ``WHERE (a, b, id) < (:a, :b, :id)`` condition on
+the sort columns instead of ``OFFSET``, so fetching a later page costs the
+same as fetching the first one. The position is passed between requests as
+an opaque ``after`` cursor.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, time
+
+from flask import request, url_for
+from sqlalchemy import and_, or_
+
+
+class KeysetPage:
+    """One page of results together with the cursor of the next page."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def next_url(self):
+        """URL of the next page of the current view or ``None``."""
+        if not self.next_cursor:
+            return None
+        args = request.args.to_dict()
+        args["after"] = self.next_cursor
+        return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def encode_cursor(values):
+    """Return an URL safe cursor for the sort key ``values``."""
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, (date, time)) else v for v in values]
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, columns):
+    """Return the sort key encoded in ``cursor`` or ``None`` if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(raw, list) or len(raw) != len(columns):
+            return None
+        values = []
+        for column, value in zip(columns, raw):
+            python_type = column.type.python_type
+            if python_type in (date, time):
+                value = python_type.fromisoformat(value)
+            elif not isinstance(value, python_type):
+                return None
+            values.append(value)
+        return values
+    except (ValueError, TypeError, binascii.Error, UnicodeDecodeError):
+        return None
+
+
+def _after(columns, values, descending):
+    """Build the condition selecting rows past ``values`` in sort order."""
+    clause = None
+    for column, value in reversed(list(zip(columns, values))):
+        past = column < value if descending else column > value
+        clause = past if clause is None else or_(past, and_(column == value, clause))
+    return clause
+
+
+def keyset_paginate(query, columns, after=None, per_page=50, descending=True):
+    """Order ``query`` by ``columns`` and return the page following ``after``.
+
+    The last column must be unique (usually the primary key) so that every
+    row has a distinct position.
+    """
+    query = query.order_by(
+        *[column.desc() if descending else column.asc() for column in columns]
+    )
+    values = decode_cursor(after, columns) if after else None
+    if values is not None:
+        query = query.filter(_after(columns, values, descending))
+    items = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return KeysetPage(items, next_cursor)
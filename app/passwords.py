@@ -0,0 +1,94 @@
+"""Password hashing on a bounded pool of worker threads.
+
+scrypt and pbkdf2 are deliberately slow, so a burst of logins hashed on
+the request threads can occupy every gunicorn thread. Views hash and
+verify passwords through :class:`HashingExecutor` instead: at most
+``PASSWORD_HASH_WORKERS`` hashes run at once, at most
+``PASSWORD_HASH_QUEUE`` more may wait, and anything beyond that fails
+fast with :class:`HashingBusy` (answered with 503) rather than queueing
+without bound. Both hash functions release the GIL, so the remaining
+threads keep serving other pages meanwhile.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full or a hash took too long."""
+
+
+class HashingExecutor:
+    """Thread pool that rejects work once its queue is full."""
+
+    def __init__(self, workers, queue_depth):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(workers, 1), thread_name_prefix="password-hash"
+        )
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + queue_depth)
+
+    def run(self, fn, *args, timeout=None):
+        """Return ``fn(*args)`` computed on the pool or raise :class:`HashingBusy`."""
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy("password hashing queue is full")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _future: self._slots.release())
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy("password hashing timed out") from None
+
+
+def hashing_executor():
+    """Return the hashing executor of the current application."""
+    executor = current_app.extensions.get("password_hashing")
+    if executor is None:
+        executor = current_app.extensions.setdefault(
+            "password_hashing",
+            HashingExecutor(
+                current_app.config["PASSWORD_HASH_WORKERS"],
+                current_app.config["PASSWORD_HASH_QUEUE"],
+            ),
+        )
+    return executor
+
+
+def _run(fn, *args):
+    return hashing_executor().run(
+        fn, *args, timeout=current_app.config["PASSWORD_HASH_TIMEOUT"]
+    )
+
+
+def hash_password(password):
+    """Return a hash of *password* using ``PASSWORD_HASH_METHOD``."""
+    return _run(
+        generate_password_hash, password, current_app.config["PASSWORD_HASH_METHOD"]
+    )
+
+
+def verify_password(password_hash, password):
+    """Return True if *password* matches *password_hash*."""
+    if not password_hash:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+@lru_cache(maxsize=8)
+def _hash_parameters(method):
+    """Return the ``method:params`` prefix werkzeug writes for *method*."""
+    return generate_password_hash("", method).split("$", 1)[0]
+
+
+def needs_rehash(password_hash):
+    """Return True if *password_hash* was made with other hash parameters."""
+    method = current_app.config["PASSWORD_HASH_METHOD"]
+    return password_hash.split("$", 1)[0] != _hash_parameters(method)
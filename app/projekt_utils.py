@@ -1,16 +1,150 @@
-"""Helpers for project context and scoping."""
+"""Helpers for project context and scoping.
 
+The active project is looked up on almost every request (context processor,
+access checks, list filters, the ``before_insert`` hook), so it is memoized
+on :data:`flask.g` for the duration of a request and kept as a detached copy
+in a short-lived per-process cache. :func:`ustaw_jako_aktywny` and project
+edits call :func:`invalidate_aktywny_projekt`. A flushed change of a
+project's status or name also bumps the shared cache version, so other
+processes drop their copy within ``SETTINGS_CHECK_SECONDS``, see
+:func:`app.settings_sync.sync_shared_caches`.
+"""
+
+import threading
+import time
 from datetime import UTC, datetime
 
-from flask import request
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
 
 from . import db
 from .models import ProjectStatus, Projekt
+from .settings_sync import (
+    bump_cache_version,
+    has_column_changes,
+    sync_shared_caches,
+)
+
+_G_KEY = "_aktywny_projekt"
+# Columns deciding which project is active and how it is shown; sessions or
+# beneficiaries added to a project's collections do not affect the cache.
+_CACHED_COLUMNS = ("status", "nazwa")
+_MISSING = object()
+
+
+class _AktywnyProjektCache:
+    """Per-process copy of the active project with an expiry time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._projekt = _MISSING
+        self._expires = 0.0
+        self.generation = 0
+
+    def get(self):
+        """Return the cached project, ``None`` or ``_MISSING`` if expired."""
+        with self._lock:
+            if time.monotonic() < self._expires:
+                return self._projekt
+            return _MISSING
+
+    def set(self, projekt, ttl, generation):
+        """Store *projekt* unless the cache was invalidated meanwhile."""
+        with self._lock:
+            if generation == self.generation:
+                self._projekt = projekt
+                self._expires = time.monotonic() + ttl
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._projekt = _MISSING
+            self._expires = 0.0
+
+
+def _process_cache():
+    cache = current_app.extensions.get("aktywny_projekt")
+    if cache is None:
+        cache = current_app.extensions.setdefault(
+            "aktywny_projekt", _AktywnyProjektCache()
+        )
+    return cache
+
+
+def _detached_copy(projekt):
+    """Return a session-less copy of *projekt* safe to share across threads."""
+    copy = Projekt(
+        **{
+            attr.key: getattr(projekt, attr.key)
+            for attr in inspect(Projekt).column_attrs
+        }
+    )
+    make_transient_to_detached(copy)
+    return copy
 
 
 def get_aktywny_projekt():
     """Return the currently active project or ``None``."""
-    return Projekt.query.filter_by(status=ProjectStatus.AKTYWNY).first()
+    projekt = g.get(_G_KEY, _MISSING)
+    if projekt is not _MISSING and (projekt is None or projekt in db.session):
+        return projekt
+    sync_shared_caches()
+    cache = _process_cache()
+    cached = cache.get()
+    if cached is not _MISSING:
+        # merge(load=False) attaches the copy to this session without a query
+        projekt = db.session.merge(cached, load=False) if cached else None
+    else:
+        generation = cache.generation
+        projekt = Projekt.query.filter_by(status=ProjectStatus.AKTYWNY).first()
+        cache.set(
+            _detached_copy(projekt) if projekt else None,
+            current_app.config["AKTYWNY_PROJEKT_CACHE_SECONDS"],
+            generation,
+        )
+    setattr(g, _G_KEY, projekt)
+    return projekt
+
+
+def get_aktywny_projekt_id():
+    """Return the id of the active project without touching the session.
+
+    Safe to call while the session is flushing, e.g. from mapper events.
+    """
+    projekt = g.get(_G_KEY, _MISSING)
+    if projekt is _MISSING:
+        sync_shared_caches()
+        projekt = _process_cache().get()
+    if projekt is _MISSING:
+        return db.session.execute(
+            select(Projekt.id).filter_by(status=ProjectStatus.AKTYWNY)
+        ).scalar()
+    return inspect(projekt).identity[0] if projekt is not None else None
+
+
+def invalidate_aktywny_projekt():
+    """Forget cached copies of the active project in this process."""
+    _process_cache().clear()
+    g.pop(_G_KEY, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_projekt_change(session, _flush_context):
+    """Make every process drop its active project when it may have changed."""
+    if not has_app_context():
+        return
+    changed = any(
+        isinstance(obj, Projekt) for obj in session.deleted
+    ) or any(
+        isinstance(obj, Projekt) and obj.status == ProjectStatus.AKTYWNY
+        for obj in session.new
+    ) or any(
+        isinstance(obj, Projekt) and has_column_changes(obj, _CACHED_COLUMNS)
+        for obj in session.dirty
+    )
+    if changed:
+        bump_cache_version(session)
 
 
 def ustaw_jako_aktywny(projekt):
@@ -22,6 +156,7 @@ def ustaw_jako_aktywny(projekt):
     projekt.status = ProjectStatus.AKTYWNY
     projekt.zarchiwizowano = None
     db.session.commit()
+    invalidate_aktywny_projekt()
 
 
 def resolve_admin_projekt():
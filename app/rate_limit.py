@@ -0,0 +1,161 @@
+"""Token-bucket throttling of login, registration and password resets.
+
+Every attempt takes one token from a bucket of the client IP and one from
+a bucket of the e-mail address it targets. A bucket holds
+``RATE_LIMIT_PER_IP`` or ``RATE_LIMIT_PER_EMAIL`` tokens and refills
+completely over ``RATE_LIMIT_PERIOD`` seconds, so short bursts pass while
+sustained guessing is rejected before any password is hashed.
+
+Buckets live in process memory by default. With several gunicorn workers
+set ``RATE_LIMIT_STORAGE=database`` to share them through the
+``rate_limit_bucket`` table; other stores only need a ``consume`` method.
+"""
+
+import threading
+import time
+
+from flask import current_app, request
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from . import db
+from .models import RateLimitBucket
+
+
+def _refill(tokens, updated_at, capacity, period, now):
+    """Return the tokens of a bucket after refilling it until *now*."""
+    return min(capacity, tokens + max(now - updated_at, 0) * capacity / period)
+
+
+class MemoryBucketStore:
+    """Buckets of a single process, dropped once they are full again."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def consume(self, key, capacity, period, now):
+        """Take a token from bucket *key*; return False if it is empty."""
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry is None:
+                tokens = capacity
+                if len(self._buckets) >= self.max_entries:
+                    self._prune(now)
+            else:
+                tokens = _refill(entry[0], entry[1], capacity, period, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, capacity, period)
+            return allowed
+
+    def _prune(self, now):
+        """Forget full buckets, or the least recently used one if none is."""
+        self._buckets = {
+            key: entry
+            for key, entry in self._buckets.items()
+            if _refill(*entry, now) < entry[2]
+        }
+        if len(self._buckets) >= self.max_entries:
+            oldest = min(self._buckets, key=lambda key: self._buckets[key][1])
+            del self._buckets[oldest]
+
+
+class DatabaseBucketStore:
+    """Buckets stored in the ``rate_limit_bucket`` table.
+
+    Each attempt runs in its own short transaction on a separate
+    connection, so it neither commits nor waits for the request session.
+    When the database stays locked past its busy timeout the attempt is
+    let through and logged: throttling must not turn logins into errors.
+    """
+
+    def consume(self, key, capacity, period, now):
+        """Take a token from bucket *key*; return False if it is empty."""
+        table = RateLimitBucket.__table__
+        try:
+            with db.engine.begin() as connection:
+                if connection.dialect.name == "sqlite":
+                    # Take the write lock before reading: upgrading a read
+                    # transaction fails at once when another process has
+                    # written meanwhile, without waiting for busy_timeout.
+                    connection.exec_driver_sql("BEGIN IMMEDIATE")
+                row = connection.execute(
+                    select(table.c.tokens, table.c.updated_at)
+                    .where(table.c.key == key)
+                    .with_for_update()
+                ).first()
+                if row is None:
+                    tokens = capacity
+                else:
+                    tokens = _refill(row.tokens, row.updated_at, capacity, period, now)
+                allowed = tokens >= 1
+                if allowed:
+                    tokens -= 1
+                values = {"tokens": tokens, "updated_at": now}
+                if row is None:
+                    connection.execute(insert(table).values(key=key, **values))
+                else:
+                    connection.execute(
+                        update(table).where(table.c.key == key).values(**values)
+                    )
+        except IntegrityError:
+            # A concurrent first attempt created the bucket; it counted.
+            return True
+        except OperationalError:
+            current_app.logger.warning(
+                "rate limit: bucket %s unavailable, attempt allowed",
+                key,
+                exc_info=True,
+            )
+            return True
+        return allowed
+
+
+BUCKET_STORES = {
+    "memory": MemoryBucketStore,
+    "database": DatabaseBucketStore,
+}
+
+
+def bucket_store():
+    """Return the bucket store of the current application."""
+    store = current_app.extensions.get("rate_limit")
+    if store is None:
+        name = current_app.config["RATE_LIMIT_STORAGE"]
+        try:
+            factory = BUCKET_STORES[name]
+        except KeyError:
+            raise RuntimeError(f"Unknown RATE_LIMIT_STORAGE: {name!r}") from None
+        store = current_app.extensions.setdefault("rate_limit", factory())
+    return store
+
+
+def rate_limited(scope, email=None):
+    """Count an attempt of *scope*; return True if it must be rejected.
+
+    The attempt is charged to the client IP and, when given, to *email*.
+    A limit or period of ``0`` disables throttling.
+    """
+    config = current_app.config
+    period = config["RATE_LIMIT_PERIOD"]
+    if period <= 0:
+        return False
+    buckets = [(f"{scope}:ip:{request.remote_addr}", config["RATE_LIMIT_PER_IP"])]
+    if email:
+        buckets.append(
+            (f"{scope}:email:{email.strip().lower()}", config["RATE_LIMIT_PER_EMAIL"])
+        )
+    store = bucket_store()
+    now = time.time()
+    limited = False
+    for key, capacity in buckets:
+        if capacity > 0 and not store.consume(key[:255], capacity, period, now):
+            limited = True
+    if limited:
+        current_app.logger.warning(
+            "%s: too many attempts from %s", scope, request.remote_addr
+        )
+    return limited
@@ -0,0 +1,268 @@
+"""Search filters for the session and beneficiary lists.
+
+Free text is matched against a full-text index created by migration
+``9a7c3e5f1b2d``: FTS5 tables kept in sync by triggers on SQLite and
+``tsvector`` expression indexes on PostgreSQL. Both ignore Polish
+diacritics, so ``lodz`` finds ``Łódź``. Other databases, or a SQLite build
+without FTS5, fall back to ``ILIKE``. Queries that look like a date
+(``2025``, ``2025-03``, ``14.03.2025``) filter on a date range instead.
+"""
+
+import calendar
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import date, timedelta
+from itertools import chain
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, event, func, inspect, literal_column, or_, select, table
+from sqlalchemy.orm import Session
+
+from . import db
+from .models import Beneficjent, CacheVersion, Zajecia
+from .settings_sync import bump_cache_version, sync_shared_caches
+
+# "ł" has no Unicode decomposition; the index triggers fold it the same way.
+_FOLD = str.maketrans({"ł": "l", "Ł": "L"})
+_TOKEN = re.compile(r"\w+")
+_ISO_DATE = re.compile(r"^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$")
+_PL_DATE = re.compile(r"^(?:(\d{1,2})\.)?(\d{1,2})\.(\d{4})$")
+
+ZAJECIA_FTS = "zajecia_fts"
+BENEFICJENT_FTS = "beneficjent_fts"
+
+
+def fold(text):
+    """Return *text* lower-cased and without diacritics."""
+    decomposed = unicodedata.normalize("NFKD", text.translate(_FOLD))
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def tokens(text):
+    """Split a search query into folded word tokens."""
+    return _TOKEN.findall(fold(text))
+
+
+def search_text(*values):
+    """Return the folded tokens of *values* joined by spaces."""
+    return " ".join(tokens(" ".join(values)))
+
+
+def parse_date_range(text):
+    """Return ``(start, end)`` for a date-like query or ``None``.
+
+    ``end`` is exclusive. Supports ``YYYY``, ``YYYY-MM``, ``YYYY-MM-DD``,
+    ``MM.YYYY`` and ``DD.MM.YYYY``.
+    """
+    text = text.strip()
+    match = _ISO_DATE.match(text)
+    if match:
+        year, month, day = match.groups()
+    else:
+        match = _PL_DATE.match(text)
+        if not match:
+            return None
+        day, month, year = match.groups()
+    try:
+        year = int(year)
+        if month is None:
+            return date(year, 1, 1), date(year + 1, 1, 1)
+        month = int(month)
+        if day is None:
+            start = date(year, month, 1)
+            days = calendar.monthrange(year, month)[1]
+            return start, start + timedelta(days=days)
+        start = date(year, month, int(day))
+        return start, start + timedelta(days=1)
+    except ValueError:
+        return None
+
+
+def _backend():
+    """Return ``"fts5"``, ``"postgresql"`` or ``"like"`` for the current DB."""
+    engine = db.engine
+    backends = current_app.extensions.setdefault("search_backend", {})
+    backend = backends.get(engine.url)
+    if backend is None:
+        if engine.dialect.name == "postgresql":
+            backend = "postgresql"
+        elif engine.dialect.name == "sqlite" and inspect(engine).has_table(
+            ZAJECIA_FTS
+        ):
+            backend = "fts5"
+        else:
+            backend = "like"
+        backends[engine.url] = backend
+    return backend
+
+
+def _fts5_match(model, fts_table, words):
+    """Restrict *model* rows to those whose FTS5 row matches all *words*."""
+    expression = " ".join(f'"{word}"*' for word in words)
+    matching = (
+        select(literal_column("rowid"))
+        .select_from(table(fts_table))
+        .where(literal_column(fts_table).match(expression))
+    )
+    return model.id.in_(matching)
+
+
+def _tsvector(*columns):
+    """Build the expression indexed by the PostgreSQL search indexes."""
+    document = columns[0]
+    for column in columns[1:]:
+        document = document.op("||")(literal_column("' '")).op("||")(column)
+    return func.to_tsvector(
+        literal_column("'simple'::regconfig"), func.immutable_unaccent(document)
+    )
+
+
+def _tsquery_match(words, *columns):
+    query = " & ".join(f"{word}:*" for word in words)
+    return _tsvector(*columns).op("@@")(
+        func.to_tsquery(literal_column("'simple'::regconfig"), query)
+    )
+
+
+def _text_filter(model, fts_table, columns, text):
+    words = tokens(text)
+    if not words:
+        return None
+    backend = _backend()
+    if backend == "fts5":
+        return _fts5_match(model, fts_table, words)
+    if backend == "postgresql":
+        return _tsquery_match(words, *columns)
+    return and_(
+        *[
+            or_(*[column.ilike(f"%{word}%") for column in columns])
+            for word in _TOKEN.findall(text)
+        ]
+    )
+
+
+def filter_zajecia(query, text):
+    """Apply the search *text* to a :class:`Zajecia` query."""
+    date_range = parse_date_range(text)
+    if date_range:
+        start, end = date_range
+        return query.filter(Zajecia.data >= start, Zajecia.data < end)
+    condition = _text_filter(Zajecia, ZAJECIA_FTS, [Zajecia.specjalista], text)
+    return query if condition is None else query.filter(condition)
+
+
+def filter_beneficjenci(query, text):
+    """Apply the search *text* to a :class:`Beneficjent` query."""
+    condition = _text_filter(
+        Beneficjent,
+        BENEFICJENT_FTS,
+        [Beneficjent.imie, Beneficjent.wojewodztwo],
+        text,
+    )
+    return query if condition is None else query.filter(condition)
+
+
+def matches(search, words):
+    """Return True if every word is a prefix of a token of *search*.
+
+    Mirrors the prefix matching of the full-text index so cached results
+    can be narrowed down without a query.
+    """
+    haystack = search.split(" ")
+    return all(any(t.startswith(word) for t in haystack) for word in words)
+
+
+class SearchCache:
+    """Short-lived cache of live search results.
+
+    Entries are keyed by a scope (user, project, list) and the folded
+    query. A query missing from the cache can still be answered from the
+    complete result of one of its prefixes, since typing more characters
+    only narrows the result down. Items must have a ``search`` attribute
+    built with :func:`search_text`.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def key(text):
+        return " ".join(fold(text).split())
+
+    def _fresh(self, cache_key, now):
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._entries[cache_key]
+            return None
+        self._entries.move_to_end(cache_key)
+        return entry
+
+    def get(self, scope, text):
+        """Return ``(items, next_cursor)`` for *text* or ``None``."""
+        key = self.key(text)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._fresh((scope, key), now)
+            if entry is not None:
+                return entry[1], entry[2]
+            if parse_date_range(text):
+                return None
+            words = tokens(text)
+            for end in range(len(key) - 1, 0, -1):
+                entry = self._fresh((scope, key[:end]), now)
+                if entry is not None and entry[2] is None and entry[3]:
+                    return [i for i in entry[1] if matches(i.search, words)], None
+        return None
+
+    def put(self, scope, text, items, next_cursor, ttl):
+        """Store the result of *text*; only complete results are refined."""
+        if ttl <= 0:
+            return
+        refinable = parse_date_range(text) is None
+        with self._lock:
+            self._entries[(scope, self.key(text))] = (
+                time.monotonic() + ttl,
+                items,
+                next_cursor,
+                refinable,
+            )
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def search_cache():
+    """Return the live search cache of the current application.
+
+    It is emptied first if another process changed sessions or
+    beneficiaries, see :func:`app.settings_sync.sync_shared_caches`.
+    """
+    sync_shared_caches()
+    cache = current_app.extensions.get("search_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault("search_cache", SearchCache())
+    return cache
+
+
+@event.listens_for(Session, "after_flush")
+def _clear_search_cache(session, _flush_context):
+    """Drop cached search results in every process when searched rows change."""
+    if not has_app_context():
+        return
+    changed = chain(session.new, session.dirty, session.deleted)
+    if not any(isinstance(obj, (Zajecia, Beneficjent)) for obj in changed):
+        return
+    bump_cache_version(session, CacheVersion.SEARCH)
+    cache = current_app.extensions.get("search_cache")
+    if cache is not None:
+        cache.clear()
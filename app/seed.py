@@ -0,0 +1,365 @@
+"""Synthetic data for scale testing: ``flask seed``.
+
+Rows are generated in batches and written with Core ``INSERT`` statements
+executed once per batch, so no ORM objects are created and the
+``before_insert`` hook assigning the active project never runs; every row
+gets its project explicitly. Primary keys are assigned up front, continuing
+after the existing rows, which lets association rows and e-mail logs
+reference sessions without reading ids back.
+
+On SQLite the secondary indexes and the full-text insert triggers are
+dropped for the duration of the load and recreated afterwards, with the
+search tables filled for the new rows in one ``INSERT ... SELECT``; keeping
+them live made the load three times slower. The drops run in the load's
+transaction, so a failed seed rolls back to the original schema.
+
+Everybody gets the same password, hashed once. The output depends only on
+the counts and ``seed``, so benchmark runs are comparable.
+"""
+
+import random
+import re
+import time
+from datetime import UTC, date, datetime, time as dtime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, text
+from werkzeug.security import generate_password_hash
+
+from . import db
+from .forms import WOJEWODZTWA
+from .models import (
+    Beneficjent,
+    Projekt,
+    SentEmail,
+    User,
+    Zajecia,
+    zajecia_beneficjenci,
+)
+
+BATCH_SIZE = 10_000
+FIRST_NAMES = (
+    "Anna", "Maria", "Katarzyna", "Małgorzata", "Agnieszka", "Barbara",
+    "Piotr", "Krzysztof", "Andrzej", "Tomasz", "Paweł", "Michał",
+)
+LAST_NAMES = (
+    "Nowak", "Kowalska", "Wiśniewski", "Wójcik", "Kowalczyk", "Kamińska",
+    "Lewandowski", "Zielińska", "Szymański", "Woźniak", "Dąbrowska", "Łukasik",
+)
+SPECJALISCI = ("dietetyk", "psycholog", "fizjoterapeuta", "doradca zawodowy")
+FIRST_DAY = date(2023, 1, 1)
+DAYS = 1200
+DAY_LIST = [FIRST_DAY + timedelta(days=day) for day in range(DAYS)]
+HOURS = [
+    (dtime(hour, 0), dtime(hour + 1, minute))
+    for hour in range(8, 19)
+    for minute in (0, 30)
+]
+# Tables whose ids are written explicitly; PostgreSQL sequences are moved
+# past them afterwards.
+SEQUENCED_TABLES = ("user", "projekt", "beneficjent", "zajecia", "sent_email")
+
+
+def _next_id(model):
+    return (db.session.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def _insert(table, rows, batch_size):
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[start:start + batch_size])
+
+
+# Matches single-statement ``AFTER INSERT`` triggers copying ``new`` into
+# another table; anything else is left in place during the load.
+INSERT_TRIGGER_RE = re.compile(
+    r"AFTER INSERT ON (?P<table>\w+) BEGIN (?P<insert>INSERT INTO [^;]+?) "
+    r"VALUES \((?P<values>[^;]*)\); END$"
+)
+
+
+def _defer_sqlite_upkeep(tables):
+    """Drop indexes and insert triggers on *tables* until the load is done.
+
+    Returns what :func:`_restore_sqlite_upkeep` needs to put them back.
+    """
+    if db.session.get_bind().dialect.name != "sqlite":
+        return []
+    connection = db.session.connection()
+    if not connection.connection.dbapi_connection.in_transaction:
+        # pysqlite only opens a transaction before DML, so the drops would
+        # otherwise be committed on their own and survive a rollback.
+        connection.exec_driver_sql("BEGIN")
+    rows = db.session.execute(
+        text(
+            "SELECT type, name, tbl_name, sql FROM sqlite_master "
+            "WHERE type IN ('index', 'trigger') AND sql IS NOT NULL"
+        )
+    ).all()
+    deferred = []
+    for kind, name, table, sql in rows:
+        if table not in tables:
+            continue
+        if kind == "trigger" and not INSERT_TRIGGER_RE.search(sql):
+            continue
+        db.session.execute(text(f'DROP {kind.upper()} "{name}"'))
+        deferred.append((kind, sql))
+    return deferred
+
+
+def _restore_sqlite_upkeep(deferred, first_ids):
+    """Recreate deferred objects and replay insert triggers for new rows.
+
+    *first_ids* maps table names to the first id inserted by this run.
+    """
+    for kind, sql in deferred:
+        db.session.execute(text(sql))
+        if kind != "trigger":
+            continue
+        match = INSERT_TRIGGER_RE.search(sql)
+        table = match["table"]
+        # Aliasing the source table as ``new`` keeps the trigger's
+        # expressions valid as a select list.
+        db.session.execute(
+            text(
+                f"{match['insert']} SELECT {match['values']} "
+                f"FROM {table} AS new WHERE new.id >= :first"
+            ),
+            {"first": first_ids[table]},
+        )
+
+
+def _ensure_projects(count, now):
+    """Create archived editions until there are *count*.
+
+    Returns the ids of all editions and the number created.
+    """
+    existing = db.session.scalars(select(Projekt.id).order_by(Projekt.id)).all()
+    first = _next_id(Projekt)
+    missing = max(count - len(existing), 0)
+    rows = [
+        {
+            "id": first + i,
+            "nazwa": f"Edycja testowa {first + i}",
+            "status": "archiwum",
+            "utworzono": now,
+            "zarchiwizowano": now,
+        }
+        for i in range(missing)
+    ]
+    _insert(Projekt.__table__, rows, BATCH_SIZE)
+    return list(existing) + [row["id"] for row in rows], len(rows)
+
+
+def _reset_sequences():
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+    for table in SEQUENCED_TABLES:
+        db.session.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                f"(SELECT MAX(id) FROM \"{table}\"))"
+            )
+        )
+
+
+def seed_database(
+    users,
+    sessions,
+    beneficjenci=None,
+    projects=4,
+    email_ratio=0.5,
+    password="haslo",
+    seed=1,
+    batch_size=BATCH_SIZE,
+):
+    """Insert synthetic users, beneficiaries, sessions and e-mail logs.
+
+    Sessions are spread over *projects* editions (created as archived when
+    fewer exist) and over the last ``DAYS`` days from ``FIRST_DAY``; each
+    has one or two beneficiaries of its instructor in the same edition.
+    About *email_ratio* of them get a sent report. Returns the number of
+    rows inserted per table.
+    """
+    rng = random.Random(seed)
+    rand = rng.random
+    now = datetime.now(UTC).replace(tzinfo=None)
+    beneficjenci = beneficjenci or max(sessions // 3, users)
+    try:
+        project_ids, created_projects = _ensure_projects(projects, now)
+        names = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+        deferred = _defer_sqlite_upkeep(
+            {"user", "beneficjent", "zajecia", "zajecia_beneficjenci", "sent_email"}
+        )
+
+        first_user = _next_id(User)
+        password_hash = generate_password_hash(
+            password, current_app.config["PASSWORD_HASH_METHOD"]
+        )
+        user_ids = range(first_user, first_user + users)
+        _insert(
+            User.__table__,
+            [
+                {
+                    "id": user_id,
+                    "full_name": rng.choice(names),
+                    "email": f"seed{user_id}@example.com",
+                    "password_hash": password_hash,
+                    "role": "instructor",
+                    "confirmed": True,
+                    "default_duration": 90,
+                }
+                for user_id in user_ids
+            ],
+            batch_size,
+        )
+
+        # Beneficiaries are grouped by (instructor, edition) so sessions can
+        # pick ones they are allowed to reference.
+        first_benef = _next_id(Beneficjent)
+        owners = {}
+        rows = []
+        for benef_id in range(first_benef, first_benef + beneficjenci):
+            user_id = user_ids[(benef_id - first_benef) % users]
+            project_id = project_ids[int(rand() * len(project_ids))]
+            owners.setdefault((user_id, project_id), []).append(benef_id)
+            rows.append(
+                {
+                    "id": benef_id,
+                    "imie": names[int(rand() * len(names))],
+                    "wojewodztwo": WOJEWODZTWA[int(rand() * len(WOJEWODZTWA))],
+                    "user_id": user_id,
+                    "project_id": project_id,
+                }
+            )
+            if len(rows) == batch_size:
+                _insert(Beneficjent.__table__, rows, batch_size)
+                rows = []
+        _insert(Beneficjent.__table__, rows, batch_size)
+
+        # Random picks index with ``rand()`` directly: ``rng.choice`` costs
+        # several times more and this loop runs once per session.
+        counts = {"zajecia_beneficjenci": 0, "sent_email": 0}
+        first_zajecia = _next_id(Zajecia)
+        first_email = next_email = _next_id(SentEmail)
+        zajecia_rows, assoc_rows, email_rows = [], [], []
+        last_zajecia = first_zajecia + sessions - 1
+        for zajecia_id in range(first_zajecia, last_zajecia + 1):
+            user_id = user_ids[int(rand() * users)]
+            project_id = project_ids[int(rand() * len(project_ids))]
+            godzina_od, godzina_do = HOURS[int(rand() * len(HOURS))]
+            zajecia_rows.append(
+                {
+                    "id": zajecia_id,
+                    "data": DAY_LIST[int(rand() * DAYS)],
+                    "godzina_od": godzina_od,
+                    "godzina_do": godzina_do,
+                    "specjalista": SPECJALISCI[int(rand() * len(SPECJALISCI))],
+                    "user_id": user_id,
+                    "project_id": project_id,
+                }
+            )
+            candidates = owners.get((user_id, project_id))
+            if candidates:
+                first = candidates[int(rand() * len(candidates))]
+                assoc_rows.append({"zajecia_id": zajecia_id, "beneficjent_id": first})
+                if len(candidates) > 1 and rand() < 0.5:
+                    second = candidates[int(rand() * len(candidates))]
+                    if second != first:
+                        assoc_rows.append(
+                            {"zajecia_id": zajecia_id, "beneficjent_id": second}
+                        )
+            if rand() < email_ratio:
+                email_rows.append(
+                    {
+                        "id": next_email,
+                        "zajecia_id": zajecia_id,
+                        "recipient": f"raporty{user_id}@example.com",
+                        "subject": "Raport zajęć",
+                        "sent_at": now,
+                        "status": SentEmail.SENT,
+                        "attempts": 1,
+                    }
+                )
+                next_email += 1
+            if len(zajecia_rows) == batch_size or zajecia_id == last_zajecia:
+                _insert(Zajecia.__table__, zajecia_rows, batch_size)
+                _insert(zajecia_beneficjenci, assoc_rows, batch_size)
+                _insert(SentEmail.__table__, email_rows, batch_size)
+                counts["zajecia_beneficjenci"] += len(assoc_rows)
+                zajecia_rows, assoc_rows, email_rows = [], [], []
+        counts["sent_email"] = next_email - first_email
+
+        _restore_sqlite_upkeep(
+            deferred, {"beneficjent": first_benef, "zajecia": first_zajecia}
+        )
+        _reset_sequences()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return {
+        "projekt": created_projects,
+        "user": users,
+        "beneficjent": beneficjenci,
+        "zajecia": sessions,
+        **counts,
+    }
+
+
+@click.command("seed")
+@click.option(
+    "--users",
+    type=click.IntRange(min=1),
+    default=300,
+    show_default=True,
+    help="Instructors to add.",
+)
+@click.option(
+    "--sessions", type=click.IntRange(min=0), default=100_000, show_default=True
+)
+@click.option(
+    "--beneficjenci",
+    type=click.IntRange(min=1),
+    help="Beneficiaries to add (default: sessions / 3).",
+)
+@click.option(
+    "--projects",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Editions to spread data over.",
+)
+@click.option(
+    "--email-ratio",
+    type=click.FloatRange(0, 1),
+    default=0.5,
+    show_default=True,
+    help="Share of sessions with a sent report.",
+)
+@click.option("--password", default="haslo", show_default=True)
+@click.option("--seed", "random_seed", default=1, show_default=True)
+@click.option(
+    "--batch-size", type=click.IntRange(min=1), default=BATCH_SIZE, show_default=True
+)
+@with_appcontext
+def seed_command(
+    users, sessions, beneficjenci, projects, email_ratio, password, random_seed, batch_size
+):
+    """Fill the database with synthetic data for scale testing."""
+    started = time.perf_counter()
+    counts = seed_database(
+        users,
+        sessions,
+        beneficjenci=beneficjenci,
+        projects=projects,
+        email_ratio=email_ratio,
+        password=password,
+        seed=random_seed,
+        batch_size=batch_size,
+    )
+    if db.session.get_bind().dialect.name == "sqlite":
+        db.session.execute(text("ANALYZE"))
+    summary = ", ".join(f"{table}: {count}" for table, count in counts.items())
+    click.echo(f"Inserted {summary} in {time.perf_counter() - started:.1f}s.")
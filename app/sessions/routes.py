@@ -1,7 +1,9 @@
 """Views related to session management and beneficiaries."""
 
+import time
 from io import BytesIO
 from datetime import datetime, timedelta
+from types import SimpleNamespace
 
 import pytz
 from email_validator import EmailNotValidError, validate_email
@@ -10,6 +12,7 @@ from flask import (
     abort,
     current_app,
     flash,
+    get_template_attribute,
     jsonify,
     redirect,
     render_template,
@@ -18,12 +21,31 @@ from flask import (
     url_for,
 )
 from flask_login import current_user, login_required
+from sqlalchemy.orm import contains_eager, joinedload
 from wtforms.validators import ValidationError
 
-from .. import db
-from ..forms import BeneficjentForm, DeleteForm, ZajeciaForm
+from .. import db, docx_store
+from ..beneficjent_import import ImportFileError, import_beneficjenci, read_rows
+from ..bulk_send import queued_progress, start_bulk_send
+from ..forms import (
+    BeneficjentForm,
+    BeneficjentImportForm,
+    BulkSendForm,
+    DeleteForm,
+    ZajeciaForm,
+)
+from ..metrics import search_latency
 from ..models import Beneficjent, SentEmail, Zajecia
+from ..outbox import enqueue_session_docx
+from ..pagination import keyset_paginate
 from ..projekt_utils import get_aktywny_projekt
+from ..search import (
+    filter_beneficjenci,
+    filter_zajecia,
+    parse_date_range,
+    search_cache,
+    search_text,
+)
 from ..utils import send_session_docx, build_docx_filename
 
 
@@ -55,6 +77,79 @@ def _beneficjent_dostepny(benef):
     return benef.user_id == current_user.id
 
 
+def _wyslij_raport(zajecia, recipient, subject, sent_email=None):
+    """Send the report for ``zajecia`` or queue it when the outbox is on.
+
+    The outcome is recorded in ``sent_email`` (a new log row when omitted)
+    and its status is returned. The caller is responsible for committing.
+    """
+    if current_app.config["MAIL_OUTBOX"]:
+        return enqueue_session_docx(zajecia, recipient, subject, sent_email).status
+
+    if sent_email is None:
+        sent_email = SentEmail(
+            zajecia_id=zajecia.id,
+            recipient=recipient,
+            subject=subject,
+        )
+    sent_at, status = send_session_docx(zajecia, recipient, subject, sent_email)
+    if status == SentEmail.SENT:
+        zajecia.doc_sent_at = sent_at
+    db.session.add(sent_email)
+    sent_email.sent_at = sent_at
+    sent_email.status = status
+    return status
+
+
+def _live_search(kind, load_page, snapshot, row_macro, list_endpoint, colspan):
+    """Answer a live search request for one of the list views as JSON.
+
+    Each row is returned with its rendered HTML and folded ``search`` text,
+    which lets ``live_search.js`` narrow complete results down locally as
+    the user keeps typing. Results are cached per user, project and list
+    for ``SEARCH_CACHE_SECONDS``; the latency of every request is recorded
+    in :data:`app.metrics.search_latency`.
+    """
+    started = time.perf_counter()
+    q = request.args.get("q", "").strip()
+    if len(q) < current_app.config["SEARCH_MIN_LENGTH"]:
+        return jsonify(error="Zapytanie jest za krótkie."), 400
+    projekt = get_aktywny_projekt()
+    scope = (current_user.id, projekt.id if projekt else None, kind)
+    cache = search_cache()
+    cached = cache.get(scope, q)
+    if cached is None:
+        page = load_page(projekt, q)
+        items = [snapshot(obj) for obj in page.items]
+        next_cursor = page.next_cursor
+        cache.put(
+            scope, q, items, next_cursor, current_app.config["SEARCH_CACHE_SECONDS"]
+        )
+        source = "db"
+    else:
+        items, next_cursor = cached
+        source = "cache"
+
+    render_row = get_template_attribute(*row_macro)
+    render_more = get_template_attribute("_pagination.html", "render_load_more")
+    render_empty = get_template_attribute("_pagination.html", "render_empty")
+    delete_form = DeleteForm()
+    more_url = url_for(list_endpoint, q=q, after=next_cursor) if next_cursor else None
+    response = jsonify(
+        q=q,
+        rows=[
+            {"id": item.id, "search": item.search, "html": render_row(item, delete_form)}
+            for item in items
+        ],
+        empty=render_empty(colspan, "Brak wyników."),
+        more=render_more(more_url, colspan),
+        complete=next_cursor is None,
+        refinable=parse_date_range(q) is None,
+    )
+    search_latency.observe(time.perf_counter() - started, kind, source)
+    return response
+
+
 @sessions_bp.route("/")
 def index():
     """Serve the dashboard for authenticated users or the login page otherwise."""
@@ -138,23 +233,15 @@ def nowe_zajecia():
             else:
                 recipient = current_user.document_recipient_email
             if recipient:
-                sent_at, status = send_session_docx(
+                status = _wyslij_raport(
                     zajecia, recipient, "Dokument z konsultacji"
                 )
-                if status == "sent":
-                    zajecia.doc_sent_at = sent_at
+                if status == SentEmail.SENT:
                     messages.append("Dokument wysłany.")
+                elif status == SentEmail.QUEUED:
+                    messages.append("Dokument dodany do kolejki wysyłki.")
                 else:
                     flash("Nie udało się wysłać dokumentu.")
-
-                sent_email = SentEmail(
-                    zajecia_id=zajecia.id,
-                    recipient=recipient,
-                    subject="Dokument z konsultacji",
-                    sent_at=sent_at,
-                    status=status,
-                )
-                db.session.add(sent_email)
                 db.session.commit()
             else:
                 flash("Nie podano adresu email odbiorcy dokumentów.")
@@ -183,12 +270,12 @@ def pobierz_docx(zajecia_id):
 
     from .. import routes
 
-    buffer = BytesIO()
-    routes.generate_docx(zajecia, beneficjenci, buffer)
-    buffer.seek(0)
+    _, data = docx_store.fetch(
+        zajecia, lambda output: routes.generate_docx(zajecia, beneficjenci, output)
+    )
 
     return send_file(
-        buffer,
+        BytesIO(data),
         as_attachment=True,
         download_name=filename,
         mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
@@ -212,36 +299,111 @@ def wyslij_docx(zajecia_id):
         flash("Brak ustawionego adresu odbiorcy dokumentu.")
         return redirect(url_for("sessions.lista_zajec"))
 
-    sent_at, status = send_session_docx(zajecia, recipient, "Raport zajęć")
-    if status == "sent":
-        zajecia.doc_sent_at = sent_at
+    status = _wyslij_raport(zajecia, recipient, "Raport zajęć")
+    if status == SentEmail.SENT:
         flash("Raport wysłany ponownie.")
+    elif status == SentEmail.QUEUED:
+        flash("Raport dodany do kolejki wysyłki.")
     else:
         flash("Nie udało się wysłać raportu.")
-
-    sent_email = SentEmail(
-        zajecia_id=zajecia.id,
-        recipient=recipient,
-        subject="Raport zajęć",
-        sent_at=sent_at,
-        status=status,
-    )
-    db.session.add(sent_email)
     db.session.commit()
 
     return redirect(url_for("sessions.lista_zajec"))
 
 
+@sessions_bp.route("/zajecia/wyslij-niewyslane", methods=["POST"])
+@login_required
+def wyslij_niewyslane():
+    """Send reports for all of the user's sessions that were never sent."""
+    form = BulkSendForm()
+    if form.validate_on_submit():
+        projekt = _aktywny_projekt_or_redirect()
+        if projekt is None:
+            return redirect(url_for("sessions.lista_zajec"))
+        result, ids = start_bulk_send(projekt.id, user_id=current_user.id)
+        if ids is None:
+            flash(f"Brak raportów do wysłania (bez adresu odbiorcy: {result.skipped}).")
+            return redirect(url_for("sessions.lista_zajec"))
+        return redirect(
+            url_for(
+                "sessions.postep_wysylki",
+                od=ids[0],
+                do=ids[1],
+                pominiete=result.skipped,
+            )
+        )
+    return redirect(url_for("sessions.lista_zajec"))
+
+
+@sessions_bp.route("/zajecia/wyslij-niewyslane/postep")
+@login_required
+def postep_wysylki():
+    """Show how far the delivery of a bulk send has got."""
+    projekt = _aktywny_projekt_or_redirect()
+    if projekt is None:
+        return redirect(url_for("sessions.lista_zajec"))
+    progress = queued_progress(
+        request.args.get("od", 0, type=int),
+        request.args.get("do", 0, type=int),
+        projekt.id,
+        user_id=current_user.id,
+    )
+    progress.skipped = request.args.get("pominiete", 0, type=int)
+    return render_template(
+        "bulk_send_progress.html",
+        progress=progress,
+        back_url=url_for("sessions.lista_zajec"),
+    )
+
+
 @sessions_bp.route("/emails")
 @login_required
 def emails_list():
     """List sent emails for the current user."""
     projekt = get_aktywny_projekt()
-    query = SentEmail.query.join(Zajecia).filter(Zajecia.user_id == current_user.id)
+    query = (
+        SentEmail.query.join(Zajecia)
+        .options(contains_eager(SentEmail.zajecia))
+        .filter(Zajecia.user_id == current_user.id)
+    )
     if projekt:
         query = query.filter(Zajecia.project_id == projekt.id)
-    emails = query.order_by(SentEmail.sent_at.desc()).all()
-    return render_template("emails_list.html", emails=emails)
+    emails = query.order_by(SentEmail.sent_at.desc(), SentEmail.id.desc()).all()
+    queued_count = sum(
+        1 for e in emails if e.status in (SentEmail.QUEUED, SentEmail.SENDING)
+    )
+    return render_template(
+        "emails_list.html", emails=emails, queued_count=queued_count
+    )
+
+
+@sessions_bp.route("/emails/<int:email_id>/docx")
+@login_required
+def pobierz_wyslany_docx(email_id):
+    """Return the report exactly as it was attached to the email."""
+    sent_email = db.session.get(SentEmail, email_id)
+    if sent_email is None:
+        current_app.logger.warning(
+            "pobierz_wyslany_docx: email %s not found", email_id
+        )
+        abort(404)
+    if not sent_email.zajecia or not _zajecia_dostepne(sent_email.zajecia):
+        flash("Brak dostępu do tej wiadomości.")
+        return redirect(url_for("sessions.emails_list"))
+    if not sent_email.file_path or not current_app.config["DOCX_STORE_DIR"]:
+        abort(404)
+    try:
+        return send_file(
+            docx_store.stored_path(sent_email.file_path),
+            as_attachment=True,
+            download_name=build_docx_filename(sent_email.zajecia),
+            mimetype="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        )
+    except FileNotFoundError:
+        current_app.logger.warning(
+            "pobierz_wyslany_docx: file %s missing", sent_email.file_path
+        )
+        abort(404)
 
 
 @sessions_bp.route("/emails/<int:email_id>/resend")
@@ -256,47 +418,92 @@ def resend_email(email_id):
         flash("Brak dostępu do tej wiadomości.")
         return redirect(url_for("sessions.emails_list"))
 
-    zajecia = sent_email.zajecia
-    recipient = sent_email.recipient
-    subject = sent_email.subject
-
-    sent_at, status = send_session_docx(zajecia, recipient, subject)
-    if status == "sent":
-        zajecia.doc_sent_at = sent_at
+    status = _wyslij_raport(
+        sent_email.zajecia,
+        sent_email.recipient,
+        sent_email.subject,
+        sent_email=sent_email,
+    )
+    if status == SentEmail.SENT:
         flash("Wiadomość wysłana ponownie.")
+    elif status == SentEmail.QUEUED:
+        flash("Wiadomość dodana do kolejki wysyłki.")
     else:
         flash("Nie udało się wysłać raportu ponownie.")
-
-    sent_email.sent_at = sent_at
-    sent_email.status = status
     db.session.commit()
     return redirect(url_for("sessions.emails_list"))
 
 
+def _zajecia_page(projekt, q, after=None):
+    """Return a page of the current user's sessions matching *q*."""
+    query = Zajecia.query.options(joinedload(Zajecia.user)).filter_by(
+        user_id=current_user.id
+    )
+    if projekt:
+        query = query.filter_by(project_id=projekt.id)
+    if q:
+        query = filter_zajecia(query, q)
+    return keyset_paginate(
+        query,
+        [Zajecia.data, Zajecia.godzina_od, Zajecia.id],
+        after=after,
+        per_page=current_app.config["LIST_PAGE_SIZE"],
+    )
+
+
+def _zajecia_snapshot(zaj):
+    """Copy the fields rendered by ``zajecia_row`` for the search cache."""
+    return SimpleNamespace(
+        id=zaj.id,
+        data=zaj.data,
+        godzina_od=zaj.godzina_od,
+        godzina_do=zaj.godzina_do,
+        specjalista=zaj.specjalista,
+        doc_sent_at=zaj.doc_sent_at,
+        user=SimpleNamespace(full_name=zaj.user.full_name),
+        search=search_text(zaj.specjalista),
+    )
+
+
 @sessions_bp.route("/zajecia")
 @login_required
 def lista_zajec():
     """List sessions belonging to the current user with optional search."""
     projekt = get_aktywny_projekt()
     q = request.args.get("q", "").strip()
-    query = Zajecia.query.filter_by(user_id=current_user.id)
-    if projekt:
-        query = query.filter_by(project_id=projekt.id)
-    if q:
-        query = query.filter(
-            db.cast(Zajecia.data, db.String).ilike(f"%{q}%")
-            | Zajecia.specjalista.ilike(f"%{q}%")
-        )
-    zajecia_list = (
-        query.order_by(Zajecia.data.desc(), Zajecia.godzina_od.desc()).all()
-    )
+    after = request.args.get("after")
+    page = _zajecia_page(projekt, q, after)
     delete_form = DeleteForm()
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         return render_template(
-            "_zajecia_rows.html", zajecia_list=zajecia_list, delete_form=delete_form
+            "_zajecia_rows.html",
+            zajecia_list=page.items,
+            next_url=page.next_url,
+            after=after,
+            delete_form=delete_form,
         )
     return render_template(
-        "zajecia_list.html", zajecia_list=zajecia_list, q=q, delete_form=delete_form
+        "zajecia_list.html",
+        zajecia_list=page.items,
+        next_url=page.next_url,
+        after=after,
+        q=q,
+        delete_form=delete_form,
+        bulk_send_form=BulkSendForm(),
+    )
+
+
+@sessions_bp.route("/api/szukaj/zajecia")
+@login_required
+def szukaj_zajec():
+    """Return rendered session rows matching ``q`` for the live search."""
+    return _live_search(
+        "zajecia",
+        _zajecia_page,
+        _zajecia_snapshot,
+        ("_zajecia_rows.html", "zajecia_row"),
+        "sessions.lista_zajec",
+        colspan=7,
     )
 
 
@@ -361,48 +568,126 @@ def usun_zajecia(zajecia_id):
 @sessions_bp.route("/kalendarz")
 @login_required
 def kalendarz():
-    """Display a calendar with upcoming sessions for the user."""
-    projekt = get_aktywny_projekt()
-    tz = pytz.timezone(current_app.config["TIMEZONE"])
-    today = datetime.now(tz).date()
-    query = Zajecia.query.filter_by(user_id=current_user.id)
-    if projekt:
-        query = query.filter_by(project_id=projekt.id)
-    zajecia_list = (
-        query.filter(Zajecia.data >= today)
-        .order_by(Zajecia.data, Zajecia.godzina_od)
-        .all()
-    )
-    return render_template("zajecia_calendar.html", zajecia_list=zajecia_list)
+    """Display a calendar of the user's sessions.
+
+    Events are fetched by FullCalendar from :func:`api_zajecia` for the
+    visible range only.
+    """
+    return render_template("zajecia_calendar.html")
+
+
+def _range_param(name, tz):
+    """Return the date of a FullCalendar ``start``/``end`` query parameter.
+
+    Values may be plain dates or ISO timestamps with an offset; timestamps
+    are converted to the application timezone first. Malformed values abort
+    with 400.
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace(" ", "+"))
+    except ValueError:
+        current_app.logger.warning("api_zajecia: invalid %s %r", name, value)
+        abort(400)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(tz)
+    return parsed.date()
+
+
+def _utc_offset(delta):
+    """Format a UTC offset the way ``datetime.isoformat`` does."""
+    minutes = int(delta.total_seconds()) // 60
+    sign = "-" if minutes < 0 else "+"
+    hours, minutes = divmod(abs(minutes), 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+def _calendar_events(rows, tz):
+    """Build FullCalendar events for ``(data, od, do, specjalista)`` rows.
+
+    The UTC offset is resolved once per day instead of localizing every
+    timestamp; only days with a DST transition fall back to per-row
+    ``tz.localize``.
+    """
+    offsets = {}
+    events = []
+    for data, godzina_od, godzina_do, specjalista in rows:
+        offset = offsets.get(data)
+        if offset is None:
+            midnight = tz.localize(datetime.combine(data, datetime.min.time()))
+            last = tz.localize(datetime.combine(data, datetime.max.time()))
+            same = midnight.utcoffset() == last.utcoffset()
+            offset = offsets[data] = (
+                _utc_offset(midnight.utcoffset()) if same else False
+            )
+        if offset:
+            day = data.isoformat()
+            start = f"{day}T{godzina_od.isoformat()}{offset}"
+            end = f"{day}T{godzina_do.isoformat()}{offset}"
+        else:
+            start = tz.localize(datetime.combine(data, godzina_od)).isoformat()
+            end = tz.localize(datetime.combine(data, godzina_do)).isoformat()
+        events.append({"title": specjalista, "start": start, "end": end})
+    return events
 
 
 @sessions_bp.route("/api/zajecia")
 @login_required
 def api_zajecia():
-    """Return upcoming sessions for the current user in JSON format."""
+    """Return the user's sessions as FullCalendar events in JSON format.
+
+    FullCalendar passes the visible range as ``start`` (inclusive) and
+    ``end`` (exclusive). Without ``start`` only upcoming sessions are
+    returned. The response carries an ETag so unchanged ranges are answered
+    with 304 Not Modified.
+    """
     projekt = get_aktywny_projekt()
     tz = pytz.timezone(current_app.config["TIMEZONE"])
-    today = datetime.now(tz).date()
-    query = Zajecia.query.filter_by(user_id=current_user.id)
+    start = _range_param("start", tz)
+    end = _range_param("end", tz)
+    if start is None:
+        start = datetime.now(tz).date()
+    query = db.session.query(
+        Zajecia.data, Zajecia.godzina_od, Zajecia.godzina_do, Zajecia.specjalista
+    ).filter(Zajecia.user_id == current_user.id, Zajecia.data >= start)
+    if end is not None:
+        query = query.filter(Zajecia.data < end)
+    if projekt:
+        query = query.filter(Zajecia.project_id == projekt.id)
+    rows = query.order_by(Zajecia.data, Zajecia.godzina_od).all()
+    response = jsonify(_calendar_events(rows, tz))
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def _beneficjenci_page(projekt, q, after=None):
+    """Return a page of the current user's beneficiaries matching *q*."""
+    query = Beneficjent.query.filter_by(user_id=current_user.id)
     if projekt:
         query = query.filter_by(project_id=projekt.id)
-    sessions = (
-        query.filter(Zajecia.data >= today)
-        .order_by(Zajecia.data, Zajecia.godzina_od)
-        .all()
+    if q:
+        query = filter_beneficjenci(query, q)
+    return keyset_paginate(
+        query,
+        [Beneficjent.imie, Beneficjent.id],
+        after=after,
+        per_page=current_app.config["LIST_PAGE_SIZE"],
+        descending=False,
+    )
+
+
+def _beneficjent_snapshot(benef):
+    """Copy the fields rendered by ``beneficjent_row`` for the search cache."""
+    return SimpleNamespace(
+        id=benef.id,
+        imie=benef.imie,
+        wojewodztwo=benef.wojewodztwo,
+        search=search_text(benef.imie, benef.wojewodztwo),
     )
-    events = []
-    for s in sessions:
-        start_dt = tz.localize(datetime.combine(s.data, s.godzina_od))
-        end_dt = tz.localize(datetime.combine(s.data, s.godzina_do))
-        events.append(
-            {
-                "title": s.specjalista,
-                "start": start_dt.isoformat(),
-                "end": end_dt.isoformat(),
-            }
-        )
-    return jsonify(events)
 
 
 @sessions_bp.route("/beneficjenci")
@@ -411,28 +696,41 @@ def lista_beneficjentow():
     """List beneficiaries for the current user with optional search."""
     projekt = get_aktywny_projekt()
     q = request.args.get("q", "").strip()
-    query = Beneficjent.query.filter_by(user_id=current_user.id)
-    if projekt:
-        query = query.filter_by(project_id=projekt.id)
-    if q:
-        query = query.filter(
-            Beneficjent.imie.ilike(f"%{q}%")
-            | Beneficjent.wojewodztwo.ilike(f"%{q}%")
-        )
-    beneficjenci = query.all()
+    after = request.args.get("after")
+    page = _beneficjenci_page(projekt, q, after)
     delete_form = DeleteForm()
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         return render_template(
-            "_beneficjenci_rows.html", beneficjenci=beneficjenci, delete_form=delete_form
+            "_beneficjenci_rows.html",
+            beneficjenci=page.items,
+            next_url=page.next_url,
+            after=after,
+            delete_form=delete_form,
         )
     return render_template(
         "beneficjenci_list.html",
-        beneficjenci=beneficjenci,
+        beneficjenci=page.items,
+        next_url=page.next_url,
+        after=after,
         delete_form=delete_form,
         q=q,
     )
 
 
+@sessions_bp.route("/api/szukaj/beneficjenci")
+@login_required
+def szukaj_beneficjentow():
+    """Return rendered beneficiary rows matching ``q`` for the live search."""
+    return _live_search(
+        "beneficjenci",
+        _beneficjenci_page,
+        _beneficjent_snapshot,
+        ("_beneficjenci_rows.html", "beneficjent_row"),
+        "sessions.lista_beneficjentow",
+        colspan=3,
+    )
+
+
 @sessions_bp.route("/beneficjenci/nowy", methods=["GET", "POST"])
 @login_required
 def nowy_beneficjent():
@@ -458,6 +756,34 @@ def nowy_beneficjent():
     )
 
 
+@sessions_bp.route("/beneficjenci/import", methods=["GET", "POST"])
+@login_required
+def import_beneficjentow():
+    """Add beneficiaries to the active project from an uploaded file."""
+    projekt = _aktywny_projekt_or_redirect()
+    if projekt is None:
+        return redirect(url_for("sessions.lista_beneficjentow"))
+
+    form = BeneficjentImportForm()
+    report = None
+    if form.validate_on_submit():
+        upload = form.plik.data
+        try:
+            report = import_beneficjenci(
+                read_rows(upload.stream, upload.filename),
+                current_user.id,
+                projekt.id,
+                dry_run=form.dry_run.data,
+            )
+        except ImportFileError as exc:
+            form.plik.errors.append(str(exc))
+        else:
+            if report.imported:
+                flash(report.summary())
+                return redirect(url_for("sessions.lista_beneficjentow"))
+    return render_template("beneficjent_import.html", form=form, report=report)
+
+
 @sessions_bp.route(
     "/beneficjenci/<int:beneficjent_id>/edytuj", methods=["GET", "POST"]
 )
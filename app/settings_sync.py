@@ -0,0 +1,197 @@
+"""Propagation of the database settings to every worker process.
+
+SMTP and timezone settings edited in the admin panel are stored in the
+single :class:`~app.models.Settings` row and copied into ``app.config``.
+Each save increments ``Settings.settings_version``; before a request every
+process compares it with the version it applied, at most once per
+``SETTINGS_CHECK_SECONDS``, and reloads its configuration lazily when it
+changed. This keeps gunicorn workers and the outbox worker consistent
+without restarts.
+
+Per-process caches of database rows (logged-in users, the active project)
+and of live search results use the counters of
+:class:`~app.models.CacheVersion`, bumped in the same transaction as any
+change to the cached data. They are read before a cache lookup at most
+once per ``SETTINGS_CHECK_SECONDS`` as well, so a change made by one
+worker reaches the others within that interval.
+"""
+
+import threading
+import time
+
+from flask import current_app, g
+from sqlalchemy import inspect, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import db, mail
+from .models import CacheVersion, Settings
+
+# Configuration keys that stored settings may override.
+SETTINGS_KEYS = (
+    "MAIL_SERVER",
+    "MAIL_PORT",
+    "MAIL_USERNAME",
+    "MAIL_PASSWORD",
+    "MAIL_USE_TLS",
+    "MAIL_USE_SSL",
+    "MAIL_DEFAULT_SENDER",
+    "TIMEZONE",
+)
+# ``CacheVersion`` rows and the ``app.extensions`` keys of the caches
+# cleared when that row moves; each cache provides ``clear()``.
+SHARED_CACHES = {
+    CacheVersion.ROWS: ("user_cache", "aktywny_projekt"),
+    CacheVersion.SEARCH: ("search_cache",),
+}
+
+
+class _SettingsState:
+    """Environment defaults and the settings version applied by a process."""
+
+    def __init__(self, base):
+        self.base = base
+        self.version = None
+        self.cache_versions = {}
+        self.checked_at = time.monotonic()
+        self.cache_checked_at = None
+        self.lock = threading.Lock()
+
+
+def _state(app):
+    return app.extensions["settings_sync"]
+
+
+def apply_settings(app, settings):
+    """Copy *settings* over the environment defaults of *app*.
+
+    Fields left empty in the database fall back to the environment, so
+    clearing a value in the admin panel restores the default.
+    """
+    state = _state(app)
+    config = dict(state.base)
+    version = None
+    if settings is not None:
+        config["MAIL_SERVER"] = settings.mail_server or config["MAIL_SERVER"]
+        if settings.mail_port is not None:
+            config["MAIL_PORT"] = settings.mail_port
+        config["MAIL_USERNAME"] = settings.mail_username or config["MAIL_USERNAME"]
+        config["MAIL_PASSWORD"] = settings.mail_password or config["MAIL_PASSWORD"]
+        if settings.mail_use_tls is not None:
+            config["MAIL_USE_TLS"] = settings.mail_use_tls
+        if settings.mail_use_ssl is not None:
+            config["MAIL_USE_SSL"] = settings.mail_use_ssl
+        if settings.admin_email:
+            config["MAIL_DEFAULT_SENDER"] = (
+                settings.mail_sender_name or "",
+                settings.admin_email,
+            )
+        config["TIMEZONE"] = settings.timezone or config["TIMEZONE"]
+        version = settings.settings_version
+    app.config.update(config)
+    mail.init_app(app)
+    state.version = version
+
+
+def init_settings(app):
+    """Remember the environment defaults and apply the stored settings.
+
+    Must be called within an application context.
+    """
+    app.extensions["settings_sync"] = _SettingsState(
+        {key: app.config[key] for key in SETTINGS_KEYS}
+    )
+    try:
+        settings = Settings.get()
+    except SQLAlchemyError:
+        # Not migrated yet; ``flask bootstrap`` creates the tables.
+        db.session.rollback()
+        app.logger.warning("Settings unavailable, run `flask bootstrap`.")
+        settings = None
+    apply_settings(app, settings)
+
+
+def refresh_settings(force=False):
+    """Reload the settings if another process saved a new version.
+
+    Returns True when the configuration was reloaded. Unless *force* is
+    set the version is read at most once per ``SETTINGS_CHECK_SECONDS``.
+    """
+    app = current_app._get_current_object()
+    state = _state(app)
+    now = time.monotonic()
+    if not force and now - state.checked_at < app.config["SETTINGS_CHECK_SECONDS"]:
+        return False
+    state.checked_at = now
+    version = db.session.scalar(select(Settings.settings_version).limit(1))
+    if version == state.version:
+        return False
+    with state.lock:
+        if version == state.version:
+            return False
+        apply_settings(app, Settings.get())
+    app.logger.info("Settings reloaded (version %s).", state.version)
+    return True
+
+
+def bump_settings_version(settings):
+    """Mark *settings* as changed; the increment runs in SQL on flush."""
+    settings.settings_version = Settings.settings_version + 1
+
+
+def sync_shared_caches():
+    """Clear the shared caches whose data another process changed.
+
+    Reads ``CacheVersion`` at most once per request or application context
+    and once per ``SETTINGS_CHECK_SECONDS``.
+    """
+    if g.get("_shared_caches_synced"):
+        return
+    g._shared_caches_synced = True
+    app = current_app._get_current_object()
+    state = _state(app)
+    now = time.monotonic()
+    checked_at = state.cache_checked_at
+    if (
+        checked_at is not None
+        and now - checked_at < app.config["SETTINGS_CHECK_SECONDS"]
+    ):
+        return
+    state.cache_checked_at = now
+    versions = dict(
+        db.session.execute(select(CacheVersion.id, CacheVersion.version)).all()
+    )
+    if versions == state.cache_versions:
+        return
+    with state.lock:
+        for counter, keys in SHARED_CACHES.items():
+            if versions.get(counter) == state.cache_versions.get(counter):
+                continue
+            for key in keys:
+                cache = app.extensions.get(key)
+                if cache is not None:
+                    cache.clear()
+        state.cache_versions = versions
+
+
+def has_column_changes(obj, keys=None):
+    """Return True if the pending flush changes columns of *obj*.
+
+    *keys* limits the check to these attributes; by default every mapped
+    column counts, but relationship collections never do.
+    """
+    state = inspect(obj)
+    if keys is None:
+        keys = [attr.key for attr in state.mapper.column_attrs]
+    return any(state.attrs[key].history.has_changes() for key in keys)
+
+
+def bump_cache_version(session, counter=CacheVersion.ROWS):
+    """Increment the *counter* row of ``CacheVersion`` in *session*.
+
+    Safe to call from flush events.
+    """
+    session.connection().execute(
+        update(CacheVersion)
+        .where(CacheVersion.id == counter)
+        .values(version=CacheVersion.version + 1)
+    )
@@ -0,0 +1,141 @@
+"""Slow-query log and opt-in per-request SQL profiler.
+
+Every statement slower than ``SLOW_QUERY_MS`` is logged with the place in
+the application that issued it. Requests are profiled when
+``SQL_PROFILER`` is enabled or when an admin sends the ``X-SQL-Profile``
+header: each statement is recorded with its duration and call site, the
+totals are logged and returned in ``X-SQL-Queries``/``X-SQL-Time-Ms``, and
+HTML pages shown to admins get a summary panel grouping identical
+statements, which makes N+1 patterns stand out.
+
+Call sites are only resolved for slow or profiled statements, so the
+listeners cost a timer read per query otherwise.
+"""
+
+import os
+import sys
+import time
+
+from flask import (
+    current_app,
+    g,
+    has_request_context,
+    render_template,
+    request,
+)
+from flask_login import current_user
+from sqlalchemy import event
+
+from .models import Roles
+
+PROFILE_HEADER = "X-SQL-Profile"
+# Frames reported per statement, innermost first.
+CALL_SITE_DEPTH = 3
+
+
+def _is_admin():
+    return current_user.is_authenticated and current_user.role in {
+        Roles.ADMIN,
+        Roles.SUPERADMIN,
+    }
+
+
+def _call_site(app_root):
+    """Return the innermost application frames executing the statement."""
+    base = os.path.dirname(app_root)
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < CALL_SITE_DEPTH:
+        filename = frame.f_code.co_filename
+        if filename.startswith(app_root) and filename != __file__:
+            frames.append(
+                f"{os.path.relpath(filename, base)}:{frame.f_lineno}"
+                f" ({frame.f_code.co_name})"
+            )
+        frame = frame.f_back
+    return " < ".join(frames) or "?"
+
+
+def summarize(profile):
+    """Group recorded statements; return rows sorted by total time."""
+    groups = {}
+    for statement, elapsed, site in profile:
+        group = groups.setdefault(
+            statement, {"statement": statement, "count": 0, "time": 0.0, "sites": {}}
+        )
+        group["count"] += 1
+        group["time"] += elapsed
+        group["sites"][site] = group["sites"].get(site, 0) + 1
+    return sorted(groups.values(), key=lambda group: group["time"], reverse=True)
+
+
+def _start_profile():
+    if current_app.config["SQL_PROFILER"] or (
+        request.headers.get(PROFILE_HEADER) and _is_admin()
+    ):
+        g.sql_profile = []
+
+
+def _finish_profile(response):
+    profile = g.pop("sql_profile", None)
+    if profile is None:
+        return response
+    total_ms = sum(elapsed for _, elapsed, _ in profile) * 1000
+    current_app.logger.info(
+        "sql profile %s %s: %d queries, %.1f ms",
+        request.method,
+        request.path,
+        len(profile),
+        total_ms,
+    )
+    response.headers["X-SQL-Queries"] = str(len(profile))
+    response.headers["X-SQL-Time-Ms"] = f"{total_ms:.1f}"
+    if (
+        response.mimetype == "text/html"
+        and not response.is_streamed
+        and not response.direct_passthrough
+        and _is_admin()
+    ):
+        panel = render_template(
+            "_sql_profile.html",
+            groups=summarize(profile),
+            queries=len(profile),
+            total_ms=total_ms,
+        )
+        body = response.get_data(as_text=True)
+        index = body.rfind("</body>")
+        if index != -1:
+            response.set_data(body[:index] + panel + body[index:])
+    return response
+
+
+def init_sql_profiler(app, engine):
+    """Install the slow-query log and the request profiler hooks."""
+    app_root = app.root_path
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.profiler_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "profiler_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        threshold = app.config["SLOW_QUERY_MS"]
+        slow = threshold > 0 and elapsed * 1000 >= threshold
+        profile = g.get("sql_profile") if has_request_context() else None
+        if not slow and profile is None:
+            return
+        site = _call_site(app_root)
+        if slow:
+            app.logger.warning(
+                "slow query (%.1f ms) at %s: %s", elapsed * 1000, site, statement
+            )
+        if profile is not None:
+            profile.append((statement, elapsed, site))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    app.before_request(_start_profile)
+    app.after_request(_finish_profile)
@@ -1,3 +1,4 @@
+
 document.addEventListener('DOMContentLoaded', () => {
   const debounce = (fn, delay = 300) => {
     let timeout;
@@ -7,29 +8,183 @@ document.addEventListener('DOMContentLoaded', () => {
     };
   };
 
+  const fetchRows = async url => {
+    const resp = await fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } });
+    return resp.ok ? resp.text() : null;
+  };
+
+  // Infinite scroll: a row with data-next-url is appended after the last
+  // row of every page; when it scrolls into view it is replaced by the next
+  // page, which again ends with its own marker row.
+  const loadMore = async row => {
+    if (row.dataset.loading) return;
+    row.dataset.loading = '1';
+    try {
+      const html = await fetchRows(row.dataset.nextUrl);
+      if (html === null) {
+        delete row.dataset.loading;
+        return;
+      }
+      const container = row.parentElement;
+      row.insertAdjacentHTML('afterend', html);
+      row.remove();
+      watchMore(container);
+    } catch (err) {
+      delete row.dataset.loading;
+      console.error('Loading more rows failed', err);
+    }
+  };
+
+  const observer = 'IntersectionObserver' in window
+    ? new IntersectionObserver(entries => {
+      entries.forEach(entry => {
+        if (entry.isIntersecting) {
+          observer.unobserve(entry.target);
+          loadMore(entry.target);
+        }
+      });
+    }, { rootMargin: '200px' })
+    : null;
+
+  const watchMore = container => {
+    if (!observer || !container) return;
+    container.querySelectorAll('[data-next-url]').forEach(row => {
+      row.querySelector('a')?.addEventListener('click', event => {
+        event.preventDefault();
+        loadMore(row);
+      });
+      observer.observe(row);
+    });
+  };
+
+  watchMore(document);
+
+  // Live search: queries of at least data-min-length characters go to the
+  // JSON endpoint in data-search-url. Each row comes with its folded search
+  // text, so when a complete result for a prefix of the query is known it is
+  // narrowed down locally instead of asking the server again. A new request
+  // aborts the previous one. Results are reused for data-cache-ms, the
+  // server's SEARCH_CACHE_SECONDS.
+  const DATE_LIKE = /^(\d{4}(-\d{1,2}(-\d{1,2})?)?|(\d{1,2}\.)?\d{1,2}\.\d{4})$/;
+
+  const fold = text => text
+    .replace(/ł/g, 'l')
+    .replace(/Ł/g, 'L')
+    .normalize('NFKD')
+    .replace(/[\u0300-\u036f]/g, '')
+    .toLowerCase();
+
+  const words = text => fold(text).match(/[\p{L}\p{N}_]+/gu) || [];
+
+  const matches = (search, queryWords) => {
+    const haystack = search.split(' ');
+    return queryWords.every(word => haystack.some(token => token.startsWith(word)));
+  };
+
   document.querySelectorAll('[data-live-search]').forEach(input => {
     const targetSelector = input.dataset.liveSearch;
     const target = document.querySelector(targetSelector);
     if (!target) return;
 
-    const handler = debounce(async () => {
+    const searchUrl = input.dataset.searchUrl;
+    const minLength = Number(input.dataset.minLength || 2);
+    const cacheMs = Number(input.dataset.cacheMs || 15000);
+    const results = new Map();
+    let controller = null;
+    // Query whose rows are on screen; the page is rendered for the
+    // initial value of the input.
+    let shown = input.value.trim();
+
+    const show = html => {
+      target.innerHTML = html;
+      watchMore(target);
+    };
+
+    const render = (data, rows) => {
+      const html = rows.length ? rows.map(row => row.html).join('') : data.empty;
+      show(html + (data.complete ? '' : data.more));
+    };
+
+    const cached = key => {
+      const data = results.get(key);
+      if (data && Date.now() - data.fetchedAt > cacheMs) {
+        results.delete(key);
+        return null;
+      }
+      return data;
+    };
+
+    const refine = query => {
+      if (DATE_LIKE.test(query)) return null;
+      const key = words(query).join(' ');
+      const queryWords = words(query);
+      for (let end = key.length - 1; end > 0; end -= 1) {
+        const data = cached(key.slice(0, end));
+        if (data && data.complete && data.refinable) {
+          return { data, rows: data.rows.filter(row => matches(row.search, queryWords)) };
+        }
+      }
+      return null;
+    };
+
+    const listUrl = query => {
       const params = new URLSearchParams(window.location.search);
-      if (input.value) {
-        params.set('q', input.value);
+      params.delete('after');
+      if (query) {
+        params.set('q', query);
       } else {
         params.delete('q');
       }
-      const url = `${window.location.pathname}?${params.toString()}`;
+      return `${window.location.pathname}?${params.toString()}`;
+    };
+
+    const handler = debounce(async () => {
+      // A query shorter than data-min-length shows the unfiltered list, as
+      // an empty one does, instead of leaving the last results on screen.
+      const typed = input.value.trim();
+      const query = typed.length < minLength ? '' : typed;
+      if (controller) controller.abort();
+      controller = null;
+      if (query === shown) return;
+
+      const useApi = Boolean(query && searchUrl);
+      const key = words(query).join(' ');
+      if (useApi && !DATE_LIKE.test(query)) {
+        const hit = cached(key);
+        if (hit) {
+          shown = query;
+          render(hit, hit.rows);
+          return;
+        }
+        const refined = refine(query);
+        if (refined) {
+          shown = query;
+          render(refined.data, refined.rows);
+          return;
+        }
+      }
+
+      controller = new AbortController();
+      const url = useApi ? `${searchUrl}?q=${encodeURIComponent(query)}` : listUrl(query);
       try {
-        const resp = await fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' } });
-        if (resp.ok) {
-          const html = await resp.text();
-          target.innerHTML = html;
+        const resp = await fetch(url, {
+          headers: { 'X-Requested-With': 'XMLHttpRequest' },
+          signal: controller.signal,
+        });
+        if (!resp.ok) return;
+        if (useApi) {
+          const data = await resp.json();
+          data.fetchedAt = Date.now();
+          if (data.refinable) results.set(key, data);
+          render(data, data.rows);
+        } else {
+          show(await resp.text());
         }
+        shown = query;
       } catch (err) {
-        console.error('Live search failed', err);
+        if (err.name !== 'AbortError') console.error('Live search failed', err);
       }
-    });
+    }, 250);
 
     input.addEventListener('input', handler);
   });
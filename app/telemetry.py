@@ -0,0 +1,113 @@
+"""Request and database instrumentation and the ``/metrics`` endpoint.
+
+Request hooks time every request per blueprint and endpoint, and engine
+events count the queries it runs and the time spent in them. Both only
+read :func:`time.perf_counter` and update a couple of numbers on ``g``;
+the histograms themselves are in :mod:`app.metrics`.
+
+``/metrics`` serves all histograms and the outbox depth in the Prometheus
+text format to admins, or to scrapers sending ``METRICS_TOKEN`` as a
+bearer token. Each gunicorn worker reports its own values.
+"""
+
+import hmac
+import time
+
+from flask import Response, abort, current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event, func, select
+
+from . import db
+from .metrics import (
+    HISTOGRAMS,
+    format_metric,
+    request_latency,
+    request_queries,
+    request_query_time,
+)
+from .models import Roles, SentEmail
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_queries = [0, 0.0]
+
+
+def _observe_request(response):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+    queries, query_time = g.pop("metrics_queries")
+    endpoint = request.endpoint or "unmatched"
+    request_latency.observe(
+        time.perf_counter() - started,
+        request.blueprint or "",
+        endpoint,
+        request.method,
+    )
+    request_queries.observe(queries, endpoint)
+    request_query_time.observe(query_time, endpoint)
+    return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "metrics_started", None)
+    if started is None or not has_request_context():
+        return
+    stats = g.get("metrics_queries")
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+def _outbox_depth():
+    """Return ``[(status, count)]`` of e-mails waiting in the outbox."""
+    rows = db.session.execute(
+        select(SentEmail.status, func.count())
+        .where(SentEmail.status.in_((SentEmail.QUEUED, SentEmail.SENDING)))
+        .group_by(SentEmail.status)
+    ).all()
+    counts = dict.fromkeys((SentEmail.QUEUED, SentEmail.SENDING), 0)
+    counts.update(rows)
+    return sorted(counts.items())
+
+
+def _authorized():
+    token = current_app.config["METRICS_TOKEN"]
+    header = request.headers.get("Authorization", "")
+    if token and hmac.compare_digest(header.encode(), f"Bearer {token}".encode()):
+        return True
+    return current_user.is_authenticated and current_user.role in {
+        Roles.ADMIN,
+        Roles.SUPERADMIN,
+    }
+
+
+def metrics():
+    """Return all metrics of this worker in the Prometheus text format."""
+    if not _authorized():
+        abort(403)
+    parts = [histogram.exposition() for histogram in HISTOGRAMS]
+    parts.append(
+        format_metric(
+            "outbox_emails",
+            "E-mails waiting in the outbox by status.",
+            "gauge",
+            [("", {"status": status}, count) for status, count in _outbox_depth()],
+        )
+    )
+    return Response("".join(parts), mimetype="text/plain; version=0.0.4")
+
+
+def init_telemetry(app, engine):
+    """Install the request hooks, engine listeners and ``/metrics``."""
+    app.before_request(_start_request)
+    app.after_request(_observe_request)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,129 @@
+"""Per-process cache of logged-in users for the Flask-Login user loader.
+
+Every authenticated request, including live search and calendar XHRs,
+loads ``current_user``. Detached copies of recently loaded users are kept
+for ``USER_CACHE_SECONDS`` and attached to the request's session without
+a query. Any flushed change to a column of a user (settings, role
+changes, confirmation, password changes) or its deletion evicts that user
+in the process that made it and bumps the shared cache version, so other
+processes drop their copies within ``SETTINGS_CHECK_SECONDS``, see
+:func:`app.settings_sync.sync_shared_caches`.
+"""
+
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from . import db
+from .models import User
+from .settings_sync import (
+    bump_cache_version,
+    has_column_changes,
+    sync_shared_caches,
+)
+
+
+class UserCache:
+    """Thread-safe map of user id to a detached copy with an expiry time."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.generation = 0
+
+    def get(self, user_id):
+        """Return the cached copy of *user_id* or ``None``."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            return entry[1]
+
+    def set(self, user_id, user, ttl, generation):
+        """Store *user* unless the cache was invalidated meanwhile."""
+        if ttl <= 0:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[user_id] = (time.monotonic() + ttl, user)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            self.generation += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+def user_cache():
+    """Return the user cache of the current application."""
+    cache = current_app.extensions.get("user_cache")
+    if cache is None:
+        cache = current_app.extensions.setdefault("user_cache", UserCache())
+    return cache
+
+
+def _detached_copy(user):
+    """Return a session-less copy of *user* safe to share across threads."""
+    copy = User(
+        **{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    )
+    make_transient_to_detached(copy)
+    return copy
+
+
+def load_user(user_id):
+    """Return the user with *user_id*, from the cache when possible."""
+    sync_shared_caches()
+    cache = user_cache()
+    cached = cache.get(user_id)
+    if cached is not None:
+        # merge(load=False) attaches the copy to this session without a query
+        return db.session.merge(cached, load=False)
+    generation = cache.generation
+    user = db.session.get(User, user_id)
+    if user is not None:
+        cache.set(
+            user_id,
+            _detached_copy(user),
+            current_app.config["USER_CACHE_SECONDS"],
+            generation,
+        )
+    return user
+
+
+@event.listens_for(Session, "after_flush")
+def _evict_changed_users(session, _flush_context):
+    """Drop users modified or deleted by this flush in every process.
+
+    Users only dirty through a relationship collection keep their cached
+    columns and are left alone.
+    """
+    if not has_app_context():
+        return
+    changed = [obj.id for obj in session.deleted if isinstance(obj, User)]
+    changed.extend(
+        obj.id
+        for obj in session.dirty
+        if isinstance(obj, User) and has_column_changes(obj)
+    )
+    if not changed:
+        return
+    bump_cache_version(session)
+    cache = current_app.extensions.get("user_cache")
+    if cache is not None:
+        cache.invalidate(changed)
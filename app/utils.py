@@ -1,6 +1,5 @@
 import os
 import re
-import io
 from datetime import datetime, UTC
 
 from flask import flash, current_app
@@ -8,8 +7,14 @@ from flask_mail import Message
 from smtplib import SMTPException
 
 from .docx_generator import generate_docx
+from .docx_store import fetch
 from . import mail
 
+DOCX_MIMETYPE = (
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+)
+
+
 def flash_success(message):
     flash(message, 'success')
 
@@ -17,6 +22,26 @@ def flash_error(message):
     flash(message, 'danger')
 
 
+def build_message(subject, recipients, body, attachments=None, html_body=None):
+    """Return a Flask-Mail message from the configured default sender.
+
+    See :func:`send_email` for the meaning of the parameters.
+    """
+
+    msg = Message(
+        subject,
+        recipients=recipients,
+        sender=current_app.config["MAIL_DEFAULT_SENDER"],
+    )
+    msg.body = body
+    if html_body is not None:
+        msg.html = html_body
+    if attachments:
+        for filename, content_type, data in attachments:
+            msg.attach(filename, content_type, data)
+    return msg
+
+
 def send_email(subject, recipients, body, attachments=None, html_body=None):
     """Send an email using the configured Flask-Mail extension.
 
@@ -42,17 +67,9 @@ def send_email(subject, recipients, body, attachments=None, html_body=None):
         failure) and a status string (``"sent"`` or ``"error"``).
     """
 
-    msg = Message(
-        subject,
-        recipients=recipients,
-        sender=current_app.config["MAIL_DEFAULT_SENDER"],
+    msg = build_message(
+        subject, recipients, body, attachments=attachments, html_body=html_body
     )
-    msg.body = body
-    if html_body is not None:
-        msg.html = html_body
-    if attachments:
-        for filename, content_type, data in attachments:
-            msg.attach(filename, content_type, data)
 
     status = "error"
     sent_at = None
@@ -60,7 +77,7 @@ def send_email(subject, recipients, body, attachments=None, html_body=None):
         mail.send(msg)
         sent_at = datetime.now(UTC)
         status = "sent"
-    except SMTPException as exc:
+    except (SMTPException, OSError) as exc:
         current_app.logger.error("Failed to send email: %s", exc)
     return sent_at, status
 
@@ -76,25 +93,25 @@ def build_docx_filename(zajecia):
     return f"Konsultacje z {safe_specjalista} {date_str} {safe_name}.docx"
 
 
-def send_session_docx(zajecia, recipient, subject="Raport zajęć"):
-    """Generate a DOCX report for ``zajecia`` and send it via email."""
+def send_session_docx(zajecia, recipient, subject="Raport zajęć", sent_email=None):
+    """Generate a DOCX report for ``zajecia`` and send it via email.
 
+    The document comes from :mod:`app.docx_store`; its stored name is
+    recorded in ``sent_email.file_path`` when a log row is given.
+    """
     beneficjenci = zajecia.beneficjenci
     filename = build_docx_filename(zajecia)
 
-    buffer = io.BytesIO()
     try:
-        generate_docx(zajecia, beneficjenci, buffer)
+        name, data = fetch(
+            zajecia, lambda output: generate_docx(zajecia, beneficjenci, output)
+        )
     except FileNotFoundError as exc:
         current_app.logger.error("Failed to generate session document: %s", exc)
         return None, "error"
+    if sent_email is not None:
+        sent_email.file_path = name
 
-    attachments = [
-        (
-            filename,
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            buffer.getvalue(),
-        )
-    ]
+    attachments = [(filename, DOCX_MIMETYPE, data)]
 
     return send_email(subject, [recipient], "", attachments=attachments)
@@ -0,0 +1,80 @@
+"""Micro-benchmark comparing cold and cached DOCX report renders.
+
+Run from the repository root::
+
+    python benchmarks/bench_docx_render.py --iterations 200
+
+The *cold* variant clears the template cache before every render, which
+mirrors the previous behaviour of reading and parsing ``wzor.docx`` on each
+request. The *cached* variant reuses the parsed template.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app  # noqa: E402
+from app.docx_generator import generate_docx, template_cache  # noqa: E402
+
+
+def build_session():
+    """Return a lightweight stand-in for a ``Zajecia`` row."""
+    user = SimpleNamespace(full_name="Jan Kowalski")
+    beneficjenci = [
+        SimpleNamespace(imie="Anna Nowak", wojewodztwo="Mazowieckie"),
+    ]
+    zajecia = SimpleNamespace(
+        data=date(2025, 3, 3),
+        godzina_od=dtime(10, 0),
+        godzina_do=dtime(11, 30),
+        specjalista="psychologiem",
+        user=user,
+        beneficjenci=beneficjenci,
+    )
+    return zajecia, beneficjenci
+
+
+def measure(iterations, cold):
+    """Return renders per second for the selected cache mode."""
+    zajecia, beneficjenci = build_session()
+    template_cache.clear()
+    generate_docx(zajecia, beneficjenci, io.BytesIO())
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if cold:
+            template_cache.clear()
+        generate_docx(zajecia, beneficjenci, io.BytesIO())
+    elapsed = time.perf_counter() - start
+    return iterations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(
+            {
+                "SECRET_KEY": "bench",
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp}/bench.db",
+            }
+        )
+        with app.app_context():
+            cold = measure(args.iterations, cold=True)
+            cached = measure(args.iterations, cold=False)
+
+    print(f"cold:   {cold:8.1f} renders/s")
+    print(f"cached: {cached:8.1f} renders/s")
+    print(f"speedup: {cached / cold:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
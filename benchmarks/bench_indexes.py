@@ -0,0 +1,191 @@
+"""Benchmark list-view queries with and without the list view indexes.
+
+Run from the repository root::
+
+    python benchmarks/bench_indexes.py --sessions 100000
+
+A temporary SQLite database is migrated and seeded by ``flask seed`` with
+``--sessions`` consultation sessions spread over ``--instructors``
+instructors and both migrated projects. The queries run by
+``sessions/routes.py`` and ``admin/routes.py`` are timed, for the first and
+the next keyset page where the view paginates. They are timed with the
+indexes from migrations ``7f3a9c2e1b6d`` and ``a8c0e2f4b6d1`` and again
+after dropping them.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy.orm import contains_eager, joinedload, selectinload  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.bootstrap import bootstrap  # noqa: E402
+from app.models import (  # noqa: E402
+    Beneficjent,
+    SentEmail,
+    Zajecia,
+    zajecia_beneficjenci,
+)
+from app.pagination import keyset_paginate  # noqa: E402
+from app.seed import seed_database  # noqa: E402
+
+INDEXES = [
+    "ix_zajecia_user_project_data",
+    "ix_zajecia_project_data",
+    "ix_beneficjent_user_project_imie",
+    "ix_beneficjent_project_imie_id",
+    "ix_sent_email_zajecia_id",
+    "ix_zajecia_beneficjenci_zajecia_id",
+    "ix_zajecia_beneficjenci_beneficjent_id",
+]
+# The migrations create "ATNIS V" (1, archived) and "ATNIS VI" (2, active).
+ACTIVE_PROJECT = 2
+PER_PAGE = 50
+ZAJECIA_ORDER = [Zajecia.data, Zajecia.godzina_od, Zajecia.id]
+BENEFICJENCI_ORDER = [Beneficjent.imie, Beneficjent.id]
+
+
+def busiest_instructor():
+    """Return the id of the instructor with most sessions in the project."""
+    return db.session.scalar(
+        db.select(Zajecia.user_id)
+        .where(Zajecia.project_id == ACTIVE_PROJECT)
+        .group_by(Zajecia.user_id)
+        .order_by(db.func.count().desc())
+        .limit(1)
+    )
+
+
+def _pages(label, make_query, columns, descending=True):
+    """Return runners for the first page of a list and the one after it."""
+
+    def page(after=None):
+        return keyset_paginate(
+            make_query(), columns, after, PER_PAGE, descending=descending
+        )
+
+    cursor = page().next_cursor
+    runners = {label: page}
+    if cursor:
+        runners[f"{label} (next)"] = lambda: page(cursor)
+    return runners
+
+
+def queries(user_id):
+    """Return the queries of the list views keyed by a short label."""
+    return {
+        **_pages(
+            "lista_zajec",
+            lambda: Zajecia.query.options(joinedload(Zajecia.user)).filter_by(
+                user_id=user_id, project_id=ACTIVE_PROJECT
+            ),
+            ZAJECIA_ORDER,
+        ),
+        "api_zajecia": lambda: db.session.query(
+            Zajecia.data, Zajecia.godzina_od, Zajecia.godzina_do, Zajecia.specjalista
+        )
+        .filter(
+            Zajecia.user_id == user_id,
+            Zajecia.data >= date(2025, 6, 1),
+            Zajecia.data < date(2025, 7, 14),
+            Zajecia.project_id == ACTIVE_PROJECT,
+        )
+        .order_by(Zajecia.data, Zajecia.godzina_od)
+        .all(),
+        **_pages(
+            "lista_beneficjentow",
+            lambda: Beneficjent.query.filter_by(
+                user_id=user_id, project_id=ACTIVE_PROJECT
+            ),
+            BENEFICJENCI_ORDER,
+            descending=False,
+        ),
+        **_pages(
+            "admin_zajecia",
+            lambda: Zajecia.query.options(
+                joinedload(Zajecia.user), selectinload(Zajecia.beneficjenci)
+            ).filter_by(project_id=ACTIVE_PROJECT),
+            ZAJECIA_ORDER,
+        ),
+        **_pages(
+            "admin_beneficjenci",
+            lambda: Beneficjent.query.options(
+                joinedload(Beneficjent.user)
+            ).filter_by(project_id=ACTIVE_PROJECT),
+            BENEFICJENCI_ORDER,
+            descending=False,
+        ),
+        "emails_list": lambda: SentEmail.query.join(Zajecia)
+        .options(contains_eager(SentEmail.zajecia))
+        .filter(Zajecia.user_id == user_id, Zajecia.project_id == ACTIVE_PROJECT)
+        .order_by(SentEmail.sent_at.desc(), SentEmail.id.desc())
+        .all(),
+        "beneficjenci of session": lambda: db.session.execute(
+            zajecia_beneficjenci.select().where(
+                zajecia_beneficjenci.c.zajecia_id == 4242
+            )
+        ).all(),
+    }
+
+
+def measure(repeat, user_id):
+    """Return the best time of each query in milliseconds."""
+    results = {}
+    for label, run in queries(user_id).items():
+        best = float("inf")
+        for _ in range(repeat):
+            db.session.expunge_all()
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        results[label] = best * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--instructors", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(
+            {
+                "SECRET_KEY": "bench",
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp}/bench.db",
+            }
+        )
+        with app.app_context():
+            bootstrap()
+            seed_start = time.perf_counter()
+            seed_database(args.instructors, args.sessions, projects=2)
+            db.session.execute(db.text("ANALYZE"))
+            print(
+                f"seeded {args.sessions} sessions in "
+                f"{time.perf_counter() - seed_start:.1f}s"
+            )
+            user_id = busiest_instructor()
+            with_indexes = measure(args.repeat, user_id)
+            for name in INDEXES:
+                db.session.execute(db.text(f"DROP INDEX {name}"))
+            db.session.execute(db.text("ANALYZE"))
+            db.session.commit()
+            without = measure(args.repeat, user_id)
+            db.session.remove()
+            db.engine.dispose()
+
+    print(f"{'query':<30}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for label, after in with_indexes.items():
+        before = without[label]
+        print(f"{label:<30}{before:12.2f}{after:12.2f}{before / after:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Benchmark application start-up with and without the bootstrap step.
+
+Run from the repository root::
+
+    python benchmarks/bench_startup.py --iterations 20
+
+*before* repeats what ``create_app`` used to do on every start: build the
+app, run ``flask_migrate.upgrade()`` and upsert the superadmin with a fresh
+password hash. *after* only builds the app, as every worker, test and CLI
+call now does; the schema work runs once from ``flask bootstrap``.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask_migrate import upgrade  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.bootstrap import bootstrap  # noqa: E402
+from app.models import Roles, User  # noqa: E402
+
+ADMIN_EMAIL = "admin@example.com"
+
+
+def legacy_startup(config):
+    """Create the app the way ``create_app`` did before ``flask bootstrap``."""
+    app = create_app(config)
+    with app.app_context():
+        upgrade()
+        admin = User.query.filter_by(email=ADMIN_EMAIL).first()
+        admin.role = Roles.SUPERADMIN
+        admin.set_password("bench-password")
+        db.session.commit()
+    return app
+
+
+def measure(iterations, startup, config):
+    """Return the median start-up time in milliseconds."""
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        app = startup(config)
+        timings.append(time.perf_counter() - start)
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+    # Alembic logs every revision it checks; keep the output readable.
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {
+            "SECRET_KEY": "bench",
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp}/bench.db",
+        }
+        os.environ.update(
+            SUPERADMIN_USERNAME="admin",
+            SUPERADMIN_PASSWORD="bench-password",
+            SUPERADMIN_EMAIL=ADMIN_EMAIL,
+        )
+        app = create_app(config)
+        with app.app_context():
+            bootstrap()
+            db.engine.dispose()
+
+        before = measure(args.iterations, legacy_startup, config)
+        after = measure(args.iterations, create_app, config)
+
+    print(f"before: {before:8.1f} ms per create_app")
+    print(f"after:  {after:8.1f} ms per create_app")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""Benchmark suite for the key request paths with JSON results.
+
+Run from the repository root::
+
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --instructors 300 --sessions 50000 \\
+        --load-seconds 30 --compare benchmarks/results/previous.json
+
+A temporary SQLite database is migrated and seeded with the deterministic
+dataset of ``flask seed``: ``--instructors`` instructors and their
+beneficiaries, plus ``--sessions`` sessions spread over four project
+editions, and an administrator. The seed depends only on ``--seed``. The
+suite then times these paths through the WSGI app, ``--repeat`` times each:
+
+- ``login``
+- ``lista_zajec``, with and without ``q``
+- ``api_zajecia``
+- ``pobierz_docx``
+- ``admin_zajecia``
+
+Unless ``--load-seconds`` is ``0``, it also starts gunicorn on the seeded
+database. ``--users`` virtual users then log in and browse a weighted mix
+of pages until the time is up, the way locust would.
+
+Results are written as JSON to ``--output``, by default
+``benchmarks/results/<timestamp>.json``, so runs can be compared over
+time. ``--compare`` prints the change against an earlier file.
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import random
+import re
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import UTC, datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app import create_app, db  # noqa: E402
+from app.bootstrap import bootstrap  # noqa: E402
+from app.models import Beneficjent, Roles, User, Zajecia  # noqa: E402
+from app.seed import seed_database  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+PASSWORD = "bench-password"
+ADMIN_EMAIL = "admin@example.com"
+# The migrations create "ATNIS V" (1, archived) and "ATNIS VI" (2, active);
+# seeding adds two more archived editions.
+ACTIVE_PROJECT = 2
+PROJECTS = 4
+# Weighted page mix of a virtual user in the load scenario.
+LOAD_MIX = (
+    ("lista_zajec", 4),
+    ("lista_zajec?q", 2),
+    ("api_zajecia", 4),
+    ("pobierz_docx", 1),
+)
+
+
+def seed(instructors, sessions, random_seed):
+    """Seed the dataset with :func:`app.seed.seed_database`; return the counts.
+
+    An administrator is added on top of the seeded instructors.
+    """
+    admin = User(
+        full_name="Administrator",
+        email=ADMIN_EMAIL,
+        role=Roles.ADMIN,
+        confirmed=True,
+    )
+    admin.set_password(PASSWORD)
+    db.session.add(admin)
+    db.session.commit()
+    counts = seed_database(
+        instructors,
+        sessions,
+        projects=PROJECTS,
+        password=PASSWORD,
+        seed=random_seed,
+    )
+    db.session.execute(db.text("ANALYZE"))
+    return counts
+
+
+def pick_accounts(count):
+    """Return ``(email, zajecia_ids, q)`` of the busiest instructors.
+
+    ``zajecia_ids`` are the instructor's sessions in the active project and
+    ``q`` a surname of one of their beneficiaries.
+    """
+    user_ids = db.session.scalars(
+        db.select(Zajecia.user_id)
+        .where(Zajecia.project_id == ACTIVE_PROJECT)
+        .group_by(Zajecia.user_id)
+        .order_by(db.func.count().desc(), Zajecia.user_id)
+        .limit(count)
+    ).all()
+    accounts = []
+    for user_id in user_ids:
+        zajecia_ids = db.session.scalars(
+            db.select(Zajecia.id)
+            .where(Zajecia.user_id == user_id, Zajecia.project_id == ACTIVE_PROJECT)
+            .order_by(Zajecia.id)
+        ).all()
+        imie = db.session.scalar(
+            db.select(Beneficjent.imie)
+            .where(Beneficjent.user_id == user_id)
+            .order_by(Beneficjent.id)
+            .limit(1)
+        )
+        email = db.session.get(User, user_id).email
+        accounts.append((email, zajecia_ids, imie.split()[-1]))
+    return accounts
+
+
+def summarize(latencies):
+    """Return latency statistics in milliseconds."""
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+    return {
+        "n": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 3),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": round(statistics.median(ordered) * 1000, 3),
+        "p95_ms": round(percentile(0.95), 3),
+        "p99_ms": round(percentile(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def login(client, email):
+    resp = client.post("/login", data={"email": email, "password": PASSWORD})
+    if resp.status_code != 302:
+        raise RuntimeError(f"login as {email} failed: {resp.status_code}")
+
+
+def measure_paths(app, repeat, email, zajecia_ids, q):
+    """Time each key path through the WSGI app."""
+    instructor = app.test_client()
+    login(instructor, email)
+    admin = app.test_client()
+    login(admin, ADMIN_EMAIL)
+    docx_ids = iter(zajecia_ids * (repeat // max(len(zajecia_ids), 1) + 2))
+
+    paths = {
+        "login": lambda: login(app.test_client(), email),
+        "lista_zajec": lambda: instructor.get("/zajecia"),
+        "lista_zajec?q": lambda: instructor.get(
+            "/zajecia", query_string={"q": q}
+        ),
+        "api_zajecia": lambda: instructor.get(
+            "/api/zajecia", query_string={"start": "2023-01-01", "end": "2027-01-01"}
+        ),
+        # Every download is of another session, so each one is rendered.
+        "pobierz_docx": lambda: instructor.get(f"/zajecia/{next(docx_ids)}/docx"),
+        "admin_zajecia": lambda: admin.get("/admin/zajecia"),
+    }
+    results = {}
+    for name, run in paths.items():
+        run()  # warm up caches and templates
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            resp = run()
+            latencies.append(time.perf_counter() - start)
+            if resp is not None and resp.status_code != 200:
+                raise RuntimeError(f"{name} returned {resp.status_code}")
+        results[name] = summarize(latencies)
+        print(f"{name:<16}{results[name]['p50_ms']:10.2f} ms p50"
+              f"{results[name]['p95_ms']:10.2f} ms p95")
+    return results
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(database_url, docx_dir, workers, threads):
+    """Start gunicorn serving ``run:app``; return ``(process, base_url)``."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "SECRET_KEY": "bench",
+        "DATABASE_URL": database_url,
+        "DOCX_STORE_DIR": docx_dir,
+        "RATE_LIMIT_PERIOD": "0",
+        "MAIL_SUPPRESS_SEND": "true",
+    }
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn",
+            "--workers", str(workers),
+            "--threads", str(threads),
+            "--bind", f"127.0.0.1:{port}",
+            "--log-level", "warning",
+            "run:app",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            urllib.request.urlopen(f"{base_url}/healthz", timeout=1).close()
+            return process, base_url
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("gunicorn did not start")
+            time.sleep(0.2)
+
+
+class VirtualUser:
+    """Browser-like client with its own cookie jar."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data else None
+        with self.opener.open(self.base_url + path, body, timeout=30) as resp:
+            return resp.read()
+
+    def login(self, email):
+        page = self.request("/login").decode()
+        token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', page)
+        self.request(
+            "/login",
+            {"csrf_token": token.group(1), "email": email, "password": PASSWORD},
+        )
+
+
+def run_load(base_url, users, seconds, accounts, rng):
+    """Browse with *users* virtual users for *seconds*; return statistics."""
+    names = [name for name, _ in LOAD_MIX]
+    weights = [weight for _, weight in LOAD_MIX]
+    latencies = {name: [] for name in names}
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+    plans = [
+        (accounts[i % len(accounts)], random.Random(rng.random()))
+        for i in range(users)
+    ]
+
+    def browse(account, user_rng):
+        email, zajecia_ids, q = account
+        user = VirtualUser(base_url)
+        try:
+            user.login(email)
+        except (OSError, AttributeError) as exc:
+            with lock:
+                errors.append(f"login: {exc}")
+            return
+        paths = {
+            "lista_zajec": lambda: "/zajecia",
+            "lista_zajec?q": lambda: f"/zajecia?q={urllib.parse.quote(q)}",
+            "api_zajecia": lambda: "/api/zajecia?start=2023-01-01&end=2027-01-01",
+            "pobierz_docx": lambda: f"/zajecia/{user_rng.choice(zajecia_ids)}/docx",
+        }
+        while time.monotonic() < deadline:
+            name = user_rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                user.request(paths[name]())
+            except (OSError, urllib.error.HTTPError) as exc:
+                with lock:
+                    errors.append(f"{name}: {exc}")
+                continue
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[name].append(elapsed)
+
+    threads = [threading.Thread(target=browse, args=plan) for plan in plans]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = sum(len(values) for values in latencies.values())
+    result = {
+        "users": users,
+        "seconds": round(elapsed, 3),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "errors": len(errors),
+        "error_samples": errors[:10],
+        "paths": {
+            name: summarize(values) for name, values in latencies.items() if values
+        },
+    }
+    print(f"load: {total} requests in {elapsed:.1f}s "
+          f"({result['throughput_rps']} req/s), {len(errors)} errors")
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _all_paths(results):
+    paths = dict(results.get("paths", {}))
+    for name, stats in results.get("load", {}).get("paths", {}).items():
+        paths[f"load {name}"] = stats
+    return paths
+
+
+def compare(previous_path, results):
+    """Print the p50 change of every path against an earlier result file."""
+    with open(previous_path) as fh:
+        previous = json.load(fh)
+    old = _all_paths(previous)
+    print(f"\ncompared with {previous_path} ({previous['meta'].get('revision')}):")
+    print(f"{'path':<24}{'before p50':>12}{'after p50':>12}{'change':>10}")
+    for name, stats in _all_paths(results).items():
+        if name not in old:
+            continue
+        before, after = old[name]["p50_ms"], stats["p50_ms"]
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"{name:<24}{before:12.2f}{after:12.2f}{change:+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instructors", type=int, default=300)
+    parser.add_argument("--sessions", type=int, default=30_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--load-seconds", type=float, default=15)
+    parser.add_argument("--users", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--output")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {
+        "meta": {
+            "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "args": vars(args),
+        }
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        app = create_app(
+            {
+                "SECRET_KEY": "bench",
+                "WTF_CSRF_ENABLED": False,
+                "SQLALCHEMY_DATABASE_URI": database_url,
+                "DOCX_STORE_DIR": f"{tmp}/docx",
+            }
+        )
+        app.config["RATE_LIMIT_PERIOD"] = 0
+        with app.app_context():
+            bootstrap()
+            seed_start = time.perf_counter()
+            results["meta"]["dataset"] = seed(
+                args.instructors, args.sessions, args.seed
+            )
+            results["meta"]["seed_seconds"] = round(
+                time.perf_counter() - seed_start, 3
+            )
+            accounts = pick_accounts(max(args.users, 1))
+            email, zajecia_ids, q = accounts[0]
+            db.session.remove()
+        print(f"seeded {args.sessions} sessions in "
+              f"{results['meta']['seed_seconds']}s")
+        # Outside the app context, so every request gets its own, as in
+        # production.
+        results["paths"] = measure_paths(app, args.repeat, email, zajecia_ids, q)
+        with app.app_context():
+            db.engine.dispose()
+
+        if args.load_seconds > 0:
+            process, base_url = start_gunicorn(
+                database_url, f"{tmp}/docx-load", args.workers, args.threads
+            )
+            try:
+                results["load"] = run_load(
+                    base_url, args.users, args.load_seconds, accounts, rng
+                )
+                results["load"].update(workers=args.workers, threads=args.threads)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+    output = args.output or os.path.join(
+        os.path.dirname(__file__),
+        "results",
+        datetime.now().strftime("%Y%m%d-%H%M%S") + ".json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as fh:
+        json.dump(results, fh, indent=2, ensure_ascii=False)
+    print(f"results written to {output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
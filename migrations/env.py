@@ -36,6 +36,15 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Hide the search index (migration 9a7c3e5f1b2d) from autogenerate."""
+    if type_ == 'table' and name.startswith(('zajecia_fts', 'beneficjent_fts')):
+        return False
+    if type_ == 'index' and name in ('ix_zajecia_search', 'ix_beneficjent_search'):
+        return False
+    return True
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -84,6 +93,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = current_app.extensions['migrate'].db.engine
 
@@ -0,0 +1,55 @@
+"""add indexes for foreign keys and list view filters
+
+Revision ID: 7f3a9c2e1b6d
+Revises: e5b21c7d9a4f
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3a9c2e1b6d'
+down_revision = 'e5b21c7d9a4f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_zajecia_user_project_data',
+        'zajecia',
+        ['user_id', 'project_id', 'data', 'godzina_od'],
+    )
+    op.create_index(
+        'ix_zajecia_project_data', 'zajecia', ['project_id', 'data', 'godzina_od']
+    )
+    op.create_index(
+        'ix_beneficjent_user_project_imie',
+        'beneficjent',
+        ['user_id', 'project_id', 'imie'],
+    )
+    op.create_index('ix_beneficjent_project_id', 'beneficjent', ['project_id'])
+    op.create_index('ix_sent_email_zajecia_id', 'sent_email', ['zajecia_id'])
+    op.create_index(
+        'ix_zajecia_beneficjenci_zajecia_id', 'zajecia_beneficjenci', ['zajecia_id']
+    )
+    op.create_index(
+        'ix_zajecia_beneficjenci_beneficjent_id',
+        'zajecia_beneficjenci',
+        ['beneficjent_id'],
+    )
+
+
+def downgrade():
+    op.drop_index(
+        'ix_zajecia_beneficjenci_beneficjent_id', table_name='zajecia_beneficjenci'
+    )
+    op.drop_index(
+        'ix_zajecia_beneficjenci_zajecia_id', table_name='zajecia_beneficjenci'
+    )
+    op.drop_index('ix_sent_email_zajecia_id', table_name='sent_email')
+    op.drop_index('ix_beneficjent_project_id', table_name='beneficjent')
+    op.drop_index('ix_beneficjent_user_project_imie', table_name='beneficjent')
+    op.drop_index('ix_zajecia_project_data', table_name='zajecia')
+    op.drop_index('ix_zajecia_user_project_data', table_name='zajecia')
@@ -15,13 +15,14 @@ roles_enum = sa.Enum('ADMIN', 'INSTRUCTOR', name='roles')
 
 def upgrade():
     roles_enum.create(op.get_bind(), checkfirst=True)
-    op.execute("UPDATE user SET role = UPPER(role)")
+    op.execute('UPDATE "user" SET role = UPPER(role)')
     with op.batch_alter_table('user', schema=None) as batch_op:
         batch_op.alter_column(
             'role',
             existing_type=sa.String(length=20),
             type_=roles_enum,
             existing_nullable=True,
+            postgresql_using='role::roles',
         )
 
 
@@ -32,5 +33,6 @@ def downgrade():
             existing_type=roles_enum,
             type_=sa.String(length=20),
             existing_nullable=True,
+            postgresql_using='role::text',
         )
     roles_enum.drop(op.get_bind(), checkfirst=True)
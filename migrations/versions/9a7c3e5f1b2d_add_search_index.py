@@ -0,0 +1,100 @@
+"""add full-text search index for sessions and beneficiaries
+
+Revision ID: 9a7c3e5f1b2d
+Revises: 7f3a9c2e1b6d
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9a7c3e5f1b2d'
+down_revision = '7f3a9c2e1b6d'
+branch_labels = None
+depends_on = None
+
+# SQLite: FTS5 tables holding a copy of the searched columns. The unicode61
+# tokenizer strips most diacritics, "ł" is folded explicitly because it has
+# no Unicode decomposition. Later batch (table copy) migrations of these
+# tables drop the triggers and must recreate them.
+FTS_TABLES = {
+    'zajecia_fts': ('zajecia', ['specjalista']),
+    'beneficjent_fts': ('beneficjent', ['imie', 'wojewodztwo']),
+}
+
+
+def _fold(expr):
+    return f"replace(replace({expr}, 'ł', 'l'), 'Ł', 'L')"
+
+
+def _upgrade_sqlite(conn):
+    if not conn.execute(sa.text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+        return
+    for fts, (source, columns) in FTS_TABLES.items():
+        names = ', '.join(columns)
+        new_values = ', '.join(_fold(f'new.{c}') for c in columns)
+        op.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5("
+            f"{names}, tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            f"INSERT INTO {fts} (rowid, {names}) "
+            f"SELECT id, {', '.join(_fold(c) for c in columns)} FROM {source}"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {source} BEGIN "
+            f"INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new_values}); "
+            "END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {source} BEGIN "
+            f"DELETE FROM {fts} WHERE rowid = old.id; "
+            "END"
+        )
+        op.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {source} BEGIN "
+            f"DELETE FROM {fts} WHERE rowid = old.id; "
+            f"INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new_values}); "
+            "END"
+        )
+
+
+def _upgrade_postgresql():
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute(
+        "CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS "
+        "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    )
+    op.execute(
+        "CREATE INDEX ix_zajecia_search ON zajecia USING gin "
+        "(to_tsvector('simple'::regconfig, immutable_unaccent(specjalista)))"
+    )
+    op.execute(
+        "CREATE INDEX ix_beneficjent_search ON beneficjent USING gin "
+        "(to_tsvector('simple'::regconfig, "
+        "immutable_unaccent(imie || ' ' || wojewodztwo)))"
+    )
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == 'sqlite':
+        _upgrade_sqlite(conn)
+    elif conn.dialect.name == 'postgresql':
+        _upgrade_postgresql()
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == 'sqlite':
+        for fts in FTS_TABLES:
+            for suffix in ('ai', 'ad', 'au'):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
+    elif conn.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_beneficjent_search")
+        op.execute("DROP INDEX IF EXISTS ix_zajecia_search")
+        op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
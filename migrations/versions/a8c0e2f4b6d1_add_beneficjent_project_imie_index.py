@@ -0,0 +1,32 @@
+"""index beneficjent by project and name for admin pagination
+
+Revision ID: a8c0e2f4b6d1
+Revises: f2a4c6e8b0d3
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8c0e2f4b6d1'
+down_revision = 'f2a4c6e8b0d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The admin list pages through a project by (imie, id); with only the
+    # project_id index every page sorted the whole project. The new index
+    # starts with project_id, so it replaces the old one.
+    op.create_index(
+        'ix_beneficjent_project_imie_id',
+        'beneficjent',
+        ['project_id', 'imie', 'id'],
+    )
+    op.drop_index('ix_beneficjent_project_id', table_name='beneficjent')
+
+
+def downgrade():
+    op.create_index('ix_beneficjent_project_id', 'beneficjent', ['project_id'])
+    op.drop_index('ix_beneficjent_project_imie_id', table_name='beneficjent')
@@ -0,0 +1,29 @@
+"""add the search cache counter to cache_version
+
+Revision ID: b9d1f3a5c7e2
+Revises: a8c0e2f4b6d1
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b9d1f3a5c7e2'
+down_revision = 'a8c0e2f4b6d1'
+branch_labels = None
+depends_on = None
+
+cache_version = sa.table(
+    'cache_version',
+    sa.column('id', sa.Integer),
+    sa.column('version', sa.Integer),
+)
+
+
+def upgrade():
+    op.bulk_insert(cache_version, [{'id': 2, 'version': 0}])
+
+
+def downgrade():
+    op.execute(cache_version.delete().where(cache_version.c.id == 2))
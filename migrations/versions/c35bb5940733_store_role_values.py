@@ -27,11 +27,11 @@ def upgrade():
         op.execute("ALTER TYPE roles RENAME TO roles_old")
         new_roles.create(bind)
         op.execute(
-            'ALTER TABLE "user" ALTER COLUMN role TYPE roles USING LOWER(role)::text::roles'
+            'ALTER TABLE "user" ALTER COLUMN role TYPE roles USING LOWER(role::text)::roles'
         )
         op.execute("DROP TYPE roles_old")
     else:
-        op.execute("UPDATE user SET role = LOWER(role)")
+        op.execute('UPDATE "user" SET role = LOWER(role)')
         with op.batch_alter_table("user", schema=None) as batch_op:
             batch_op.alter_column(
                 "role", existing_type=old_roles, type_=new_roles, existing_nullable=True
@@ -45,11 +45,11 @@ def downgrade():
         op.execute("ALTER TYPE roles RENAME TO roles_old")
         old_roles.create(bind)
         op.execute(
-            'ALTER TABLE "user" ALTER COLUMN role TYPE roles USING UPPER(role)::text::roles'
+            'ALTER TABLE "user" ALTER COLUMN role TYPE roles USING UPPER(role::text)::roles'
         )
         op.execute("DROP TYPE roles_old")
     else:
-        op.execute("UPDATE user SET role = UPPER(role)")
+        op.execute('UPDATE "user" SET role = UPPER(role)')
         with op.batch_alter_table("user", schema=None) as batch_op:
             batch_op.alter_column(
                 "role", existing_type=new_roles, type_=old_roles, existing_nullable=True
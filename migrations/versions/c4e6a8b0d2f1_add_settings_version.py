@@ -0,0 +1,28 @@
+"""add settings_version to settings
+
+Revision ID: c4e6a8b0d2f1
+Revises: 9a7c3e5f1b2d
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c4e6a8b0d2f1'
+down_revision = '9a7c3e5f1b2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'settings',
+        sa.Column(
+            'settings_version', sa.Integer(), nullable=False, server_default='0'
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column('settings', 'settings_version')
@@ -49,6 +49,15 @@ def upgrade():
         {'now': now},
     )
 
+    if conn.dialect.name == 'postgresql':
+        # The rows above bypassed the SERIAL sequence.
+        conn.execute(
+            sa.text(
+                "SELECT setval(pg_get_serial_sequence('projekt', 'id'), "
+                "(SELECT MAX(id) FROM projekt))"
+            )
+        )
+
     conn.execute(sa.text("UPDATE beneficjent SET project_id = 1"))
     conn.execute(sa.text("UPDATE zajecia SET project_id = 1"))
 
@@ -0,0 +1,34 @@
+"""add outbox fields to sent_email
+
+Revision ID: e5b21c7d9a4f
+Revises: d4e8f1a2b3c4
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b21c7d9a4f'
+down_revision = 'd4e8f1a2b3c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sent_email') as batch_op:
+        batch_op.add_column(
+            sa.Column('attempts', sa.Integer(), nullable=False, server_default='0')
+        )
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(
+            'ix_sent_email_status_next_attempt_at', ['status', 'next_attempt_at']
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('sent_email') as batch_op:
+        batch_op.drop_index('ix_sent_email_status_next_attempt_at')
+        batch_op.drop_column('next_attempt_at')
+        batch_op.drop_column('attempts')
@@ -0,0 +1,45 @@
+"""add rate_limit_bucket and widen user.password_hash
+
+Revision ID: e7d3f5a9c1b8
+Revises: c4e6a8b0d2f1
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e7d3f5a9c1b8'
+down_revision = 'c4e6a8b0d2f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'rate_limit_bucket',
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('key'),
+    )
+    # scrypt hashes are longer than 128 characters; SQLite does not enforce
+    # the length, so only other databases need the column widened.
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column(
+            'user',
+            'password_hash',
+            existing_type=sa.String(length=128),
+            type_=sa.String(length=255),
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        op.alter_column(
+            'user',
+            'password_hash',
+            existing_type=sa.String(length=255),
+            type_=sa.String(length=128),
+        )
+    op.drop_table('rate_limit_bucket')
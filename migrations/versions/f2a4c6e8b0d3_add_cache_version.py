@@ -0,0 +1,29 @@
+"""add cache_version
+
+Revision ID: f2a4c6e8b0d3
+Revises: e7d3f5a9c1b8
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f2a4c6e8b0d3'
+down_revision = 'e7d3f5a9c1b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_version = op.create_table(
+        'cache_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.bulk_insert(cache_version, [{'id': 1, 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('cache_version')
@@ -16,22 +16,35 @@ branch_labels = None
 depends_on = None
 
 
-def upgrade():
-    with op.batch_alter_table('sent_email', recreate='always') as batch_op:
-        batch_op.create_foreign_key(
+def _replace_foreign_key(**kwargs):
+    if op.get_bind().dialect.name == 'postgresql':
+        # PostgreSQL named the original constraint the same way; swap it
+        # in place instead of copying the table.
+        op.drop_constraint(
+            'sent_email_zajecia_id_fkey', 'sent_email', type_='foreignkey'
+        )
+        op.create_foreign_key(
             'sent_email_zajecia_id_fkey',
+            'sent_email',
             'zajecia',
             ['zajecia_id'],
             ['id'],
-            ondelete='CASCADE',
+            **kwargs,
         )
-
-
-def downgrade():
+        return
     with op.batch_alter_table('sent_email', recreate='always') as batch_op:
         batch_op.create_foreign_key(
             'sent_email_zajecia_id_fkey',
             'zajecia',
             ['zajecia_id'],
             ['id'],
+            **kwargs,
         )
+
+
+def upgrade():
+    _replace_foreign_key(ondelete='CASCADE')
+
+
+def downgrade():
+    _replace_foreign_key()
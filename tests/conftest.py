@@ -1,9 +1,13 @@
 """Common pytest fixtures used across test modules."""
 
+import shutil
 import sys
 import pytest
+from contextlib import contextmanager
 from datetime import datetime, UTC
 import flask_login.login_manager as login_manager
+from flask_migrate import upgrade
+from sqlalchemy import event
 from app import create_app, db
 from app.models import User
 
@@ -25,6 +29,7 @@ def build_test_config(db_path):
         "MAIL_SUPPRESS_SEND": True,
         "SECRET_KEY": "test-secret",
         "SQLALCHEMY_DATABASE_URI": f"sqlite:///{db_path.as_posix()}",
+        "DOCX_STORE_DIR": str(db_path.parent / "docx"),
     }
 
 
@@ -34,8 +39,24 @@ def dispose_app(app):
         db.engine.dispose()
 
 
+def migrate(app):
+    """Apply all migrations to the database of *app*."""
+    with app.app_context():
+        upgrade()
+
+
+@pytest.fixture(scope="session")
+def migrated_db(tmp_path_factory):
+    """Return a database file migrated once per run; tests get a copy."""
+    path = tmp_path_factory.mktemp("template") / "konsultacje.db"
+    template_app = create_app(build_test_config(path))
+    migrate(template_app)
+    dispose_app(template_app)
+    return path
+
+
 @pytest.fixture
-def app(monkeypatch, tmp_path):
+def app(monkeypatch, tmp_path, migrated_db):
     """Create a new application instance for testing."""
 
     # Reload routes so they register on a fresh app instance
@@ -44,7 +65,9 @@ def app(monkeypatch, tmp_path):
     if hasattr(app_package, "routes"):
         delattr(app_package, "routes")
 
-    app = create_app(build_test_config(tmp_path / "konsultacje.db"))
+    db_path = tmp_path / "konsultacje.db"
+    shutil.copyfile(migrated_db, db_path)
+    app = create_app(build_test_config(db_path))
     yield app
     dispose_app(app)
 
@@ -82,3 +105,35 @@ def auth(login):
             return login(email, password)
 
     return AuthActions()
+
+
+@pytest.fixture
+def assert_max_queries(app):
+    """Fail if the wrapped block runs more than ``limit`` SQL statements.
+
+    Used to catch N+1 regressions in list views::
+
+        with assert_max_queries(8):
+            client.get("/zajecia")
+    """
+
+    @contextmanager
+    def check(limit):
+        statements = []
+
+        def record(_conn, _cursor, statement, *_args):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+        assert len(statements) <= limit, (
+            f"{len(statements)} queries executed, expected at most {limit}:\n"
+            + "\n".join(statements)
+        )
+
+    return check
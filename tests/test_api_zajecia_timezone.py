@@ -58,3 +58,81 @@ def test_api_zajecia_returns_timezone(app, client):
     end = datetime.fromisoformat(data[0]["end"])
     assert start.tzinfo is not None
     assert end.tzinfo is not None
+
+
+def add_sessions(app, user_id, days):
+    with app.app_context():
+        for day in days:
+            db.session.add(
+                Zajecia(
+                    data=day,
+                    godzina_od=time(9, 0),
+                    godzina_do=time(10, 30),
+                    specjalista=f"spec {day.isoformat()}",
+                    user_id=user_id,
+                )
+            )
+        db.session.commit()
+
+
+def test_api_zajecia_honours_visible_range(app, client):
+    user_id = create_user(app)
+    login(client)
+    add_sessions(
+        app, user_id, [date(2024, 2, 28), date(2024, 3, 1), date(2024, 3, 31)]
+    )
+
+    resp = client.get(
+        "/api/zajecia?start=2024-02-26T00:00:00%2B01:00&end=2024-03-31"
+    )
+
+    assert resp.status_code == 200
+    assert [e["title"] for e in resp.get_json()] == [
+        "spec 2024-02-28",
+        "spec 2024-03-01",
+    ]
+
+
+def test_api_zajecia_offsets_follow_dst(app, client):
+    app.config["TIMEZONE"] = "Europe/Warsaw"
+    user_id = create_user(app)
+    login(client)
+    add_sessions(
+        app,
+        user_id,
+        [date(2024, 3, 30), date(2024, 3, 31), date(2024, 10, 27)],
+    )
+
+    resp = client.get("/api/zajecia?start=2024-01-01&end=2025-01-01")
+
+    starts = [e["start"] for e in resp.get_json()]
+    assert starts == [
+        "2024-03-30T09:00:00+01:00",
+        "2024-03-31T09:00:00+02:00",
+        "2024-10-27T09:00:00+01:00",
+    ]
+    assert resp.get_json()[0]["end"] == "2024-03-30T10:30:00+01:00"
+
+
+def test_api_zajecia_returns_304_for_unchanged_range(app, client):
+    user_id = create_user(app)
+    login(client)
+    add_sessions(app, user_id, [date(2024, 3, 1)])
+    url = "/api/zajecia?start=2024-03-01&end=2024-04-01"
+
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    again = client.get(url, headers={"If-None-Match": etag})
+    add_sessions(app, user_id, [date(2024, 3, 2)])
+    changed = client.get(url, headers={"If-None-Match": etag})
+
+    assert again.status_code == 304
+    assert changed.status_code == 200
+    assert len(changed.get_json()) == 2
+
+
+def test_api_zajecia_rejects_invalid_range(app, client):
+    create_user(app)
+    login(client)
+
+    assert client.get("/api/zajecia?start=jutro").status_code == 400
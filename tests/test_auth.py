@@ -1,6 +1,7 @@
 """Tests for authentication and password reset flows."""
 
 import re
+import shutil
 import pytest
 from smtplib import SMTPException
 
@@ -10,7 +11,7 @@ from tests.conftest import build_test_config, dispose_app
 
 
 @pytest.fixture
-def app(monkeypatch, tmp_path):
+def app(monkeypatch, tmp_path, migrated_db):
     """Provide a configured Flask app for tests."""
 
     # Reload routes so they register on the fresh app instance
@@ -20,7 +21,9 @@ def app(monkeypatch, tmp_path):
     if hasattr(app_package, "routes"):
         delattr(app_package, "routes")
 
-    app = create_app(build_test_config(tmp_path / "konsultacje.db"))
+    db_path = tmp_path / "konsultacje.db"
+    shutil.copyfile(migrated_db, db_path)
+    app = create_app(build_test_config(db_path))
     yield app
     dispose_app(app)
 
@@ -32,13 +35,15 @@ def client(app):
     return app.test_client()
 
 
-def test_superadmin_created_from_env(monkeypatch, tmp_path):
-    """Verify that a superadmin user is created from environment variables."""
+def test_superadmin_created_by_bootstrap(monkeypatch, tmp_path):
+    """Verify that ``flask bootstrap`` migrates and creates the superadmin."""
     monkeypatch.setenv('SUPERADMIN_USERNAME', 'superadmin')
     monkeypatch.setenv('SUPERADMIN_PASSWORD', 'adminpass')
     monkeypatch.setenv('SUPERADMIN_EMAIL', 'admin@example.com')
     config = build_test_config(tmp_path / "konsultacje.db")
     app = create_app(config)
+    result = app.test_cli_runner().invoke(args=['bootstrap'])
+    assert result.exit_code == 0, result.output
     with app.app_context():
         admin = User.query.filter_by(full_name='superadmin').first()
         assert admin is not None
@@ -46,17 +51,42 @@ def test_superadmin_created_from_env(monkeypatch, tmp_path):
         assert admin.check_password('adminpass')
         assert admin.role == Roles.SUPERADMIN
         assert admin.confirmed
+        password_hash = admin.password_hash
 
-    # create_app called again should not alter admin confirmation status
+    # Running it again must neither fail nor rehash an unchanged password
     dispose_app(app)
     app2 = create_app(config)
+    result = app2.test_cli_runner().invoke(args=['bootstrap'])
+    assert result.exit_code == 0, result.output
     with app2.app_context():
         admin = User.query.filter_by(full_name='superadmin').first()
         assert admin is not None
         assert admin.confirmed
+        assert admin.password_hash == password_hash
     dispose_app(app2)
 
 
+def test_create_app_does_not_create_superadmin(monkeypatch, tmp_path, migrated_db):
+    """App creation must not write to the database."""
+    monkeypatch.setenv('SUPERADMIN_USERNAME', 'superadmin')
+    monkeypatch.setenv('SUPERADMIN_PASSWORD', 'adminpass')
+    monkeypatch.setenv('SUPERADMIN_EMAIL', 'admin@example.com')
+    db_path = tmp_path / "konsultacje.db"
+    shutil.copyfile(migrated_db, db_path)
+    app = create_app(build_test_config(db_path))
+    with app.app_context():
+        assert User.query.filter_by(email='admin@example.com').first() is None
+    dispose_app(app)
+
+
+def test_create_app_starts_without_migrated_database(tmp_path):
+    """A fresh database only logs a hint until ``flask bootstrap`` runs."""
+    app = create_app(build_test_config(tmp_path / "konsultacje.db"))
+    with app.app_context():
+        assert not db.inspect(db.engine).has_table('user')
+    dispose_app(app)
+
+
 def test_register_and_login_remember_me(client, app):
     """Register a user and log in with the remember me option."""
     response = client.post(
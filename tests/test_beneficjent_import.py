@@ -0,0 +1,131 @@
+"""Tests for importing beneficiaries from CSV and XLSX files."""
+
+from io import BytesIO
+
+import pytest
+from openpyxl import Workbook
+
+from app import db
+from app.beneficjent_import import ImportFileError, import_beneficjenci, read_rows
+from app.models import Beneficjent, User
+from app.projekt_utils import get_aktywny_projekt_id
+
+
+def setup_user(app):
+    with app.app_context():
+        user = User(full_name="Ala", email="ala@example.com")
+        user.set_password("secret")
+        user.confirmed = True
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(
+            Beneficjent(imie="Jan Kowalski", wojewodztwo="Mazowieckie", user_id=user.id)
+        )
+        db.session.commit()
+        return user.id
+
+
+def login(client):
+    client.post("/login", data={"email": "ala@example.com", "password": "secret"})
+
+
+def upload(client, content, filename="lista.csv", dry_run=True):
+    data = {"plik": (BytesIO(content), filename)}
+    if dry_run:
+        data["dry_run"] = "y"
+    return client.post(
+        "/beneficjenci/import", data=data, content_type="multipart/form-data"
+    )
+
+
+def names(app):
+    with app.app_context():
+        return sorted(db.session.scalars(db.select(Beneficjent.imie)))
+
+
+CSV = (
+    "Imię i nazwisko;Województwo\n"
+    "Anna Nowak;Śląskie\n"
+    "jan  kowalski;mazowieckie\n"
+    "Piotr Zieliński;Łódzkie\n"
+    "Anna Nowak;Slaskie\n"
+).encode()
+
+
+def test_dry_run_reports_without_writing(app, client):
+    setup_user(app)
+    login(client)
+
+    resp = upload(client, CSV)
+
+    text = resp.get_data(as_text=True)
+    assert "Do dodania: 2, pominięte duplikaty: 2, błędy: 0" in text
+    assert names(app) == ["Jan Kowalski"]
+
+
+def test_import_adds_rows_with_canonical_voivodeship(app, client):
+    setup_user(app)
+    login(client)
+
+    resp = upload(client, CSV, dry_run=False)
+
+    assert resp.status_code == 302
+    assert names(app) == ["Anna Nowak", "Jan Kowalski", "Piotr Zieliński"]
+    with app.app_context():
+        anna = db.session.scalars(
+            db.select(Beneficjent).filter_by(imie="Anna Nowak")
+        ).one()
+        assert anna.wojewodztwo == "Slaskie"
+        assert anna.project_id == get_aktywny_projekt_id()
+    assert "Anna Nowak" in client.get("/beneficjenci?q=nowak").get_data(as_text=True)
+
+
+def test_invalid_rows_block_the_whole_import(app, client):
+    setup_user(app)
+    login(client)
+    content = b"imie,wojewodztwo\nAnna Nowak,Slaskie\n,Slaskie\nOla,Bawaria\n"
+
+    resp = upload(client, content, dry_run=False)
+
+    text = resp.get_data(as_text=True)
+    assert "błędy: 2" in text
+    assert "Brak imienia i nazwiska." in text
+    assert "Nieznane województwo: „Bawaria”." in text
+    assert names(app) == ["Jan Kowalski"]
+
+
+def test_xlsx_import_in_batches(app, client):
+    user_id = setup_user(app)
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Województwo", "Beneficjent"])
+    for number in range(7):
+        sheet.append(["Pomorskie", f"Osoba {number}"])
+    buffer = BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    with app.app_context():
+        projekt_id = get_aktywny_projekt_id()
+        report = import_beneficjenci(
+            read_rows(buffer, "lista.XLSX"), user_id, projekt_id, batch_size=3
+        )
+
+    assert report.imported
+    assert report.added == 7
+    assert len(names(app)) == 8
+
+
+@pytest.mark.parametrize(
+    "content, filename, message",
+    [
+        (b"imie;miasto\nAnna;Gdansk\n", "lista.csv", "Pierwszy wiersz"),
+        (b"\n\n", "lista.csv", "pusty"),
+        ("imie,wojewodztwo\nŁucja,Slaskie\n".encode("cp1250"), "lista.csv", "UTF-8"),
+        (b"not a zip", "lista.xlsx", "XLSX"),
+        (b"", "lista.txt", "CSV i XLSX"),
+    ],
+)
+def test_unreadable_files_are_rejected(content, filename, message):
+    with pytest.raises(ImportFileError, match=message):
+        list(read_rows(BytesIO(content), filename))
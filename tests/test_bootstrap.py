@@ -0,0 +1,20 @@
+"""Tests for the ``flask bootstrap`` lock."""
+
+import threading
+
+from app.bootstrap import bootstrap_lock
+
+
+def test_bootstrap_lock_serializes_runs(app):
+    entered = threading.Event()
+
+    def second_run():
+        with app.app_context(), bootstrap_lock():
+            entered.set()
+
+    with app.app_context(), bootstrap_lock():
+        thread = threading.Thread(target=second_run)
+        thread.start()
+        assert not entered.wait(0.2)
+    thread.join(5)
+    assert entered.is_set()
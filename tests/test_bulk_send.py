@@ -0,0 +1,232 @@
+"""Tests for sending all unsent reports of a project at once."""
+
+import threading
+from datetime import UTC, date, datetime, time
+
+from app import bulk_send, db, mail
+from app.metrics import smtp_send_latency
+from app.models import Beneficjent, Roles, SentEmail, User, Zajecia
+from app.projekt_utils import get_aktywny_projekt
+
+
+def setup_sessions(app, recipient='dest@example.com'):
+    app.config['MAIL_DEFAULT_SENDER'] = 'admin@example.com'
+    with app.app_context():
+        user = User(
+            full_name='sender',
+            email='sender@example.com',
+            document_recipient_email=recipient,
+            confirmed=True,
+        )
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+        projekt_id = get_aktywny_projekt().id
+        benef = Beneficjent(imie='Ala', wojewodztwo='Mazowieckie', user_id=user.id)
+        db.session.add(benef)
+        for day, sent_at in ((1, None), (2, None), (3, datetime.now(UTC))):
+            zaj = Zajecia(
+                data=date(2026, 3, day),
+                godzina_od=time(10, 0),
+                godzina_do=time(11, 0),
+                specjalista='spec',
+                user_id=user.id,
+                doc_sent_at=sent_at,
+            )
+            zaj.beneficjenci.append(benef)
+            db.session.add(zaj)
+        db.session.commit()
+        return projekt_id
+
+
+def login(client):
+    return client.post(
+        '/login',
+        data={'email': 'sender@example.com', 'password': 'secret'},
+        follow_redirects=True,
+    )
+
+
+def wait_for_delivery():
+    for thread in threading.enumerate():
+        if thread.name == 'outbox-drain':
+            thread.join(timeout=30)
+
+
+def test_bulk_send_queues_and_shows_progress(app, client):
+    setup_sessions(app)
+    login(client)
+
+    with mail.record_messages() as outbox:
+        resp = client.post('/zajecia/wyslij-niewyslane')
+        assert '/zajecia/wyslij-niewyslane/postep' in resp.headers['Location']
+        wait_for_delivery()
+
+    assert len(outbox) == 2
+    assert all(m.attachments[0].filename.endswith('.docx') for m in outbox)
+    text = client.get(resp.headers['Location']).get_data(as_text=True)
+    assert 'Wysłano: 2, błędy: 0, w kolejce: 0' in text
+    assert 'Wysyłka zakończona.' in text
+    with app.app_context():
+        assert Zajecia.query.filter(Zajecia.doc_sent_at.is_(None)).count() == 0
+        logs = SentEmail.query.all()
+        assert [log.status for log in logs] == ['sent', 'sent']
+
+
+def test_bulk_send_progress_refreshes_while_queued(app, client):
+    setup_sessions(app)
+    app.config['MAIL_OUTBOX'] = True
+    login(client)
+
+    resp = client.post('/zajecia/wyslij-niewyslane', follow_redirects=True)
+
+    text = resp.get_data(as_text=True)
+    assert 'w kolejce: 2' in text
+    assert 'http-equiv="refresh"' in text
+
+
+def test_bulk_send_does_not_queue_reports_twice(app):
+    projekt_id = setup_sessions(app)
+    app.config['MAIL_OUTBOX'] = True
+
+    with app.app_context():
+        first, first_ids = bulk_send.queue_unsent_reports(projekt_id)
+        db.session.commit()
+        second, second_ids = bulk_send.queue_unsent_reports(projekt_id)
+        db.session.commit()
+        queued = SentEmail.query.filter_by(status=SentEmail.QUEUED).count()
+
+    assert first.queued == 2
+    assert second.queued == 0 and second_ids is None
+    assert queued == 2
+
+
+def test_bulk_send_skips_sessions_without_recipient(app, client):
+    setup_sessions(app, recipient=None)
+    login(client)
+
+    with mail.record_messages() as outbox:
+        resp = client.post('/zajecia/wyslij-niewyslane', follow_redirects=True)
+
+    assert not outbox
+    assert 'bez adresu odbiorcy: 2' in resp.get_data(as_text=True)
+
+
+def test_bulk_send_keeps_few_renders_in_flight(app, monkeypatch):
+    projekt_id = setup_sessions(app)
+    with app.app_context():
+        for day in range(4, 12):
+            db.session.add(
+                Zajecia(
+                    data=date(2026, 3, day),
+                    godzina_od=time(10, 0),
+                    godzina_do=time(11, 0),
+                    specjalista='spec',
+                    user_id=User.query.one().id,
+                )
+            )
+        db.session.commit()
+    rendered = []
+    largest = []
+
+    def fake_render(app, snapshot):
+        rendered.append(snapshot)
+        return 'name', b'docx'
+
+    def track(result):
+        largest.append(len(rendered) - result.done)
+
+    monkeypatch.setattr(bulk_send, '_render', fake_render)
+
+    with app.app_context():
+        result = bulk_send.send_unsent_reports(
+            projekt_id, workers=1, progress=track
+        )
+
+    assert result.sent == 10
+    assert max(largest) <= bulk_send.RENDER_AHEAD
+
+
+def test_bulk_send_uses_pooled_sender(app, monkeypatch):
+    projekt_id = setup_sessions(app)
+    calls = []
+
+    def flaky_send(message, state, idle_seconds, max_idle):
+        calls.append(message)
+        if len(calls) == 1:
+            raise ConnectionResetError(104, 'Connection reset by peer')
+
+    monkeypatch.setattr(mail.pool, 'send', flaky_send)
+    smtp_send_latency.clear()
+
+    with app.app_context():
+        app.extensions['mail'].suppress = False
+        result = bulk_send.send_unsent_reports(projekt_id)
+        statuses = [log.status for log in SentEmail.query.all()]
+
+    assert result.sent == 1
+    assert result.failed == 1
+    assert statuses == ['error', 'sent']
+    sends = {
+        series['labels']['status']: series['count']
+        for series in smtp_send_latency.snapshot()
+    }
+    assert sends == {'error': 1, 'ok': 1}
+
+
+def test_bulk_send_continues_after_render_error(app, monkeypatch):
+    setup_sessions(app)
+    render = bulk_send._render
+    calls = []
+
+    def broken_render(app, snapshot):
+        calls.append(snapshot)
+        if len(calls) == 1:
+            raise KeyError('template field')
+        return render(app, snapshot)
+
+    monkeypatch.setattr(bulk_send, '_render', broken_render)
+
+    with mail.record_messages() as outbox:
+        result = app.test_cli_runner().invoke(args=['reports', 'send-unsent'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Wysłano: 1, błędy: 1' in result.output
+    assert len(outbox) == 1
+
+
+def test_bulk_send_cli_reports_throughput(app):
+    setup_sessions(app)
+
+    with mail.record_messages() as outbox:
+        result = app.test_cli_runner().invoke(
+            args=['reports', 'send-unsent', '--workers', '2']
+        )
+
+    assert result.exit_code == 0, result.output
+    assert len(outbox) == 2
+    assert 'Wysłano: 2' in result.output
+    assert 'dok./s' in result.output
+
+
+def test_admin_bulk_send_redirects_to_project_progress(app, client):
+    projekt_id = setup_sessions(app)
+    app.config['MAIL_OUTBOX'] = True
+    with app.app_context():
+        admin = User(
+            full_name='admin', email='boss@example.com', role=Roles.ADMIN, confirmed=True
+        )
+        admin.set_password('secret')
+        db.session.add(admin)
+        db.session.commit()
+    client.post('/login', data={'email': 'boss@example.com', 'password': 'secret'})
+
+    resp = client.post(
+        '/admin/zajecia/wyslij-niewyslane',
+        data={'projekt_id': projekt_id},
+        follow_redirects=True,
+    )
+
+    text = resp.get_data(as_text=True)
+    assert 'Wysłano: 0, błędy: 0, w kolejce: 2' in text
+    assert f'/admin/zajecia?projekt_id={projekt_id}' in text
@@ -0,0 +1,194 @@
+"""Tests for the streamed ZIP export of session reports."""
+
+import io
+import os
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, time
+
+import pytest
+from docx import Document
+
+from app import db
+from app.docx_export import (
+    ERRORS_FILENAME,
+    _ChunkSink,
+    _render_pool,
+    _unique_name,
+    export_sessions_zip,
+    load_snapshots,
+)
+from app.models import Beneficjent, Roles, User, Zajecia
+from app.projekt_utils import get_aktywny_projekt
+
+
+def setup_sessions(app):
+    """Create an admin and two instructors with three sessions in total."""
+    app.config["EXPORT_WORKERS"] = 0
+    with app.app_context():
+        admin = User(
+            full_name="admin",
+            email="admin@example.com",
+            role=Roles.ADMIN,
+            confirmed=True,
+        )
+        admin.set_password("secret")
+        ala = User(full_name="Ala Nowak", email="ala@example.com")
+        ola = User(full_name="Ola Kowal", email="ola@example.com")
+        db.session.add_all([admin, ala, ola])
+        db.session.flush()
+        benef = Beneficjent(imie="Jan", wojewodztwo="Mazowieckie", user_id=ala.id)
+        for day, user in ((1, ala), (2, ala), (3, ola)):
+            zaj = Zajecia(
+                data=date(2026, 3, day),
+                godzina_od=time(10, 0),
+                godzina_do=time(11, 0),
+                specjalista="dietetyk",
+                user_id=user.id,
+            )
+            zaj.beneficjenci.append(benef)
+            db.session.add(zaj)
+        db.session.commit()
+        return get_aktywny_projekt().id, ola.id
+
+
+def login(client):
+    client.post(
+        "/login",
+        data={"email": "admin@example.com", "password": "secret"},
+        follow_redirects=True,
+    )
+
+
+def read_zip(resp):
+    return zipfile.ZipFile(io.BytesIO(resp.get_data()))
+
+
+def test_export_streams_zip_of_all_sessions(app, client):
+    projekt_id, _ = setup_sessions(app)
+    login(client)
+
+    resp = client.get(f"/admin/zajecia/eksport?projekt_id={projekt_id}")
+
+    assert resp.status_code == 200
+    assert resp.is_streamed
+    assert resp.mimetype == "application/zip"
+    assert "attachment" in resp.headers["Content-Disposition"]
+    archive = read_zip(resp)
+    names = archive.namelist()
+    assert len(names) == 3
+    assert archive.testzip() is None
+    doc = Document(io.BytesIO(archive.read(names[0])))
+    assert any("Jan" in p.text for p in doc.paragraphs)
+
+
+def test_export_filters_by_date_and_instructor(app, client):
+    projekt_id, ola_id = setup_sessions(app)
+    login(client)
+
+    resp = client.get(
+        f"/admin/zajecia/eksport?projekt_id={projekt_id}&od=2026-03-02&do=2026-03-03"
+    )
+    assert len(read_zip(resp).namelist()) == 2
+
+    resp = client.get(f"/admin/zajecia/eksport?projekt_id={projekt_id}&user_id={ola_id}")
+    assert read_zip(resp).namelist() == [
+        "Konsultacje z dietetyk 2026-03-03 Jan.docx"
+    ]
+
+
+def test_export_renders_in_one_spawned_pool_per_process(app, client):
+    projekt_id, _ = setup_sessions(app)
+    app.config["EXPORT_WORKERS"] = 1
+    login(client)
+
+    first = client.get(f"/admin/zajecia/eksport?projekt_id={projekt_id}")
+    assert len(read_zip(first).namelist()) == 3
+    pool = app.extensions["export_pool"]
+    second = client.get(f"/admin/zajecia/eksport?projekt_id={projekt_id}")
+
+    assert len(read_zip(second).namelist()) == 3
+    assert app.extensions["export_pool"] is pool
+    assert pool._mp_context.get_start_method() == "spawn"
+
+
+def test_export_replaces_broken_pool(app, client):
+    projekt_id, _ = setup_sessions(app)
+    app.config["EXPORT_WORKERS"] = 1
+    login(client)
+    with app.app_context():
+        broken = _render_pool(1)
+    # A worker dying, as after an OOM kill, breaks the whole pool.
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result()
+
+    resp = client.get(f"/admin/zajecia/eksport?projekt_id={projekt_id}")
+
+    assert resp.status_code == 200
+    assert len(read_zip(resp).namelist()) == 3
+    assert app.extensions["export_pool"] is not broken
+
+
+class KillsWorker:
+    """Snapshot that terminates the render process when it is unpickled."""
+
+    def __reduce__(self):
+        return os._exit, (1,)
+
+
+def test_export_continues_after_worker_dies(app):
+    setup_sessions(app)
+    with app.app_context():
+        snapshots = load_snapshots(Zajecia.query.order_by(Zajecia.id))
+        data = b"".join(
+            export_sessions_zip(
+                [(0, KillsWorker()), *snapshots], workers=1, window=1
+            )
+        )
+
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert len(archive.namelist()) == 4
+    assert archive.read(ERRORS_FILENAME).decode().startswith("0: ")
+
+
+def test_export_releases_connection_before_streaming(app, client):
+    projekt_id, _ = setup_sessions(app)
+    login(client)
+
+    resp = client.get(
+        f"/admin/zajecia/eksport?projekt_id={projekt_id}", buffered=False
+    )
+    with app.app_context():
+        checked_out = db.engine.pool.checkedout()
+    data = b"".join(resp.response)
+    resp.close()
+
+    assert checked_out == 0
+    assert len(zipfile.ZipFile(io.BytesIO(data)).namelist()) == 3
+
+
+def test_export_requires_admin(app, client, login):
+    setup_sessions(app)
+    login()
+
+    resp = client.get("/admin/zajecia/eksport")
+
+    assert resp.status_code in (302, 403)
+
+
+def test_chunk_sink_is_not_seekable():
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w") as archive:
+        archive.writestr("a.txt", "a")
+        first = sink.drain()
+        archive.writestr("b.txt", "b")
+    data = first + sink.drain()
+
+    assert zipfile.ZipFile(io.BytesIO(data)).namelist() == ["a.txt", "b.txt"]
+
+
+def test_duplicate_names_are_numbered():
+    used = set()
+    names = [_unique_name("raport.docx", used) for _ in range(3)]
+
+    assert names == ["raport.docx", "raport (2).docx", "raport (3).docx"]
@@ -6,7 +6,7 @@ from docx import Document
 
 from app import db
 from app.models import User, Beneficjent, Zajecia
-from app.docx_generator import generate_docx
+from app.docx_generator import TemplateCache, generate_docx
 
 
 def _docx_text(doc: Document) -> str:
@@ -103,3 +103,71 @@ def test_generate_docx_adds_missing_rows(app, tmp_path, monkeypatch):
         table = out_doc.tables[0]
         assert len(table.rows) == 3
         assert table.rows[2].cells[3].text == user.full_name
+
+
+def test_template_cache_reuses_parsed_template(app, tmp_path):
+    """Template should be parsed once and re-read after it changes on disk."""
+
+    cache = TemplateCache()
+    template_path = tmp_path / "wzor.docx"
+    doc = Document()
+    doc.add_paragraph("pierwsza wersja")
+    doc.save(str(template_path))
+
+    first, _ = cache.get(str(template_path))
+    first.paragraphs[0].text = "zmieniona kopia"
+    second, _ = cache.get(str(template_path))
+    assert second.paragraphs[0].text == "pierwsza wersja"
+    assert (cache.misses, cache.hits) == (1, 1)
+
+    doc.paragraphs[0].text = "druga wersja"
+    doc.add_paragraph("nowy akapit")
+    doc.save(str(template_path))
+    stat = template_path.stat()
+    os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    third, _ = cache.get(str(template_path))
+    assert third.paragraphs[0].text == "druga wersja"
+    assert cache.misses == 2
+
+
+def test_placeholder_map_patches_cells_and_prefixed_lines(app, tmp_path, monkeypatch):
+    """Placeholders in table cells and prefixed lines should be rendered."""
+
+    with app.app_context():
+        static_dir = tmp_path / "tmpl" / "static"
+        static_dir.mkdir(parents=True)
+        doc = Document()
+        doc.add_paragraph("Konsultacje z dietetykiem")
+        doc.add_paragraph("Imię i nazwisko beneficjenta: ....")
+        doc.add_paragraph("Województwo: ....")
+        doc.add_paragraph("Imię i nazwisko specjalisty: ....")
+        table = doc.add_table(rows=2, cols=4)
+        table.rows[0].cells[0].text = "Spotkanie z dietetykiem"
+        doc.save(str(static_dir / "wzor.docx"))
+        monkeypatch.setattr(app, "root_path", str(tmp_path / "tmpl"))
+
+        user = User(full_name="Jan Kowalski", email="map@example.com")
+        benef = Beneficjent(imie="Ola", wojewodztwo="Opolskie")
+        zajecia = Zajecia(
+            data=date(2023, 3, 3),
+            godzina_od=time(10, 0),
+            godzina_do=time(11, 0),
+            specjalista="psychologiem",
+            user=user,
+        )
+
+        output = tmp_path / "report.docx"
+        generate_docx(zajecia, [benef], str(output))
+
+        out_doc = Document(str(output))
+        lines = [p.text for p in out_doc.paragraphs]
+        assert lines == [
+            "Konsultacje z psychologiem",
+            "Imię i nazwisko beneficjenta: Ola",
+            "Województwo: Opolskie",
+            "Imię i nazwisko specjalisty: Jan Kowalski",
+        ]
+        out_table = out_doc.tables[0]
+        assert out_table.rows[0].cells[0].text == "Spotkanie z psychologiem"
+        assert out_table.rows[1].cells[3].text == "Jan Kowalski"
@@ -0,0 +1,154 @@
+"""Tests for the content-addressed store of rendered reports."""
+
+import os
+import time as time_module
+from datetime import date, time
+from pathlib import Path
+
+from app import db
+from app.docx_store import cleanup
+from app.models import Beneficjent, SentEmail, User, Zajecia
+
+
+def setup_session(app):
+    with app.app_context():
+        user = User(
+            full_name='doc',
+            email='doc@example.com',
+            document_recipient_email='dest@example.com',
+            confirmed=True,
+        )
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.flush()
+        benef = Beneficjent(imie='Ala', wojewodztwo='Mazowieckie', user_id=user.id)
+        zaj = Zajecia(
+            data=date(2024, 5, 6),
+            godzina_od=time(9, 0),
+            godzina_do=time(10, 0),
+            specjalista='dietetyk',
+            user_id=user.id,
+        )
+        zaj.beneficjenci.append(benef)
+        db.session.add(zaj)
+        db.session.commit()
+        return zaj.id
+
+
+def login(client):
+    client.post(
+        '/login',
+        data={'email': 'doc@example.com', 'password': 'secret'},
+        follow_redirects=True,
+    )
+
+
+def count_renders(monkeypatch, module):
+    """Replace ``generate_docx`` in *module* with a counting fake."""
+    calls = []
+
+    def fake_generate_docx(zajecia, beneficjenci, output):
+        calls.append(zajecia.specjalista)
+        output.write(f'{zajecia.specjalista} #{len(calls)}'.encode())
+
+    monkeypatch.setattr(f'{module}.generate_docx', fake_generate_docx)
+    return calls
+
+
+def stored_files(app):
+    return sorted(Path(app.config['DOCX_STORE_DIR']).rglob('*.docx'))
+
+
+def rename_session(app, zajecia_id, specjalista):
+    with app.app_context():
+        db.session.get(Zajecia, zajecia_id).specjalista = specjalista
+        db.session.commit()
+
+
+def test_download_reuses_stored_document(app, client, monkeypatch):
+    zajecia_id = setup_session(app)
+    login(client)
+    calls = count_renders(monkeypatch, 'app.routes')
+
+    first = client.get(f'/zajecia/{zajecia_id}/docx')
+    second = client.get(f'/zajecia/{zajecia_id}/docx')
+
+    assert first.data == second.data == b'dietetyk #1'
+    assert calls == ['dietetyk']
+    assert len(stored_files(app)) == 1
+
+
+def test_editing_session_renders_new_document(app, client, monkeypatch):
+    zajecia_id = setup_session(app)
+    login(client)
+    calls = count_renders(monkeypatch, 'app.routes')
+    client.get(f'/zajecia/{zajecia_id}/docx')
+
+    rename_session(app, zajecia_id, 'psycholog')
+    resp = client.get(f'/zajecia/{zajecia_id}/docx')
+
+    assert resp.data == b'psycholog #2'
+    assert calls == ['dietetyk', 'psycholog']
+    assert len(stored_files(app)) == 2
+
+
+def test_sent_document_stays_available_after_edit(app, client, monkeypatch):
+    zajecia_id = setup_session(app)
+    login(client)
+    count_renders(monkeypatch, 'app.utils')
+    monkeypatch.setattr('app.routes.mail.send', lambda msg: None)
+
+    client.get(f'/zajecia/{zajecia_id}/send')
+    rename_session(app, zajecia_id, 'psycholog')
+    with app.app_context():
+        sent_email = SentEmail.query.one()
+        email_id = sent_email.id
+        assert sent_email.file_path
+
+    resp = client.get(f'/emails/{email_id}/docx')
+
+    assert resp.status_code == 200
+    assert resp.data == b'dietetyk #1'
+    assert 'attachment' in resp.headers['Content-Disposition']
+
+
+def test_cleanup_removes_only_old_unreferenced_files(app, client, monkeypatch):
+    zajecia_id = setup_session(app)
+    login(client)
+    count_renders(monkeypatch, 'app.utils')
+    monkeypatch.setattr('app.routes.mail.send', lambda msg: None)
+    client.get(f'/zajecia/{zajecia_id}/send')
+    rename_session(app, zajecia_id, 'psycholog')
+    count_renders(monkeypatch, 'app.routes')
+    client.get(f'/zajecia/{zajecia_id}/docx')
+    rename_session(app, zajecia_id, 'logopeda')
+    client.get(f'/zajecia/{zajecia_id}/docx')
+
+    files = stored_files(app)
+    assert len(files) == 3
+    old = time_module.time() - 7200
+    for path in files:
+        os.utime(path, (old, old))
+    with app.app_context():
+        referenced = SentEmail.query.one().file_path
+        client.get(f'/zajecia/{zajecia_id}/docx')  # marks the current one used
+        removed = cleanup(3600)
+
+    assert removed == 1
+    remaining = {
+        os.path.relpath(p, app.config['DOCX_STORE_DIR']) for p in stored_files(app)
+    }
+    assert referenced in remaining
+    assert len(remaining) == 2
+
+
+def test_store_can_be_disabled(app, client, monkeypatch):
+    app.config['DOCX_STORE_DIR'] = ''
+    zajecia_id = setup_session(app)
+    login(client)
+    calls = count_renders(monkeypatch, 'app.routes')
+
+    client.get(f'/zajecia/{zajecia_id}/docx')
+    client.get(f'/zajecia/{zajecia_id}/docx')
+
+    assert len(calls) == 2
@@ -0,0 +1,201 @@
+"""Tests for login throttling and the password hashing executor."""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import create_app, db
+from app.models import RateLimitBucket, User
+from app.passwords import HashingBusy, HashingExecutor
+from app.rate_limit import DatabaseBucketStore, MemoryBucketStore
+from tests.conftest import dispose_app
+
+
+def create_user(app, email="ala@example.com", password_hash=None):
+    with app.app_context():
+        user = User(full_name="Ala", email=email, confirmed=True)
+        if password_hash:
+            user.password_hash = password_hash
+        else:
+            user.set_password("secret")
+        db.session.add(user)
+        db.session.commit()
+
+
+def login(client, email="ala@example.com", password="secret", ip="10.0.0.1"):
+    return client.post(
+        "/login",
+        data={"email": email, "password": password},
+        environ_base={"REMOTE_ADDR": ip},
+    )
+
+
+def test_login_throttled_per_email(app, client):
+    create_user(app)
+    app.config["RATE_LIMIT_PER_EMAIL"] = 3
+    for _ in range(3):
+        assert login(client, password="wrong").status_code == 200
+
+    resp = login(client, ip="10.0.0.2")
+    assert resp.status_code == 429
+    assert "Zbyt wiele prób" in resp.get_data(as_text=True)
+    # Other accounts are not affected.
+    create_user(app, email="ola@example.com")
+    assert login(client, email="ola@example.com").status_code == 302
+
+
+def test_login_throttled_per_ip(app, client):
+    create_user(app)
+    app.config["RATE_LIMIT_PER_IP"] = 2
+    for i in range(2):
+        login(client, email=f"nobody{i}@example.com")
+
+    assert login(client).status_code == 429
+    assert login(client, ip="10.0.0.9").status_code == 302
+
+
+def test_register_throttled(app, client):
+    app.config["RATE_LIMIT_PER_IP"] = 1
+    data = {
+        "full_name": "Ola",
+        "email": "ola@example.com",
+        "password": "secret123",
+        "confirm": "secret123",
+    }
+    client.post("/register", data=data)
+
+    resp = client.post("/register", data={**data, "email": "ela@example.com"})
+    assert resp.status_code == 429
+
+
+def test_database_buckets_are_shared_between_processes(app, client):
+    create_user(app)
+    app.config.update(RATE_LIMIT_STORAGE="database", RATE_LIMIT_PER_EMAIL=2)
+    login(client, password="wrong")
+    login(client, password="wrong")
+
+    other = create_app(
+        {
+            "SECRET_KEY": "test-secret",
+            "WTF_CSRF_ENABLED": False,
+            "SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"],
+        }
+    )
+    other.config.update(RATE_LIMIT_STORAGE="database", RATE_LIMIT_PER_EMAIL=2)
+    assert login(other.test_client()).status_code == 429
+    dispose_app(other)
+
+
+def test_database_buckets_count_concurrent_attempts(app):
+    other = create_app(
+        {
+            "SECRET_KEY": "test-secret",
+            "SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"],
+        }
+    )
+    store = DatabaseBucketStore()
+    results = []
+
+    def attempts(flask_app):
+        with flask_app.app_context():
+            for _ in range(20):
+                results.append(store.consume("login:ip:x", 100, 1e9, time.time()))
+
+    threads = [
+        threading.Thread(target=attempts, args=(flask_app,))
+        for flask_app in (app, other, app, other)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    dispose_app(other)
+
+    assert results == [True] * 80
+    with app.app_context():
+        tokens = db.session.get(RateLimitBucket, "login:ip:x").tokens
+    assert round(tokens) == 20
+
+
+def test_locked_database_does_not_fail_login(app, client):
+    create_user(app)
+    app.config.update(RATE_LIMIT_STORAGE="database", SQLITE_BUSY_TIMEOUT_MS=50)
+    with app.app_context():
+        db.engine.dispose()
+    path = app.config["SQLALCHEMY_DATABASE_URI"].removeprefix("sqlite:///")
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        resp = login(client, password="wrong")
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+    assert resp.status_code == 200
+
+
+def test_login_rehashes_outdated_hash(app, client):
+    create_user(app, password_hash=generate_password_hash("secret", "pbkdf2"))
+
+    assert login(client).status_code == 302
+    with app.app_context():
+        password_hash = User.query.one().password_hash
+    assert password_hash.startswith("scrypt:")
+
+    # Hashes made with the current parameters are left alone.
+    client.get("/logout")
+    login(client)
+    with app.app_context():
+        assert User.query.one().password_hash == password_hash
+
+
+def occupy(executor, release):
+    """Leave a task holding a slot of *executor* until *release* is set."""
+    with pytest.raises(HashingBusy, match="timed out"):
+        executor.run(release.wait, timeout=0.01)
+
+
+def test_executor_rejects_work_beyond_queue():
+    executor = HashingExecutor(workers=1, queue_depth=0)
+    release = threading.Event()
+    occupy(executor, release)
+
+    with pytest.raises(HashingBusy, match="queue is full"):
+        executor.run(lambda: None)
+    release.set()
+    # The slot is freed as soon as the blocked task finishes.
+    deadline = time.monotonic() + 5
+    while True:
+        try:
+            assert executor.run(lambda: 42) == 42
+            break
+        except HashingBusy:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+
+def test_login_returns_503_when_hashing_saturated(app, client):
+    create_user(app)
+    executor = HashingExecutor(workers=1, queue_depth=0)
+    release = threading.Event()
+    occupy(executor, release)
+    app.extensions["password_hashing"] = executor
+
+    resp = login(client)
+    release.set()
+
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "5"
+
+
+def test_memory_store_prunes_full_buckets():
+    store = MemoryBucketStore(max_entries=2)
+    assert store.consume("a", 1, 10, now=0)
+    assert not store.consume("a", 1, 10, now=1)
+    assert store.consume("b", 1, 10, now=20)  # "a" is full again by now
+    assert store.consume("c", 1, 10, now=20)
+
+    assert set(store._buckets) == {"b", "c"}
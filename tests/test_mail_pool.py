@@ -0,0 +1,116 @@
+"""Tests for SMTP connection reuse in the pooled Flask-Mail sender."""
+
+import smtplib
+from types import SimpleNamespace
+
+import pytest
+from flask_mail import Message
+
+from app.mail_pool import SMTPConnectionPool
+
+
+class FakeSMTP:
+    """Stand-in for :class:`smtplib.SMTP` recording every session opened."""
+
+    instances = []
+
+    def __init__(self, server, port):
+        self.sent = []
+        self.closed = False
+        self.disconnect_next = False
+        FakeSMTP.instances.append(self)
+
+    def set_debuglevel(self, level):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def sendmail(self, sender, recipients, body, mail_options, rcpt_options):
+        if self.disconnect_next:
+            raise smtplib.SMTPServerDisconnected("gone")
+        self.sent.append(recipients)
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.instances = []
+    monkeypatch.setattr("flask_mail.smtplib.SMTP", FakeSMTP)
+    return FakeSMTP
+
+
+def mail_state(**overrides):
+    values = dict(
+        server="smtp.example.com",
+        port=587,
+        username="user",
+        password="secret",
+        use_tls=True,
+        use_ssl=False,
+        debug=0,
+        max_emails=None,
+    )
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def message():
+    return Message(
+        "Raport", sender="admin@example.com", recipients=["dest@example.com"]
+    )
+
+
+def test_pool_reuses_open_session(app, fake_smtp):
+    pool = SMTPConnectionPool()
+    state = mail_state()
+    with app.app_context():
+        for _ in range(3):
+            pool.send(message(), state, idle_seconds=60, max_idle=1)
+
+    assert len(fake_smtp.instances) == 1
+    assert len(fake_smtp.instances[0].sent) == 3
+    assert pool.stats()["handshakes"] == 1
+    assert pool.stats()["handshakes_saved"] == 2
+
+
+def test_pool_reconnects_after_server_disconnect(app, fake_smtp):
+    pool = SMTPConnectionPool()
+    state = mail_state()
+    with app.app_context():
+        pool.send(message(), state, idle_seconds=60, max_idle=1)
+        fake_smtp.instances[0].disconnect_next = True
+        pool.send(message(), state, idle_seconds=60, max_idle=1)
+
+    assert len(fake_smtp.instances) == 2
+    assert fake_smtp.instances[0].closed
+    assert fake_smtp.instances[1].sent
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_pool_expires_idle_and_changed_sessions(app, fake_smtp, monkeypatch):
+    pool = SMTPConnectionPool()
+    clock = [100.0]
+    monkeypatch.setattr("app.mail_pool.time.monotonic", lambda: clock[0])
+    with app.app_context():
+        pool.send(message(), mail_state(), idle_seconds=30, max_idle=2)
+        clock[0] += 31
+        pool.send(message(), mail_state(), idle_seconds=30, max_idle=2)
+        pool.send(
+            message(), mail_state(server="other.example.com"),
+            idle_seconds=30, max_idle=2,
+        )
+
+    assert len(fake_smtp.instances) == 3
+    assert fake_smtp.instances[0].closed
+    assert pool.stats()["handshakes_saved"] == 0
+    pool.close_all()
+    assert all(smtp.closed for smtp in fake_smtp.instances)
@@ -0,0 +1,121 @@
+"""Tests for request instrumentation and the /metrics endpoint."""
+
+from datetime import date, time
+
+from flask_mail import Message
+
+from app import db, mail
+from app.metrics import Histogram, docx_render_latency, smtp_send_latency
+from app.models import Beneficjent, Roles, SentEmail, User, Zajecia
+
+
+def setup_session(app, role=Roles.INSTRUCTOR):
+    with app.app_context():
+        user = User(full_name="Ala", email="ala@example.com", role=role)
+        user.set_password("secret")
+        user.confirmed = True
+        db.session.add(user)
+        db.session.flush()
+        benef = Beneficjent(imie="Ola", wojewodztwo="Mazowieckie", user_id=user.id)
+        zaj = Zajecia(
+            data=date(2024, 5, 6),
+            godzina_od=time(9, 0),
+            godzina_do=time(10, 0),
+            specjalista="dietetyk",
+            user_id=user.id,
+        )
+        zaj.beneficjenci.append(benef)
+        db.session.add(zaj)
+        db.session.flush()
+        db.session.add(
+            SentEmail(
+                zajecia_id=zaj.id,
+                recipient="dest@example.com",
+                subject="Raport",
+                status=SentEmail.QUEUED,
+            )
+        )
+        db.session.commit()
+        return zaj.id
+
+
+def login(client):
+    client.post("/login", data={"email": "ala@example.com", "password": "secret"})
+
+
+def observations(histogram):
+    return sum(series["count"] for series in histogram.snapshot())
+
+
+def test_metrics_requires_admin_or_token(app, client):
+    setup_session(app)
+    app.config["METRICS_TOKEN"] = "scrape-me"
+
+    assert client.get("/metrics").status_code == 403
+    wrong = {"Authorization": "Bearer nope"}
+    assert client.get("/metrics", headers=wrong).status_code == 403
+    token = {"Authorization": "Bearer scrape-me"}
+    assert client.get("/metrics", headers=token).status_code == 200
+    login(client)
+    assert client.get("/metrics").status_code == 403
+
+
+def test_metrics_report_requests_queries_and_outbox(app, client):
+    setup_session(app, role=Roles.ADMIN)
+    login(client)
+    client.get("/kalendarz")
+
+    resp = client.get("/metrics")
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    text = resp.get_data(as_text=True)
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert (
+        'http_request_duration_seconds_bucket{blueprint="sessions",'
+        'endpoint="sessions.kalendarz",method="GET",le="+Inf"}'
+    ) in text
+    count_line = next(
+        line
+        for line in text.splitlines()
+        if line.startswith('http_request_db_queries_sum{endpoint="sessions.kalendarz"}')
+    )
+    assert float(count_line.split()[-1]) > 0
+    assert 'outbox_emails{status="queued"} 1' in text
+    assert 'outbox_emails{status="sending"} 0' in text
+
+
+def test_docx_render_and_smtp_send_are_timed(app, client):
+    zajecia_id = setup_session(app)
+    login(client)
+    renders = observations(docx_render_latency)
+    sends = observations(smtp_send_latency)
+
+    assert client.get(f"/zajecia/{zajecia_id}/docx").status_code == 200
+    with app.app_context():
+        mail.send(
+            Message(
+                "Raport",
+                sender="biuro@example.com",
+                recipients=["dest@example.com"],
+                body="Raport w załączniku.",
+            )
+        )
+
+    assert observations(docx_render_latency) == renders + 1
+    assert observations(smtp_send_latency) == sends + 1
+
+
+def test_histogram_exposition_escapes_labels():
+    histogram = Histogram("demo_seconds", "Demo.", labelnames=("path",), buckets=(1,))
+    histogram.observe(0.5, 'a"b')
+    histogram.observe(2, 'a"b')
+
+    assert histogram.exposition().splitlines() == [
+        "# HELP demo_seconds Demo.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{path="a\\"b",le="1.0"} 1',
+        'demo_seconds_bucket{path="a\\"b",le="+Inf"} 2',
+        'demo_seconds_sum{path="a\\"b"} 2.5',
+        'demo_seconds_count{path="a\\"b"} 2',
+    ]
@@ -0,0 +1,80 @@
+"""Check that the migrations are valid on PostgreSQL.
+
+The suite runs on SQLite, so the migrations are rendered to PostgreSQL SQL
+offline. Set ``TEST_POSTGRES_URL`` to also apply them to a live server.
+"""
+
+import io
+import os
+from pathlib import Path
+
+import pytest
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, text
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+
+
+def render_postgres_sql(direction):
+    """Return the SQL of every migration run in *direction* on PostgreSQL."""
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS))
+    revisions = list(ScriptDirectory.from_config(config).walk_revisions())
+    if direction == "upgrade":
+        revisions.reverse()
+    buffer = io.StringIO()
+    context = MigrationContext.configure(
+        dialect_name="postgresql",
+        opts={"as_sql": True, "output_buffer": buffer, "literal_binds": True},
+    )
+    with Operations.context(context):
+        for revision in revisions:
+            getattr(revision.module, direction)()
+    return buffer.getvalue()
+
+
+def test_upgrade_renders_for_postgres():
+    sql = render_postgres_sql("upgrade")
+
+    # ``user`` is a reserved word in PostgreSQL.
+    assert "UPDATE user " not in sql
+    assert 'ALTER TABLE "user" ALTER COLUMN role TYPE roles USING role::roles' in sql
+    assert "USING LOWER(role::text)::roles" in sql
+    assert "setval(pg_get_serial_sequence('projekt', 'id')" in sql
+    assert "DROP CONSTRAINT sent_email_zajecia_id_fkey" in sql
+
+
+def test_downgrade_renders_for_postgres():
+    sql = render_postgres_sql("downgrade")
+
+    assert "USING UPPER(role::text)::roles" in sql
+    assert "TYPE VARCHAR(20) USING role::text" in sql
+
+
+@pytest.mark.skipif(
+    not os.environ.get("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set"
+)
+def test_migrations_apply_on_live_postgres():
+    from app import create_app, db
+    from app.bootstrap import bootstrap
+    from app.models import Projekt, Roles, User
+
+    url = os.environ["TEST_POSTGRES_URL"]
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA public CASCADE"))
+        connection.execute(text("CREATE SCHEMA public"))
+    engine.dispose()
+
+    app = create_app({"SECRET_KEY": "test", "SQLALCHEMY_DATABASE_URI": url})
+    with app.app_context():
+        bootstrap()
+        user = User(full_name="Ala", email="ala@example.com", role=Roles.SUPERADMIN)
+        db.session.add_all([user, Projekt(nazwa="ATNIS VII")])
+        db.session.commit()
+        assert User.query.one().role is Roles.SUPERADMIN
+        db.session.remove()
+        db.engine.dispose()
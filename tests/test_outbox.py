@@ -0,0 +1,157 @@
+"""Tests for the persistent email outbox and its worker command."""
+
+from datetime import UTC, datetime, timedelta
+from smtplib import SMTPException
+
+from app import db
+from app.models import Beneficjent, SentEmail, User, Zajecia
+from app.outbox import process_outbox
+
+
+def create_user(app):
+    with app.app_context():
+        user = User(
+            full_name='sender',
+            email='sender@example.com',
+            document_recipient_email='dest@example.com',
+        )
+        user.set_password('secret')
+        user.confirmed = True
+        db.session.add(user)
+        db.session.commit()
+        benef = Beneficjent(imie='Ala', wojewodztwo='Mazowieckie', user_id=user.id)
+        db.session.add(benef)
+        db.session.commit()
+        return user.id, benef.id
+
+
+def login(client):
+    return client.post(
+        '/login',
+        data={'email': 'sender@example.com', 'password': 'secret'},
+        follow_redirects=True,
+    )
+
+
+def fake_generate_docx(zajecia, beneficjenci, output):
+    output.write(b'dummy')
+
+
+def queue_session(app, client):
+    _, b_id = create_user(app)
+    login(client)
+    app.config['MAIL_OUTBOX'] = True
+    return client.post(
+        '/zajecia/nowe',
+        data={
+            'data': '2023-01-01',
+            'godzina_od': '10:00',
+            'godzina_do': '11:00',
+            'specjalista': 'spec',
+            'beneficjenci': str(b_id),
+            'submit_send': '1',
+        },
+        follow_redirects=True,
+    )
+
+
+def test_submit_send_queues_instead_of_sending(monkeypatch, app, client):
+    messages = []
+    monkeypatch.setattr('app.utils.mail.send', messages.append)
+    monkeypatch.setattr('app.utils.generate_docx', fake_generate_docx)
+
+    resp = queue_session(app, client)
+    assert 'Dokument dodany do kolejki wysyłki.' in resp.get_data(as_text=True)
+    assert not messages
+
+    with app.app_context():
+        log = SentEmail.query.one()
+        assert log.status == SentEmail.QUEUED
+        assert log.sent_at is None
+
+        assert process_outbox() == 1
+        log = SentEmail.query.one()
+        assert log.status == SentEmail.SENT
+        assert log.attempts == 1
+        assert Zajecia.query.one().doc_sent_at is not None
+    assert len(messages) == 1
+
+    resp = client.get('/emails')
+    assert 'wysłano' in resp.get_data(as_text=True)
+
+
+def test_failed_delivery_is_retried_with_backoff(monkeypatch, app, client):
+    def failing_send(msg):
+        raise SMTPException('fail')
+
+    monkeypatch.setattr('app.utils.mail.send', failing_send)
+    monkeypatch.setattr('app.utils.generate_docx', fake_generate_docx)
+    app.config['OUTBOX_MAX_ATTEMPTS'] = 2
+    queue_session(app, client)
+
+    with app.app_context():
+        before = datetime.now(UTC).replace(tzinfo=None)
+        assert process_outbox() == 1
+        log = SentEmail.query.one()
+        assert log.status == SentEmail.QUEUED
+        assert log.attempts == 1
+        assert log.next_attempt_at > before + timedelta(seconds=30)
+
+        # Not due yet, so the worker leaves it alone.
+        assert process_outbox() == 0
+
+        log.next_attempt_at = datetime.now(UTC) - timedelta(seconds=1)
+        db.session.commit()
+        assert process_outbox() == 1
+        log = SentEmail.query.one()
+        assert log.status == SentEmail.ERROR
+        assert log.attempts == 2
+        assert Zajecia.query.one().doc_sent_at is None
+
+
+def test_worker_command_drains_queue(monkeypatch, app, client):
+    messages = []
+    monkeypatch.setattr('app.utils.mail.send', messages.append)
+    monkeypatch.setattr('app.utils.generate_docx', fake_generate_docx)
+    queue_session(app, client)
+
+    result = app.test_cli_runner().invoke(args=['outbox', 'worker', '--once'])
+    assert result.exit_code == 0, result.output
+    assert len(messages) == 1
+
+    result = app.test_cli_runner().invoke(args=['outbox', 'status'])
+    assert 'W kolejce: 0' in result.output
+
+
+def test_connection_refused_is_a_failed_attempt(monkeypatch, app, client):
+    def refuse(*args, **kwargs):
+        raise ConnectionRefusedError(111, 'Connection refused')
+
+    monkeypatch.setattr('smtplib.SMTP', refuse)
+    monkeypatch.setattr('app.utils.generate_docx', fake_generate_docx)
+    queue_session(app, client)
+
+    with app.app_context():
+        monkeypatch.setattr(app.extensions['mail'], 'suppress', False)
+        assert process_outbox() == 1
+        log = SentEmail.query.one()
+        assert log.status == SentEmail.QUEUED
+        assert log.attempts == 1
+        assert log.next_attempt_at is not None
+
+
+def test_render_error_does_not_stop_the_worker(monkeypatch, app, client):
+    def broken_docx(zajecia, beneficjenci, output):
+        raise RuntimeError('template missing')
+
+    monkeypatch.setattr('app.utils.generate_docx', broken_docx)
+    app.config['OUTBOX_MAX_ATTEMPTS'] = 1
+    queue_session(app, client)
+
+    result = app.test_cli_runner().invoke(args=['outbox', 'worker', '--once'])
+
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        log = SentEmail.query.one()
+        assert log.status == SentEmail.ERROR
+        assert log.attempts == 1
@@ -0,0 +1,116 @@
+"""Tests for keyset pagination of the session and beneficiary lists."""
+
+import re
+from datetime import date, time
+from html import unescape
+
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import Beneficjent, User, Zajecia
+from app.pagination import _after
+
+XHR = {"X-Requested-With": "XMLHttpRequest"}
+
+
+def setup_data(app):
+    """Create a user with five sessions and five beneficiaries."""
+
+    app.config["LIST_PAGE_SIZE"] = 2
+    with app.app_context():
+        user = User(full_name="test", email="test@example.com", confirmed=True)
+        user.set_password("secret")
+        db.session.add(user)
+        db.session.commit()
+        for day in range(1, 6):
+            db.session.add(
+                Zajecia(
+                    data=date(2024, 5, day),
+                    godzina_od=time(8, 0),
+                    godzina_do=time(9, 0),
+                    specjalista=f"Spec{day}",
+                    user_id=user.id,
+                )
+            )
+            db.session.add(
+                Beneficjent(imie=f"Osoba {day}", wojewodztwo="Maz", user_id=user.id)
+            )
+        db.session.commit()
+
+
+def login(client):
+    return client.post(
+        "/login",
+        data={"email": "test@example.com", "password": "secret"},
+        follow_redirects=True,
+    )
+
+
+def next_url(html):
+    match = re.search(r'data-next-url="([^"]+)"', html)
+    return unescape(match.group(1)) if match else None
+
+
+def test_zajecia_pages_follow_cursor(app, client):
+    setup_data(app)
+    login(client)
+
+    html = client.get("/zajecia").get_data(as_text=True)
+    seen = re.findall(r"Spec\d", html)
+    url = next_url(html)
+    while url:
+        html = client.get(url, headers=XHR).get_data(as_text=True)
+        assert "Brak zajęć" not in html
+        seen += re.findall(r"Spec\d", html)
+        url = next_url(html)
+
+    assert seen == ["Spec5", "Spec4", "Spec3", "Spec2", "Spec1"]
+
+
+def test_beneficjenci_pages_follow_cursor(app, client):
+    setup_data(app)
+    login(client)
+
+    html = client.get("/beneficjenci", headers=XHR).get_data(as_text=True)
+    seen = re.findall(r"Osoba \d", html)
+    url = next_url(html)
+    while url:
+        html = client.get(url, headers=XHR).get_data(as_text=True)
+        seen += re.findall(r"Osoba \d", html)
+        url = next_url(html)
+
+    assert seen == ["Osoba 1", "Osoba 2", "Osoba 3", "Osoba 4", "Osoba 5"]
+
+
+def test_admin_beneficjenci_page_uses_index_order(app):
+    """Pages of a project are read in index order, without sorting it."""
+    with app.app_context():
+        columns = [Beneficjent.imie, Beneficjent.id]
+        query = (
+            Beneficjent.query.options(joinedload(Beneficjent.user))
+            .filter_by(project_id=1)
+            .filter(_after(columns, ["Osoba 2", 2], False))
+            .order_by(*columns)
+            .limit(51)
+        )
+        sql = query.statement.compile(
+            db.engine, compile_kwargs={"literal_binds": True}
+        )
+        plan = " ".join(
+            row[-1]
+            for row in db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}"))
+        )
+
+    assert "ix_beneficjent_project_imie_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_invalid_cursor_returns_first_page(app, client):
+    setup_data(app)
+    login(client)
+
+    html = client.get("/zajecia?after=not-a-cursor", headers=XHR).get_data(
+        as_text=True
+    )
+
+    assert re.findall(r"Spec\d", html) == ["Spec5", "Spec4"]
@@ -2,9 +2,18 @@
 
 from datetime import date, time
 
-from app import db
-from app.models import Beneficjent, Projekt, ProjectStatus, Roles, User, Zajecia
+from app import create_app, db
+from app.models import (
+    Beneficjent,
+    CacheVersion,
+    Projekt,
+    ProjectStatus,
+    Roles,
+    User,
+    Zajecia,
+)
 from app.projekt_utils import get_aktywny_projekt, ustaw_jako_aktywny
+from tests.conftest import dispose_app
 
 
 def _make_admin(app, email="admin@example.com"):
@@ -167,3 +176,90 @@ def test_create_project_via_admin(client, app, login):
     with app.app_context():
         p = Projekt.query.filter_by(nazwa="ATNIS VIII").one()
         assert p.status == ProjectStatus.ARCHIWUM
+
+
+def test_active_project_is_cached_per_request_and_process(app, assert_max_queries):
+    """Repeated lookups reuse the cached project instead of querying."""
+    app.config["SETTINGS_CHECK_SECONDS"] = 3600
+    with app.app_context():
+        first = get_aktywny_projekt()
+        with assert_max_queries(0):
+            assert get_aktywny_projekt() is first
+
+    with app.app_context():
+        # The shared cache version was checked less than
+        # SETTINGS_CHECK_SECONDS ago.
+        with assert_max_queries(0):
+            projekt = get_aktywny_projekt()
+            assert projekt.nazwa == "ATNIS VI"
+        assert projekt in db.session
+
+
+def test_activation_invalidates_cached_project(app):
+    """Activating another project is visible immediately in this process."""
+    with app.app_context():
+        assert get_aktywny_projekt().nazwa == "ATNIS VI"
+        v = Projekt.query.filter_by(nazwa="ATNIS V").one()
+        ustaw_jako_aktywny(v)
+        assert get_aktywny_projekt().nazwa == "ATNIS V"
+
+    with app.app_context():
+        assert get_aktywny_projekt().nazwa == "ATNIS V"
+        user = User(full_name="u", email="u@example.com")
+        db.session.add(user)
+        db.session.flush()
+        benef = Beneficjent(imie="Nowa", wojewodztwo="Maz", user_id=user.id)
+        db.session.add(benef)
+        db.session.commit()
+        assert benef.projekt.nazwa == "ATNIS V"
+
+
+def test_activation_in_another_process_applies_on_next_check(app):
+    app.config["SETTINGS_CHECK_SECONDS"] = 0
+    with app.app_context():
+        assert get_aktywny_projekt().nazwa == "ATNIS VI"
+
+    other = create_app(
+        {
+            "SECRET_KEY": "test-secret",
+            "SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"],
+        }
+    )
+    with other.app_context():
+        ustaw_jako_aktywny(Projekt.query.filter_by(nazwa="ATNIS V").one())
+    dispose_app(other)
+
+    with app.app_context():
+        assert get_aktywny_projekt().nazwa == "ATNIS V"
+
+
+def test_only_status_or_name_changes_bump_cache_version(app):
+    def version():
+        return db.session.get(CacheVersion, CacheVersion.ROWS).version
+
+    with app.app_context():
+        projekt = get_aktywny_projekt()
+        user = User(full_name="u", email="u@example.com")
+        db.session.add(user)
+        db.session.commit()
+        before = version()
+
+        # Adding rows to a project's collections leaves its columns alone.
+        projekt.zajecia.append(
+            Zajecia(
+                data=date(2024, 1, 1),
+                godzina_od=time(8, 0),
+                godzina_do=time(9, 0),
+                specjalista="s",
+                user_id=user.id,
+            )
+        )
+        projekt.beneficjenci.append(
+            Beneficjent(imie="Nowa", wojewodztwo="Maz", user_id=user.id)
+        )
+        db.session.commit()
+        assert version() == before
+
+        projekt.nazwa = "ATNIS VI bis"
+        db.session.commit()
+        assert version() == before + 1
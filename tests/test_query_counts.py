@@ -0,0 +1,81 @@
+"""Guard list views against N+1 queries."""
+
+from datetime import UTC, date, datetime, time
+
+import pytest
+
+from app import db
+from app.models import Beneficjent, Roles, SentEmail, User, Zajecia
+
+ROWS = 12
+
+
+def setup_data(app):
+    """Create an admin and ``ROWS`` instructors with one session each."""
+
+    with app.app_context():
+        admin = User(
+            full_name="admin",
+            email="admin@example.com",
+            role=Roles.ADMIN,
+            confirmed=True,
+        )
+        admin.set_password("secret")
+        db.session.add(admin)
+        db.session.commit()
+        for i in range(ROWS):
+            user = User(full_name=f"Instruktor {i}", email=f"i{i}@example.com")
+            db.session.add(user)
+            db.session.flush()
+            owner = admin if i % 2 else user
+            benef = Beneficjent(imie=f"Osoba {i}", wojewodztwo="Maz", user_id=owner.id)
+            zaj = Zajecia(
+                data=date(2024, 5, i + 1),
+                godzina_od=time(8, 0),
+                godzina_do=time(9, 0),
+                specjalista="Spec",
+                user_id=owner.id,
+            )
+            zaj.beneficjenci.append(benef)
+            db.session.add_all([benef, zaj])
+            db.session.flush()
+            db.session.add(
+                SentEmail(
+                    zajecia_id=zaj.id,
+                    recipient="dest@example.com",
+                    subject="Raport",
+                    sent_at=datetime.now(UTC),
+                    status=SentEmail.SENT,
+                )
+            )
+        db.session.commit()
+
+
+def login(client):
+    client.post(
+        "/login",
+        data={"email": "admin@example.com", "password": "secret"},
+        follow_redirects=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "url,limit",
+    [
+        ("/zajecia", 5),
+        ("/beneficjenci", 5),
+        ("/emails", 5),
+        ("/admin/zajecia", 7),
+        ("/admin/beneficjenci", 7),
+    ],
+)
+def test_list_views_run_constant_number_of_queries(
+    app, client, assert_max_queries, url, limit
+):
+    setup_data(app)
+    login(client)
+
+    with assert_max_queries(limit):
+        resp = client.get(url)
+
+    assert resp.status_code == 200
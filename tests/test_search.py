@@ -1,8 +1,11 @@
 """Tests covering search functionality for beneficiaries and sessions."""
 
 from datetime import date, time
-from app import db
-from app.models import User, Beneficjent, Zajecia
+from app import create_app, db
+from app.models import CacheVersion, Roles, User, Beneficjent, Zajecia
+from app.metrics import search_latency
+from app.search import parse_date_range
+from tests.conftest import dispose_app
 
 
 def setup_data(app):
@@ -66,3 +69,155 @@ def test_filter_zajecia(app, client):
     text = resp.get_data(as_text=True)
     assert "02.01.2023" in text
     assert "01.01.2023" not in text
+
+
+def test_filter_beneficjenci_ignores_diacritics(app, client):
+    """Polish letters match their plain counterparts in both directions."""
+    user_id = setup_data(app)
+    with app.app_context():
+        db.session.add_all([
+            Beneficjent(imie="Łukasz Żółć", wojewodztwo="Łódzkie", user_id=user_id),
+            Beneficjent(imie="Zenon", wojewodztwo="Slask", user_id=user_id),
+        ])
+        db.session.commit()
+    login(client)
+
+    for q in ("lukasz", "zolc", "łódz", "LODZ", "Łuk Żó"):
+        text = client.get(f"/beneficjenci?q={q}").get_data(as_text=True)
+        assert "Łukasz Żółć" in text, q
+        assert "Zenon" not in text, q
+
+
+def test_search_index_follows_updates_and_deletes(app, client):
+    """Edited and removed beneficiaries are reflected by the index."""
+    setup_data(app)
+    with app.app_context():
+        alice = Beneficjent.query.filter_by(imie="Alice").one()
+        alice.imie = "Alicja"
+        db.session.delete(Beneficjent.query.filter_by(imie="Bob").one())
+        db.session.commit()
+    login(client)
+
+    assert "Alicja" in client.get("/beneficjenci?q=alicj").get_data(as_text=True)
+    assert "Alicja" not in client.get("/beneficjenci?q=alice").get_data(as_text=True)
+    assert "Bob" not in client.get("/beneficjenci?q=bob").get_data(as_text=True)
+
+
+def test_filter_zajecia_by_month_and_specialist(app, client):
+    """A month filters by date range, other text by specialist."""
+    setup_data(app)
+    login(client)
+
+    text = client.get("/zajecia?q=2023-01").get_data(as_text=True)
+    assert "01.01.2023" in text and "02.01.2023" in text
+    assert "01.01.2023" not in client.get("/zajecia?q=2023-02").get_data(
+        as_text=True
+    )
+    text = client.get("/zajecia?q=spec2").get_data(as_text=True)
+    assert "02.01.2023" in text
+    assert "01.01.2023" not in text
+
+
+def test_parse_date_range():
+    assert parse_date_range("2025") == (date(2025, 1, 1), date(2026, 1, 1))
+    assert parse_date_range("2025-02") == (date(2025, 2, 1), date(2025, 3, 1))
+    assert parse_date_range("14.03.2025") == (date(2025, 3, 14), date(2025, 3, 15))
+    assert parse_date_range("12.2025") == (date(2025, 12, 1), date(2026, 1, 1))
+    assert parse_date_range("2025-13") is None
+    assert parse_date_range("Spec1") is None
+
+
+def test_live_search_endpoint_returns_rows(app, client):
+    """The JSON endpoint renders matching rows with their search text."""
+    setup_data(app)
+    login(client)
+
+    data = client.get("/api/szukaj/beneficjenci?q=ali").get_json()
+
+    assert [row["search"] for row in data["rows"]] == ["alice maz"]
+    assert "Alice" in data["rows"][0]["html"]
+    assert data["complete"] and data["refinable"]
+    assert client.get("/api/szukaj/beneficjenci?q=a").status_code == 400
+
+
+def test_live_search_refines_cached_prefix(app, client, assert_max_queries):
+    """Longer queries are answered from the cached result of a prefix."""
+    setup_data(app)
+    login(client)
+    search_latency.clear()
+    client.get("/api/szukaj/zajecia?q=sp")
+
+    with assert_max_queries(3):
+        data = client.get("/api/szukaj/zajecia?q=spec2").get_json()
+
+    assert [row["search"] for row in data["rows"]] == ["spec2"]
+    sources = {
+        s["labels"]["source"]: s["count"] for s in search_latency.snapshot()
+    }
+    assert sources == {"db": 1, "cache": 1}
+
+
+def test_live_search_cache_cleared_by_another_process(app, client):
+    """A change saved by another worker reaches this worker's cache."""
+    user_id = setup_data(app)
+    app.config["SETTINGS_CHECK_SECONDS"] = 0
+    login(client)
+    client.get("/api/szukaj/beneficjenci?q=al")
+
+    other = create_app(
+        {
+            "SECRET_KEY": "test-secret",
+            "SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"],
+        }
+    )
+    with other.app_context():
+        db.session.add(Beneficjent(imie="Alina", wojewodztwo="Maz", user_id=user_id))
+        db.session.commit()
+        rows = db.session.get(CacheVersion, CacheVersion.ROWS).version
+    dispose_app(other)
+
+    data = client.get("/api/szukaj/beneficjenci?q=ali").get_json()
+
+    assert len(data["rows"]) == 2
+    with app.app_context():
+        # Searched rows have their own counter; cached users stay valid.
+        assert db.session.get(CacheVersion, CacheVersion.ROWS).version == rows
+
+
+def test_live_search_inputs_use_configured_cache_lifetime(app, client):
+    """The browser keeps results for as long as the server does."""
+    setup_data(app)
+    login(client)
+    app.config["SEARCH_CACHE_SECONDS"] = 2.5
+
+    for url in ("/beneficjenci", "/zajecia"):
+        assert 'data-cache-ms="2500"' in client.get(url).get_data(as_text=True)
+
+
+def test_live_search_cache_cleared_on_change(app, client):
+    """Adding a beneficiary drops cached results."""
+    user_id = setup_data(app)
+    login(client)
+    client.get("/api/szukaj/beneficjenci?q=al")
+    with app.app_context():
+        db.session.add(Beneficjent(imie="Alina", wojewodztwo="Maz", user_id=user_id))
+        db.session.commit()
+
+    data = client.get("/api/szukaj/beneficjenci?q=ali").get_json()
+
+    assert len(data["rows"]) == 2
+
+
+def test_admin_can_read_search_latency(app, client):
+    setup_data(app)
+    with app.app_context():
+        user = User.query.filter_by(email="test@example.com").one()
+        user.role = Roles.ADMIN
+        db.session.commit()
+    login(client)
+    client.get("/api/szukaj/zajecia?q=spec")
+
+    data = client.get("/admin/metryki").get_json()
+
+    series = data["live_search_duration_seconds"]
+    assert any(s["labels"]["kind"] == "zajecia" for s in series)
@@ -0,0 +1,126 @@
+"""Tests for the ``flask seed`` command."""
+
+import pytest
+from sqlalchemy import func, select, text
+
+from app import db, seed
+from app.models import (
+    Beneficjent,
+    Projekt,
+    SentEmail,
+    User,
+    Zajecia,
+    zajecia_beneficjenci,
+)
+from app.projekt_utils import ustaw_jako_aktywny
+
+
+def run_seed(app, *args):
+    result = app.test_cli_runner().invoke(args=["seed", *args])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+
+def count(model):
+    return db.session.scalar(select(func.count()).select_from(model))
+
+
+def test_seed_inserts_consistent_rows(app):
+    output = run_seed(app, "--users", "5", "--sessions", "200")
+
+    assert "zajecia: 200" in output
+    with app.app_context():
+        assert count(User) == 5
+        assert count(Beneficjent) == 66
+        assert count(Zajecia) == 200
+        assert 0 < count(SentEmail) < 200
+        # Every linked beneficiary belongs to the session's instructor
+        # and edition.
+        mismatched = db.session.scalar(
+            select(func.count())
+            .select_from(zajecia_beneficjenci)
+            .join(Zajecia, Zajecia.id == zajecia_beneficjenci.c.zajecia_id)
+            .join(
+                Beneficjent, Beneficjent.id == zajecia_beneficjenci.c.beneficjent_id
+            )
+            .where(
+                (Beneficjent.user_id != Zajecia.user_id)
+                | (Beneficjent.project_id != Zajecia.project_id)
+            )
+        )
+        assert mismatched == 0
+        editions = select(func.count(func.distinct(Zajecia.project_id)))
+        assert db.session.scalar(editions) > 1
+
+
+def test_seed_restores_indexes_and_search(app, client):
+    with app.app_context():
+        before = db.session.execute(
+            text("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')")
+        ).scalars().all()
+
+    run_seed(app, "--users", "2", "--sessions", "50", "--password", "sekret")
+
+    with app.app_context():
+        after = db.session.execute(
+            text("SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')")
+        ).scalars().all()
+        benef = db.session.scalars(select(Beneficjent).order_by(Beneficjent.id)).first()
+        owner = db.session.get(User, benef.user_id)
+        ustaw_jako_aktywny(db.session.get(Projekt, benef.project_id))
+        name, email = benef.imie, owner.email
+    assert sorted(after) == sorted(before)
+
+    client.post("/login", data={"email": email, "password": "sekret"})
+    resp = client.get(f"/beneficjenci?q={name.split()[1]}")
+
+    assert name in resp.get_data(as_text=True)
+
+
+def test_failed_seed_keeps_indexes_and_triggers(app, monkeypatch):
+    schema = text(
+        "SELECT name FROM sqlite_master WHERE type IN ('index', 'trigger')"
+    )
+    with app.app_context():
+        before = db.session.execute(schema).scalars().all()
+    calls = []
+    insert = seed._insert
+
+    def failing_insert(*args):
+        calls.append(args)
+        if len(calls) == 3:
+            raise RuntimeError("disk full")
+        insert(*args)
+
+    monkeypatch.setattr(seed, "_insert", failing_insert)
+
+    result = app.test_cli_runner().invoke(
+        args=["seed", "--users", "2", "--sessions", "20", "--projects", "1"]
+    )
+
+    assert isinstance(result.exception, RuntimeError)
+    with app.app_context():
+        assert sorted(db.session.execute(schema).scalars()) == sorted(before)
+        assert count(User) == 0
+
+
+def test_seed_appends_after_existing_rows(app):
+    run_seed(app, "--users", "2", "--sessions", "20")
+    run_seed(app, "--users", "2", "--sessions", "20")
+
+    with app.app_context():
+        assert count(User) == 4
+        assert count(Zajecia) == 40
+        assert db.session.scalar(select(func.max(Zajecia.id))) == 40
+
+
+@pytest.mark.parametrize(
+    "option, value", [("--users", "0"), ("--projects", "0"), ("--batch-size", "0")]
+)
+def test_seed_rejects_empty_counts(app, option, value):
+    result = app.test_cli_runner().invoke(args=["seed", option, value])
+
+    assert result.exit_code != 0
+    assert "Invalid value" in result.output
+    with app.app_context():
+        assert count(User) == 0
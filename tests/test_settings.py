@@ -3,8 +3,9 @@ from smtplib import SMTPException
 
 from app import create_app, db, mail
 from app.models import Settings, User, Roles
+from app.settings_sync import refresh_settings
 from flask_mail import Message
-from tests.conftest import build_test_config, dispose_app
+from tests.conftest import build_test_config, dispose_app, migrate
 
 
 def make_app(monkeypatch, db_path):
@@ -13,7 +14,9 @@ def make_app(monkeypatch, db_path):
     if hasattr(app_package, "routes"):
         delattr(app_package, "routes")
 
-    return create_app(build_test_config(db_path))
+    app = create_app(build_test_config(db_path))
+    migrate(app)
+    return app
 
 
 def create_admin(app, admin_email=None, sender_name=None):
@@ -229,3 +232,64 @@ def test_smtp_host_updated_immediately(monkeypatch, tmp_path):
 
     assert hosts[-1] == "newhost"
     dispose_app(app)
+
+
+def save_settings(client, **overrides):
+    data = {
+        "mail_server": "newhost",
+        "mail_port": 2526,
+        "mail_username": "",
+        "mail_password": "",
+        "mail_use_tls": "",
+        "mail_use_ssl": "",
+        "timezone": "Europe/Warsaw",
+        "submit": "1",
+    }
+    data.update(overrides)
+    return client.post("/admin/ustawienia", data=data, follow_redirects=True)
+
+
+def test_settings_propagate_to_other_workers(monkeypatch, tmp_path):
+    db_path = tmp_path / "konsultacje.db"
+    editor = make_app(monkeypatch, db_path)
+    create_admin(editor)
+    worker = make_app(monkeypatch, db_path)
+    worker.config["SETTINGS_CHECK_SECONDS"] = 0
+    assert worker.config["MAIL_SERVER"] == "localhost"
+
+    client = editor.test_client()
+    login(client)
+    save_settings(client)
+
+    worker.test_client().get("/healthz")
+    assert worker.config["MAIL_SERVER"] == "newhost"
+    assert worker.config["MAIL_PORT"] == 2526
+    assert worker.config["TIMEZONE"] == "Europe/Warsaw"
+    assert worker.extensions["mail"].server == "newhost"
+
+    # Clearing a field falls back to the environment default again.
+    save_settings(client, mail_server="")
+    worker.test_client().get("/healthz")
+    assert worker.config["MAIL_SERVER"] == "localhost"
+    dispose_app(editor)
+    dispose_app(worker)
+
+
+def test_settings_version_checked_at_most_once_per_interval(monkeypatch, tmp_path):
+    db_path = tmp_path / "konsultacje.db"
+    editor = make_app(monkeypatch, db_path)
+    create_admin(editor)
+    worker = make_app(monkeypatch, db_path)
+    worker.config["SETTINGS_CHECK_SECONDS"] = 3600
+
+    client = editor.test_client()
+    login(client)
+    save_settings(client)
+
+    worker.test_client().get("/healthz")
+    assert worker.config["MAIL_SERVER"] == "localhost"
+    with worker.app_context():
+        assert refresh_settings(force=True)
+    assert worker.config["MAIL_SERVER"] == "newhost"
+    dispose_app(editor)
+    dispose_app(worker)
@@ -1,4 +1,4 @@
-from datetime import date
+from datetime import date, time
 from types import SimpleNamespace
 
 from app.utils import send_session_docx
@@ -19,9 +19,12 @@ def test_send_session_docx_sanitizes_specjalista(monkeypatch, app):
 
     with app.app_context():
         zajecia = SimpleNamespace(
-            beneficjenci=[SimpleNamespace(imie='Ala')],
+            beneficjenci=[SimpleNamespace(imie='Ala', wojewodztwo='Mazowieckie')],
             data=date(2023, 1, 1),
+            godzina_od=time(9, 0),
+            godzina_do=time(10, 0),
             specjalista='Spec/Name',
+            user=SimpleNamespace(full_name='doc'),
         )
         send_session_docx(zajecia, 'dest@example.com')
 
@@ -0,0 +1,87 @@
+"""Tests for the slow-query log and the per-request SQL profiler."""
+
+import logging
+
+from app import db
+from app.models import Roles, User
+from app.sql_profiler import PROFILE_HEADER, summarize
+
+
+def login_as(app, client, role=Roles.INSTRUCTOR):
+    with app.app_context():
+        user = User(full_name="Ala", email="ala@example.com", role=role)
+        user.set_password("secret")
+        user.confirmed = True
+        db.session.add(user)
+        db.session.commit()
+    client.post("/login", data={"email": "ala@example.com", "password": "secret"})
+
+
+def test_admin_header_adds_profile_panel(app, client):
+    login_as(app, client, Roles.ADMIN)
+
+    resp = client.get("/admin/uzytkownicy", headers={PROFILE_HEADER: "1"})
+
+    assert int(resp.headers["X-SQL-Queries"]) > 0
+    assert float(resp.headers["X-SQL-Time-Ms"]) >= 0
+    text = resp.get_data(as_text=True)
+    assert "Profil SQL:" in text
+    assert "app/admin/routes.py:" in text
+    assert text.index("Profil SQL:") < text.index("</body>")
+
+
+def test_header_ignored_for_non_admins(app, client):
+    login_as(app, client)
+
+    resp = client.get("/kalendarz", headers={PROFILE_HEADER: "1"})
+
+    assert "X-SQL-Queries" not in resp.headers
+    assert "Profil SQL:" not in resp.get_data(as_text=True)
+
+
+def test_config_flag_profiles_without_panel(app, client):
+    app.config["SQL_PROFILER"] = True
+    login_as(app, client)
+
+    resp = client.get("/kalendarz")
+
+    assert int(resp.headers["X-SQL-Queries"]) > 0
+    assert "Profil SQL:" not in resp.get_data(as_text=True)
+
+
+def test_slow_queries_are_logged_with_call_site(app, client, caplog, monkeypatch):
+    # Alembic's logging setup in the migrated_db fixture disables the logger.
+    monkeypatch.setattr(app.logger, "disabled", False)
+    login_as(app, client)
+    app.config["SLOW_QUERY_MS"] = 0.000001
+
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        client.get("/zajecia")
+
+    slow = [r.getMessage() for r in caplog.records if "slow query" in r.getMessage()]
+    assert any("app/sessions/routes.py:" in message for message in slow)
+
+
+def test_slow_query_log_disabled_with_zero(app, client, caplog, monkeypatch):
+    monkeypatch.setattr(app.logger, "disabled", False)
+    login_as(app, client)
+    app.config["SLOW_QUERY_MS"] = 0
+
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        client.get("/zajecia")
+
+    assert not any("slow query" in r.getMessage() for r in caplog.records)
+
+
+def test_summarize_groups_repeated_statements():
+    profile = [
+        ("SELECT a", 0.001, "app/x.py:1 (f)"),
+        ("SELECT b", 0.010, "app/y.py:2 (g)"),
+        ("SELECT a", 0.002, "app/x.py:1 (f)"),
+    ]
+
+    groups = summarize(profile)
+
+    assert [g["statement"] for g in groups] == ["SELECT b", "SELECT a"]
+    assert groups[1]["count"] == 2
+    assert groups[1]["sites"] == {"app/x.py:1 (f)": 2}
@@ -0,0 +1,108 @@
+"""Tests for the SQLite pragmas and concurrent writes."""
+
+import threading
+import time
+
+from sqlalchemy import text
+
+from app import db
+from app.models import Beneficjent, User, Zajecia
+from app.projekt_utils import get_aktywny_projekt
+
+THREADS = 8
+REQUESTS = 10
+
+
+def create_instructors(app, count):
+    with app.app_context():
+        projekt = get_aktywny_projekt()
+        instructors = []
+        for i in range(count):
+            user = User(full_name=f"Instr {i}", email=f"instr{i}@example.com")
+            user.set_password("secret")
+            user.confirmed = True
+            db.session.add(user)
+            db.session.flush()
+            benef = Beneficjent(
+                imie=f"Benef {i}",
+                wojewodztwo="Mazowieckie",
+                user_id=user.id,
+                project_id=projekt.id,
+            )
+            db.session.add(benef)
+            db.session.flush()
+            instructors.append((user.email, benef.id))
+        db.session.commit()
+        return instructors
+
+
+def test_sqlite_pragmas_applied(app):
+    with app.app_context():
+        pragmas = {
+            name: db.session.execute(text(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size")
+        }
+
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "busy_timeout": 5000,
+        "cache_size": -20000,
+    }
+
+
+def test_empty_pragma_keeps_sqlite_default(app):
+    app.config["SQLITE_JOURNAL_MODE"] = ""
+    app.config["SQLITE_BUSY_TIMEOUT_MS"] = 1234
+    with app.app_context():
+        db.engine.dispose()
+        busy_timeout = db.session.execute(text("PRAGMA busy_timeout")).scalar()
+
+    assert busy_timeout == 1234
+
+
+def test_parallel_session_creates_do_not_lock(app):
+    instructors = create_instructors(app, THREADS)
+    latencies = []
+    errors = []
+
+    def create_sessions(email, benef_id):
+        client = app.test_client()
+        client.post("/login", data={"email": email, "password": "secret"})
+        for i in range(REQUESTS):
+            start = time.perf_counter()
+            try:
+                resp = client.post(
+                    "/zajecia/nowe",
+                    data={
+                        "data": f"2026-03-{1 + i:02d}",
+                        "godzina_od": "10:00",
+                        "godzina_do": "11:00",
+                        "specjalista": "dietetyk",
+                        "beneficjenci": str(benef_id),
+                        "save": "1",
+                    },
+                )
+                if resp.status_code != 302:
+                    errors.append(resp.status_code)
+            except Exception as exc:  # e.g. OperationalError: database is locked
+                errors.append(exc)
+            latencies.append(time.perf_counter() - start)
+
+    threads = [
+        threading.Thread(target=create_sessions, args=instructor)
+        for instructor in instructors
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"lock errors: {len(errors)}, p99: {p99 * 1000:.1f} ms")
+    assert errors == []
+    # Far below the busy timeout: writers queue briefly instead of stalling.
+    assert p99 < 5
+    with app.app_context():
+        assert Zajecia.query.count() == THREADS * REQUESTS
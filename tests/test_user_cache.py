@@ -0,0 +1,139 @@
+"""Tests for the cached Flask-Login user loader."""
+
+from app import create_app, db
+from app.models import CacheVersion, Roles, User
+from tests.conftest import dispose_app
+
+
+def create_user(app, email, role=Roles.INSTRUCTOR):
+    with app.app_context():
+        user = User(full_name=email.split("@")[0], email=email, role=role)
+        user.set_password("secret")
+        user.confirmed = True
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def login_as(app, email):
+    client = app.test_client()
+    client.post("/login", data={"email": email, "password": "secret"})
+    return client
+
+
+def user_queries(statements):
+    return [s for s in statements if 'FROM "user"' in s or "FROM user" in s]
+
+
+def test_authenticated_requests_reuse_cached_user(app, assert_max_queries):
+    create_user(app, "ala@example.com")
+    client = login_as(app, "ala@example.com")
+    client.get("/kalendarz")
+
+    with assert_max_queries(10) as statements:
+        resp = client.get("/kalendarz")
+
+    assert resp.status_code == 200
+    assert user_queries(statements) == []
+
+
+def test_demoted_admin_loses_access_immediately(app):
+    create_user(app, "boss@example.com", Roles.SUPERADMIN)
+    admin_id = create_user(app, "admin@example.com", Roles.ADMIN)
+    admin = login_as(app, "admin@example.com")
+    assert admin.get("/admin/uzytkownicy").status_code == 200
+
+    boss = login_as(app, "boss@example.com")
+    boss.post(f"/admin/uzytkownicy/{admin_id}/demote")
+
+    assert admin.get("/admin/uzytkownicy").status_code == 403
+
+
+def test_deleted_user_is_logged_out(app):
+    create_user(app, "boss@example.com", Roles.SUPERADMIN)
+    user_id = create_user(app, "ala@example.com")
+    ala = login_as(app, "ala@example.com")
+    assert ala.get("/kalendarz").status_code == 200
+
+    boss = login_as(app, "boss@example.com")
+    boss.post(f"/admin/uzytkownicy/{user_id}/usun")
+
+    resp = ala.get("/kalendarz")
+    assert resp.status_code == 302
+    assert "/login" in resp.headers["Location"]
+
+
+def test_expired_entries_are_reloaded(app):
+    user_id = create_user(app, "ala@example.com")
+    app.config["USER_CACHE_SECONDS"] = 0
+    ala = login_as(app, "ala@example.com")
+    ala.get("/kalendarz")
+    with app.app_context():
+        # A change made by another process bypasses this process' eviction.
+        db.session.execute(
+            db.update(User).where(User.id == user_id).values(full_name="Alicja")
+        )
+        db.session.commit()
+
+    assert "Alicja" in ala.get("/settings").get_data(as_text=True)
+
+
+def other_process(app):
+    return create_app(
+        {
+            "SECRET_KEY": "test-secret",
+            "SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"],
+        }
+    )
+
+
+def test_changes_from_another_process_apply_on_next_check(app):
+    app.config["SETTINGS_CHECK_SECONDS"] = 0
+    admin_id = create_user(app, "admin@example.com", Roles.ADMIN)
+    user_id = create_user(app, "ala@example.com")
+    admin = login_as(app, "admin@example.com")
+    ala = login_as(app, "ala@example.com")
+    assert admin.get("/admin/uzytkownicy").status_code == 200
+    assert ala.get("/kalendarz").status_code == 200
+
+    other = other_process(app)
+    with other.app_context():
+        db.session.get(User, admin_id).role = Roles.INSTRUCTOR
+        db.session.delete(db.session.get(User, user_id))
+        db.session.commit()
+    dispose_app(other)
+
+    assert admin.get("/admin/uzytkownicy").status_code == 403
+    assert ala.get("/kalendarz").status_code == 302
+
+
+def cache_version(app):
+    with app.app_context():
+        return db.session.get(CacheVersion, CacheVersion.ROWS).version
+
+
+def test_cache_version_is_read_once_per_check_interval(app, assert_max_queries):
+    create_user(app, "ala@example.com")
+    app.config["SETTINGS_CHECK_SECONDS"] = 3600
+    client = login_as(app, "ala@example.com")
+    client.get("/kalendarz")
+
+    with assert_max_queries(10) as statements:
+        client.get("/kalendarz")
+
+    assert not [s for s in statements if "cache_version" in s]
+
+
+def test_unchanged_user_does_not_bump_cache_version(app):
+    user_id = create_user(app, "ala@example.com")
+    before = cache_version(app)
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        user.full_name = user.full_name
+        db.session.commit()
+    assert cache_version(app) == before
+
+    with app.app_context():
+        db.session.get(User, user_id).full_name = "Alicja"
+        db.session.commit()
+    assert cache_version(app) == before + 1